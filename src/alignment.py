@@ -0,0 +1,211 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from src.removal_spans import is_speaker_tag, render_strikethrough, split_words
+
+STRIKE_PATTERN = re.compile(r"~{2,}")
+NORMALIZE_PATTERN = re.compile(r"[^\w]+")
+
+# Gaps between anchors smaller than this are aligned with a full LCS table
+FULL_DP_CELLS = 4096
+BAND_WIDTH = 32
+
+
+@dataclass
+class AlignmentResult:
+    text: str
+    removed: List[bool]
+    drift: float
+    matched: int
+    dropped: int
+    inserted: int
+
+
+def normalize_word(word: str) -> str:
+    if is_speaker_tag(word):
+        return word.lower()
+    return NORMALIZE_PATTERN.sub("", word.lower())
+
+
+def parse_strikethrough(edited: str) -> List[Tuple[str, bool]]:
+    # Any run of two or more tildes toggles strikethrough, which also absorbs the "~~~" artifacts
+    words = []
+    for segment_index, segment in enumerate(STRIKE_PATTERN.split(edited)):
+        struck = segment_index % 2 == 1
+        for word in split_words(segment):
+            if normalize_word(word):
+                words.append((word, struck))
+    return words
+
+
+def _unique_positions(tokens: Sequence[str], start: int, end: int) -> Dict[str, int]:
+    seen: Dict[str, int] = {}
+    duplicates = set()
+    for i in range(start, end):
+        token = tokens[i]
+        if token in seen:
+            duplicates.add(token)
+        else:
+            seen[token] = i
+    for token in duplicates:
+        del seen[token]
+    return seen
+
+
+def _has_matching_neighbour(a: Sequence[str], b: Sequence[str], i: int, j: int) -> bool:
+    if i > 0 and j > 0 and a[i - 1] == b[j - 1]:
+        return True
+    return i + 1 < len(a) and j + 1 < len(b) and a[i + 1] == b[j + 1]
+
+
+def _longest_increasing_run(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # Patience sort over the output positions of anchors already ordered by source position
+    tails: List[int] = []
+    tail_pairs: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tails[mid] < j:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            previous[index] = tail_pairs[lo - 1]
+        if lo == len(tails):
+            tails.append(j)
+            tail_pairs.append(index)
+        else:
+            tails[lo] = j
+            tail_pairs[lo] = index
+    result = []
+    index = tail_pairs[-1] if tail_pairs else -1
+    while index != -1:
+        result.append(pairs[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+def _banded_lcs(a: Sequence[str], b: Sequence[str], a0: int, a1: int, b0: int, b1: int) -> List[Tuple[int, int]]:
+    n, m = a1 - a0, b1 - b0
+    width = m if n * m <= FULL_DP_CELLS else BAND_WIDTH + abs(n - m)
+    # Row i only considers output positions within `width` of the scaled diagonal
+    lows = [max(0, (i * m) // n - width) for i in range(n + 1)]
+    highs = [min(m, (i * m) // n + width) for i in range(n + 1)]
+    rows: List[List[int]] = [[]]
+
+    def get(i: int, j: int) -> int:
+        if i == 0 or j == 0:
+            return 0
+        if j < lows[i] or j > highs[i]:
+            return -1
+        return rows[i][j - lows[i]]
+
+    for i in range(1, n + 1):
+        row: List[int] = []
+        rows.append(row)
+        token = a[a0 + i - 1]
+        for j in range(lows[i], highs[i] + 1):
+            if j == 0:
+                row.append(0)
+                continue
+            best = max(get(i - 1, j), get(i, j - 1))
+            if token == b[b0 + j - 1] and get(i - 1, j - 1) >= 0:
+                best = max(best, get(i - 1, j - 1) + 1)
+            row.append(best)
+
+    pairs = []
+    i, j = n, m
+    while i > 0 and j > 0:
+        current = get(i, j)
+        if a[a0 + i - 1] == b[b0 + j - 1] and get(i - 1, j - 1) == current - 1:
+            pairs.append((a0 + i - 1, b0 + j - 1))
+            i -= 1
+            j -= 1
+        elif get(i - 1, j) == current:
+            i -= 1
+        else:
+            j -= 1
+    pairs.reverse()
+    return pairs
+
+
+def align_tokens(a: Sequence[str], b: Sequence[str]) -> List[Tuple[int, int]]:
+    """Monotone alignment of two token lists: unique-token anchors, recursion between anchors, banded LCS in the gaps."""
+    pairs: List[Tuple[int, int]] = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a0, a1, b0, b1 = stack.pop()
+        # Common prefix and suffix match without any search
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            pairs.append((a0, b0))
+            a0 += 1
+            b0 += 1
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+            pairs.append((a1, b1))
+        if a0 == a1 or b0 == b1:
+            continue
+
+        unique_a = _unique_positions(a, a0, a1)
+        unique_b = _unique_positions(b, b0, b1)
+        # A unique token is only trusted as an anchor when a neighbour agrees as well
+        candidates = sorted(
+            (i, unique_b[token]) for token, i in unique_a.items()
+            if token in unique_b and _has_matching_neighbour(a, b, i, unique_b[token])
+        )
+        anchors = _longest_increasing_run(candidates)
+        if not anchors:
+            pairs.extend(_banded_lcs(a, b, a0, a1, b0, b1))
+            continue
+
+        previous_i, previous_j = a0, b0
+        for i, j in anchors:
+            pairs.append((i, j))
+            stack.append((previous_i, i, previous_j, j))
+            previous_i, previous_j = i + 1, j + 1
+        stack.append((previous_i, a1, previous_j, b1))
+    pairs.sort()
+    return pairs
+
+
+def align_edit(chunk: str, edited: str) -> AlignmentResult:
+    source_words = split_words(chunk)
+    output_words = parse_strikethrough(edited)
+    source_tokens = [normalize_word(word) for word in source_words]
+    output_tokens = [normalize_word(word) for word, _ in output_words]
+    pairs = align_tokens(source_tokens, output_tokens)
+
+    # Project strikethrough back onto the source; words the model dropped are only struck when
+    # they sit inside a struck region, otherwise they are kept so the output stays faithful
+    struck_at: List = [None] * len(source_words)
+    for i, j in pairs:
+        struck_at[i] = output_words[j][1]
+    following_struck = [False] * (len(source_words) + 1)
+    for i in range(len(source_words) - 1, -1, -1):
+        following_struck[i] = following_struck[i + 1] if struck_at[i] is None else struck_at[i]
+    removed = [False] * len(source_words)
+    previous_struck = False
+    for i, struck in enumerate(struck_at):
+        if struck is None:
+            removed[i] = previous_struck and following_struck[i + 1]
+        else:
+            removed[i] = struck
+            previous_struck = struck
+
+    matched = len(pairs)
+    dropped = sum(1 for token, struck in zip(source_tokens, struck_at) if struck is None and token)
+    inserted = len(output_tokens) - matched
+    content_words = max(sum(1 for token in source_tokens if token), 1)
+    return AlignmentResult(
+        text=render_strikethrough(source_words, removed),
+        removed=removed,
+        drift=(dropped + inserted) / content_words,
+        matched=matched,
+        dropped=dropped,
+        inserted=inserted,
+    )
@@ -0,0 +1,178 @@
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, List, Sequence, Tuple
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class WavInfo:
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def frame_size(self) -> int:
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def frames(self) -> int:
+        return self.data_size // self.frame_size
+
+
+def read_wav_info(path: str) -> WavInfo:
+    # Walk the RIFF chunks directly; the wave module rejects float and extensible files
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"{path} is not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                body = f.read(size)
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    format_tag = struct.unpack('<H', body[24:26])[0]
+                fmt = (format_tag, channels, sample_rate, bits)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(f"{path} has a data chunk before its fmt chunk")
+                return WavInfo(*fmt, data_offset=f.tell(), data_size=size)
+            else:
+                f.seek(size, 1)
+            if size % 2:
+                f.seek(1, 1)
+
+
+def _sample_layout(info: WavInfo):
+    if info.format_tag == WAVE_FORMAT_PCM and info.bits_per_sample in (16, 32):
+        return np.dtype(f'<i{info.bits_per_sample // 8}')
+    if info.format_tag == WAVE_FORMAT_PCM and info.bits_per_sample == 24:
+        return np.dtype('u1')
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT and info.bits_per_sample == 32:
+        return np.dtype('<f4')
+    raise ValueError(f"Unsupported WAV encoding: format {info.format_tag}, {info.bits_per_sample} bits")
+
+
+def _to_float(block: np.ndarray, info: WavInfo) -> np.ndarray:
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        return block.astype(np.float32)
+    if info.bits_per_sample == 24:
+        raw = block.reshape(len(block), info.channels, 3).astype(np.int32)
+        values = raw[..., 0] | (raw[..., 1] << 8) | (raw[..., 2] << 16)
+        values = np.where(values & 0x800000, values - 0x1000000, values)
+        return values.astype(np.float32) / float(1 << 23)
+    return block.astype(np.float32) / float(1 << (info.bits_per_sample - 1))
+
+
+def _from_float(samples: np.ndarray, info: WavInfo) -> bytes:
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        return samples.astype('<f4').tobytes()
+    scale = float(1 << (info.bits_per_sample - 1))
+    values = np.clip(np.round(samples * scale), -scale, scale - 1).astype(np.int64)
+    if info.bits_per_sample == 24:
+        values &= 0xFFFFFF
+        packed = np.stack([(values >> shift) & 0xFF for shift in (0, 8, 16)], axis=-1).astype(np.uint8)
+        return packed.tobytes()
+    return values.astype(f'<i{info.bits_per_sample // 8}').tobytes()
+
+
+def _write_header(out: BinaryIO, info: WavInfo, data_size: int):
+    if data_size + 36 > 0xFFFFFFFF:
+        raise ValueError("Rendered audio exceeds the 4 GiB RIFF limit")
+    block_align = info.frame_size
+    out.write(struct.pack('<4sI4s', b'RIFF', 36 + data_size, b'WAVE'))
+    out.write(struct.pack('<4sIHHIIHH', b'fmt ', 16, info.format_tag, info.channels, info.sample_rate,
+                          info.sample_rate * block_align, block_align, info.bits_per_sample))
+    out.write(struct.pack('<4sI', b'data', data_size))
+
+
+def _frame_ranges(keep_ms: Sequence[Sequence[int]], info: WavInfo) -> List[Tuple[int, int]]:
+    ranges = []
+    for begin, end in keep_ms:
+        first = min(max(int(begin) * info.sample_rate // 1000, 0), info.frames)
+        last = min(max(int(end) * info.sample_rate // 1000, 0), info.frames)
+        if last > first:
+            ranges.append((first, last))
+    return ranges
+
+
+def render_wav(source_path: str, keep_ms: Sequence[Sequence[int]], output_path: str,
+               crossfade_ms: float = 10.0, block_frames: int = 1 << 16) -> int:
+    """Write the kept millisecond intervals of a WAV file to output_path with short equal-power crossfades.
+
+    The source is memory-mapped and copied block by block, so memory use does not grow with file size.
+    Returns the number of frames written.
+    """
+    info = read_wav_info(source_path)
+    source = read_frames(source_path, info)
+
+    ranges = _frame_ranges(keep_ms, info)
+    crossfade = int(info.sample_rate * crossfade_ms / 1000)
+    # Each joint overlaps the end of one segment with the start of the next
+    fades = [
+        min(crossfade, (a_end - a_start) // 2, (b_end - b_start) // 2)
+        for (a_start, a_end), (b_start, b_end) in zip(ranges, ranges[1:])
+    ]
+    total_frames = sum(end - start for start, end in ranges) - sum(fades)
+
+    ramp_cache = {}
+
+    def ramps(length: int):
+        if length not in ramp_cache:
+            t = (np.arange(length, dtype=np.float32) + 0.5) / length
+            ramp_cache[length] = (np.cos(t * np.pi / 2)[:, None], np.sin(t * np.pi / 2)[:, None])
+        return ramp_cache[length]
+
+    with open(output_path, 'wb') as out:
+        _write_header(out, info, total_frames * info.frame_size)
+        for k, (start, end) in enumerate(ranges):
+            head = fades[k - 1] if k > 0 else 0
+            tail = fades[k] if k < len(fades) else 0
+            # The body is copied as raw bytes; only the crossfade windows are decoded
+            for block_start in range(start + head, end - tail, block_frames):
+                block_end = min(block_start + block_frames, end - tail)
+                out.write(source[block_start:block_end].tobytes())
+            if tail:
+                next_start = ranges[k + 1][0]
+                fade_out, fade_in = ramps(tail)
+                outgoing = _to_float(np.asarray(source[end - tail:end]), info)
+                incoming = _to_float(np.asarray(source[next_start:next_start + tail]), info)
+                out.write(_from_float(outgoing * fade_out + incoming * fade_in, info))
+    del source
+    return total_frames
+
+
+def read_frames(path: str, info: WavInfo) -> np.ndarray:
+    # Raw frames memory-mapped, one row per frame (24-bit rows hold each sample's three bytes)
+    dtype = _sample_layout(info)
+    row_width = info.channels * (3 if info.bits_per_sample == 24 else 1)
+    return np.memmap(path, dtype=dtype, mode='r', offset=info.data_offset, shape=(info.frames, row_width))
+
+
+def to_mono(frames: np.ndarray, info: WavInfo) -> np.ndarray:
+    return _to_float(np.asarray(frames), info).mean(axis=1)
+
+
+def write_wav_frames(source_path: str, first: int, last: int, output_path: str, block_frames: int = 1 << 16) -> int:
+    """Copy frames [first, last) of a WAV file into a WAV file of their own. Returns the number of frames written."""
+    info = read_wav_info(source_path)
+    source = read_frames(source_path, info)
+    first, last = max(first, 0), min(last, info.frames)
+    with open(output_path, 'wb') as out:
+        _write_header(out, info, max(last - first, 0) * info.frame_size)
+        for block_start in range(first, last, block_frames):
+            out.write(source[block_start:min(block_start + block_frames, last)].tobytes())
+    del source
+    return max(last - first, 0)
@@ -1,47 +1,335 @@
-from src.openai_client import OpenAIClient
+from src.alignment import align_edit
+from src.audio_renderer import render_wav
+from src.chunk_bisection import bisect_chunk, stitch_alignments
+from src.cut_list import keep_intervals, keep_mask, removed_masks_from_output, write_cut_list
+from src.disfluency import chunk_masks, condense, content_word_count, disfluency_mask, expand
+from src.llm_engine import LLMEngine
+from src.output_writer import FAILURE_PLACEHOLDER, OrderedOutputWriter, RunManifest, chunk_hash
+from src.pipeline import StagedPipeline, make_strategy
+from src.removal_spans import render_strikethrough, split_words
+from src.run_planner import RunPlanner, cached_word_table
+from src.request_policy import ChunkFailure, ChunkResult, ChunkSuccess, is_retryable
+from src.streaming import DivergenceMonitor, StreamDiverged, stream_listener
+from src.tracing import get_tracer
 from src.transcriber.chunked_transcriber import ChunkedTranscriber
-import concurrent.futures
+from dataclasses import asdict
+from typing import Dict, Optional
+import asyncio
+import json
+import os
+import time
 
 class AudioTranscriptProcessor:
-    def __init__(self, chunk_size=1000):
-        self.openai_client = OpenAIClient()
-        self.chunked_transcriber = ChunkedTranscriber(chunk_size)
+    def __init__(self, chunk_size=1000, max_concurrency=32, initial_concurrency=10, use_cache=None,
+                 response_mode="strikethrough", drift_threshold=0.05, max_drift_retries=2, budget=None,
+                 max_split_depth=3, min_split_words=100, chunk_tokens=None, content_defined_chunks=False,
+                 strategy="two_call", stage_concurrency=None, stream=False, abort_drift=0.3, prepass=None,
+                 segmented_transcriber=None):
+        # stage_concurrency maps a model to its own request limit, e.g. {"episode-editor-marking": 48}
+        self.engine = LLMEngine(initial_concurrency=initial_concurrency, max_concurrency=max_concurrency,
+                                budget=budget, model_concurrency=stage_concurrency)
+        self.openai_client = make_strategy(strategy, engine=self.engine, use_cache=use_cache,
+                                           response_mode=response_mode)
+        self.pipeline = StagedPipeline(self.openai_client, stage_concurrency, default_concurrency=max_concurrency)
+        # A SegmentedTranscriber transcribes WAV sources in parallel pieces and lets editing start on the
+        # first of them; chunking is then content-defined so early chunks keep their boundaries
+        self.segmented_transcriber = segmented_transcriber
+        self.chunked_transcriber = ChunkedTranscriber(chunk_size, token_budget=chunk_tokens,
+                                                      content_defined=content_defined_chunks
+                                                      or segmented_transcriber is not None)
         self.chunk_size = chunk_size
+        self.drift_threshold = drift_threshold
+        self.max_drift_retries = max_drift_retries
+        # Failing chunks are bisected down to pieces of roughly min_split_words words
+        self.max_split_depth = max_split_depth
+        self.min_split_words = min_split_words
+        # Streamed edits are aligned as they arrive and cut off once their drift passes abort_drift
+        self.stream = stream
+        self.abort_drift = abort_drift
+        # A DisfluencyConfig strikes fillers and stutters locally, so the model only sees what is left
+        self.prepass = prepass
 
     def process_chunk(self, chunk):
         try:
             return self.openai_client.process_chunk(chunk.strip())
         except Exception:
-            return "OpenAI Call Failure"
-
-    def process_audio_file(self, audio_file_path):
-        # Generate transcript chunks from the audio file
-        chunks = self.chunked_transcriber.chunk_sentences(audio_file_path)
-        edited_markdown_file = f"/Users/adi/Documents/GitHub/video_editor/tmp/metaculus_{self.chunk_size}_gpt4.md"
-
-        # Process chunks in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_chunk = {executor.submit(self.process_chunk, chunk): i for i, chunk in enumerate(chunks)}
-            results = [None] * len(chunks)
-            for future in concurrent.futures.as_completed(future_to_chunk):
-                index = future_to_chunk[future]
-                try:
-                    results[index] = future.result()
-                except Exception as e:
-                    results[index] = "OpenAI Call Failure"
-
-        # Write results to the markdown file in order
+            return FAILURE_PLACEHOLDER
+
+    async def aprocess_chunk(self, chunk, refresh=False, on_progress=None):
+        # Errors propagate; averify_chunk turns them into a typed ChunkFailure
+        if not self.stream:
+            return await self.pipeline.process(chunk.strip(), refresh=refresh)
+        monitor = DivergenceMonitor(chunk.strip(), self.abort_drift, on_progress=on_progress)
+        token = stream_listener.set(monitor.update)
+        try:
+            return await self.pipeline.process(chunk.strip(), refresh=refresh)
+        finally:
+            stream_listener.reset(token)
+
+    async def averify_chunk(self, chunk, index=0, on_progress=None, refresh=False,
+                            sentence_starts=None) -> ChunkResult:
+        alignment, attempts, error, splits = await self._averify_alignment(chunk, on_progress=on_progress,
+                                                                           refresh=refresh,
+                                                                           sentence_starts=sentence_starts)
+        if alignment is None:
+            return ChunkFailure(index, f"{type(error).__name__}: {error}", attempts, retryable=is_retryable(error))
+        return ChunkSuccess(index, alignment.text, attempts, drift=alignment.drift, metrics={"splits": splits})
+
+    async def _averify_alignment(self, chunk, depth=0, on_progress=None, refresh=False, sentence_starts=None):
+        # Re-queue the chunk while the model output drifts from the source, then project the
+        # best attempt's removals back onto the original words so the output is always faithful
+        best = None
+        attempts = 0
+        error = None
+        for attempt in range(self.max_drift_retries + 1):
+            attempts += 1
+            try:
+                result = await self.aprocess_chunk(chunk, refresh=refresh or attempt > 0, on_progress=on_progress)
+            except StreamDiverged as e:
+                # Cut off mid-generation; retry like any other drifting attempt
+                error = e
+                continue
+            except Exception as e:
+                # The engine has already retried transient errors
+                error = e
+                break
+            alignment = align_edit(chunk.strip(), result)
+            if best is None or alignment.drift < best.drift:
+                best = alignment
+            if alignment.drift <= self.drift_threshold:
+                return best, attempts, None, 0
+
+        # Unparsable, truncated or drifting output: halve the chunk at a sentence or speaker boundary.
+        # Transient failures are left alone since smaller requests would not fare any better.
+        halves = None
+        if depth < self.max_split_depth and (error is None or not is_retryable(error)):
+            halves = bisect_chunk(chunk.strip(), self.min_split_words, sentence_starts)
+        if halves is not None:
+            (left, left_attempts, left_error, left_splits), (right, right_attempts, right_error, right_splits) = \
+                await asyncio.gather(self._averify_alignment(halves.left, depth + 1, refresh=refresh,
+                                                             sentence_starts=halves.left_sentence_starts),
+                                     self._averify_alignment(halves.right, depth + 1, refresh=refresh,
+                                                             sentence_starts=halves.right_sentence_starts))
+            attempts += left_attempts + right_attempts
+            if left is not None and right is not None:
+                stitched = stitch_alignments(chunk.strip(), halves, left, right)
+                if best is None or stitched.drift < best.drift:
+                    return stitched, attempts, None, 1 + left_splits + right_splits
+            error = error or left_error or right_error
+        return best, attempts, error, 0
+
+    async def averify_prestruck(self, chunk, struck, index=0, on_progress=None, refresh=False,
+                                sentence_starts=None) -> ChunkResult:
+        # The model edits only the words the pre-pass kept; its removals are merged with the local ones
+        words = split_words(chunk)
+        condensed = condense(words, struck)
+        metrics = {"prestruck": sum(struck)}
+        if content_word_count(condensed.text) < self.prepass.min_model_words:
+            return ChunkSuccess(index, render_strikethrough(words, struck), 0, drift=0.0,
+                                metrics={**metrics, "splits": 0, "local": True})
+        if sentence_starts is not None:
+            # A sentence whose first words were struck now opens at its first kept word
+            sentence_starts = [k for k, position in enumerate(condensed.positions)
+                               if any((k == 0 or condensed.positions[k - 1] < start) and start <= position
+                                      for start in sentence_starts)]
+        result = await self.averify_chunk(condensed.text, index, on_progress=on_progress, refresh=refresh,
+                                          sentence_starts=sentence_starts)
+        if isinstance(result, ChunkFailure):
+            return result
+        removed = expand(len(words), struck, condensed, align_edit(condensed.text, result.text).removed)
+        return ChunkSuccess(index, render_strikethrough(words, removed), result.attempts, drift=result.drift,
+                            metrics={**result.metrics, **metrics})
+
+    async def averify_indexed_chunk(self, chunks, index, prestruck=None, refresh=False, on_progress=None,
+                                    episode=None, sentences=None) -> ChunkResult:
+        sentence_starts = sentences[index] if sentences is not None else None
+        with get_tracer().span("chunk", episode=episode, chunk=index) as span:
+            if prestruck is not None and any(prestruck[index]):
+                result = await self.averify_prestruck(chunks[index], prestruck[index], index, on_progress, refresh,
+                                                      sentence_starts)
+            else:
+                result = await self.averify_chunk(chunks[index], index, on_progress=on_progress, refresh=refresh,
+                                                  sentence_starts=sentence_starts)
+            span.set(failed=isinstance(result, ChunkFailure), attempts=result.attempts)
+        return result
+
+    def submit_result(self, writer, index, result):
+        if isinstance(result, ChunkFailure):
+            print(f"Chunk {index} failed after {result.attempts} attempts: {result.error}")
+            writer.submit(index, FAILURE_PLACEHOLDER, failed=True, attempts=result.attempts, error=result.error)
+        else:
+            writer.submit(index, result.text, drift=result.drift, attempts=result.attempts, **result.metrics)
+
+    async def aprocess_indexed_chunk(self, chunks, index, writer, prestruck=None, refresh=False,
+                                     sentences=None) -> ChunkResult:
+        writer.start(index)
+        result = await self.averify_indexed_chunk(chunks, index, prestruck, refresh,
+                                                  lambda text: writer.progress(index, text), writer.manifest.source,
+                                                  sentences)
+        self.submit_result(writer, index, result)
+        return result
+
+    async def arun_chunks(self, chunks, writer, prestruck=None, refresh=False, sentences=None):
+        # Chunks finished by an earlier run are copied from its output instead of re-issued
+        pending = [i for i in range(len(chunks)) if not writer.is_reused(i)]
+        return await self.engine.map(
+            pending, lambda index: self.aprocess_indexed_chunk(chunks, index, writer, prestruck, refresh, sentences))
+
+    async def aprocess_chunks(self, chunks, writer, prestruck=None, sentences=None):
+        try:
+            return await self.arun_chunks(chunks, writer, prestruck, sentences=sentences)
+        finally:
+            await self.pipeline.aclose()
+            await self.engine.aclose()
+
+    async def aprocess_segmented(self, audio_file_path, edited_markdown_file, resume=True):
+        # Chunks are edited as soon as the segments under them are transcribed. The writer needs every
+        # chunk's hash, so the output is written once the last segment has landed.
+        previous = RunManifest.load(f"{edited_markdown_file}.manifest.json") if resume else None
+        done = previous.completed_outputs() if previous and os.path.exists(edited_markdown_file) else {}
+        tasks: Dict[int, Optional[asyncio.Future]] = {}
+        started: Dict[int, float] = {}
+        table, transcript_chunks, chunks, prestruck, sentences = None, [], [], None, None
+        try:
+            with get_tracer().span("segmented_episode", episode=audio_file_path):
+                async for table, transcript_chunks in self.segmented_transcriber.aiter_chunks(
+                        audio_file_path, self.chunked_transcriber):
+                    chunks = [chunk.text for chunk in transcript_chunks]
+                    prestruck = self.prestrike(table, transcript_chunks)
+                    sentences = self.sentence_starts(table, transcript_chunks)
+                    hashes = self.chunk_hashes(chunks)
+                    for index in range(len(tasks), len(chunks)):
+                        if hashes[index] in done:
+                            tasks[index] = None
+                            continue
+                        started[index] = time.time()
+                        tasks[index] = asyncio.ensure_future(self.averify_indexed_chunk(
+                            chunks, index, prestruck, episode=audio_file_path, sentences=sentences))
+                with self.open_writer(audio_file_path, transcript_chunks, edited_markdown_file, resume) as writer:
+                    for index in range(len(chunks)):
+                        task = tasks.get(index)
+                        if writer.is_reused(index):
+                            if task is not None:
+                                task.cancel()
+                            continue
+                        writer.start(index, started.get(index))
+                        if task is None:
+                            task = self.averify_indexed_chunk(chunks, index, prestruck, episode=audio_file_path,
+                                                              sentences=sentences)
+                        self.submit_result(writer, index, await task)
+        finally:
+            for task in tasks.values():
+                if task is not None:
+                    task.cancel()
+            await self.pipeline.aclose()
+            await self.engine.aclose()
+        return table, transcript_chunks, writer
+
+    def uses_segments(self, audio_file_path):
+        # Only WAV/PCM sources can be split without decoding; other formats are transcribed whole
+        return self.segmented_transcriber is not None and audio_file_path.lower().endswith(".wav")
+
+    def prepare_episode(self, audio_file_path):
+        # Generate transcript chunks from the audio file, keeping the word index of every token
+        tracer = get_tracer()
+        with tracer.span("word_table", episode=audio_file_path):
+            if self.uses_segments(audio_file_path):
+                table = self.segmented_transcriber.get_word_table(audio_file_path)
+            else:
+                table = self.chunked_transcriber.get_word_table(audio_file_path)
+        with tracer.span("chunking", episode=audio_file_path) as span:
+            transcript_chunks = self.chunked_transcriber.chunk_table(table)
+            span.set(chunks=len(transcript_chunks))
+        return table, transcript_chunks
+
+    def prestrike(self, table, transcript_chunks):
+        # Per chunk, the words the disfluency pre-pass removes; None when the pre-pass is off
+        if self.prepass is None:
+            return None
+        with get_tracer().span("prepass", words=len(table)) as span:
+            mask = disfluency_mask(table, self.prepass)
+            span.set(struck=int(mask.sum()))
+        return chunk_masks(mask, [chunk.word_indices for chunk in transcript_chunks])
+
+    def sentence_starts(self, table, transcript_chunks):
+        # Per chunk, the positions of its words that open one of the transcript's sentences; failing chunks
+        # are bisected at these rather than at punctuation
+        opening = set(int(start) for start in table.sentence_starts)
+        return [[i for i, word in enumerate(chunk.word_indices) if word >= 0 and word in opening]
+                for chunk in transcript_chunks]
+
+    def plan_run(self, audio_file_path, chunk_sizes, concurrencies, strategies=("two_call", "combined"),
+                 planner=None, stage_concurrency=None):
+        # Chunks the cached transcript at each candidate size and predicts the run without calling a model
+        table = cached_word_table(self.chunked_transcriber, audio_file_path)
+        planner = planner or RunPlanner(content_defined=self.chunked_transcriber.content_defined)
+        return planner.plan(table, chunk_sizes, concurrencies, strategies, stage_concurrency)
+
+    def chunk_hashes(self, chunks):
+        # Resume keys; the pre-pass settings shape the output too, so changing them invalidates earlier edits
+        if self.prepass is None:
+            return [chunk_hash(chunk.strip()) for chunk in chunks]
+        settings = json.dumps(asdict(self.prepass), sort_keys=True)
+        return [chunk_hash(f"{chunk.strip()}\n{settings}") for chunk in chunks]
+
+    def open_writer(self, audio_file_path, transcript_chunks, edited_markdown_file, resume=True, redo=None):
+        return OrderedOutputWriter(edited_markdown_file, self.chunk_hashes([c.text for c in transcript_chunks]),
+                                   source=audio_file_path, resume=resume, redo=redo)
+
+    def finish_episode(self, audio_file_path, table, transcript_chunks, writer, edited_markdown_file,
+                       cut_list_file=None, cut_list_format="json", rendered_audio_file=None):
+        print(f"Edited markdown file created at: {edited_markdown_file}")
+        if cut_list_file or rendered_audio_file:
+            intervals = self.export_cut_list(table, transcript_chunks, writer,
+                                             cut_list_file or f"{edited_markdown_file}.cuts.json",
+                                             cut_list_format if cut_list_file else "json",
+                                             media_path=audio_file_path)
+            if rendered_audio_file:
+                # Only WAV/PCM sources can be rendered directly
+                render_wav(audio_file_path, intervals, rendered_audio_file)
+                print(f"Edited audio created at: {rendered_audio_file}")
+
+    def export_cut_list(self, table, transcript_chunks, writer, cut_list_file, cut_list_format="json",
+                        media_path=None, min_cut_ms=250, padding_ms=40):
+        # Removals are recovered from the written output so reused chunks count too
+        texts = [chunk.text for chunk in transcript_chunks]
+        removed = removed_masks_from_output(texts, writer.manifest.read_outputs(writer.output_path))
+        keep = keep_mask(len(table), [chunk.word_indices for chunk in transcript_chunks], removed)
+        intervals = keep_intervals(table.start, table.end, keep, min_cut_ms=min_cut_ms, padding_ms=padding_ms)
+        total_ms = int(table.end[-1]) if len(table) else 0
+        write_cut_list(intervals, cut_list_file, cut_list_format, media_path=media_path, total_ms=total_ms)
+        print(f"Cut list created at: {cut_list_file}")
+        return intervals
+
+    def process_audio_file(self, audio_file_path, edited_markdown_file=None, resume=True,
+                           cut_list_file=None, cut_list_format="json", rendered_audio_file=None):
+        edited_markdown_file = edited_markdown_file or f"/Users/adi/Documents/GitHub/video_editor/tmp/metaculus_{self.chunk_size}_gpt4.md"
+        if self.uses_segments(audio_file_path):
+            try:
+                table, transcript_chunks, writer = asyncio.run(
+                    self.aprocess_segmented(audio_file_path, edited_markdown_file, resume))
+                self.finish_episode(audio_file_path, table, transcript_chunks, writer, edited_markdown_file,
+                                    cut_list_file, cut_list_format, rendered_audio_file)
+            except (OSError, ValueError) as e:
+                print(f"An error occurred while writing to the file: {e}")
+            return
+
+        table, transcript_chunks = self.prepare_episode(audio_file_path)
+        chunks = [chunk.text for chunk in transcript_chunks]
+        prestruck = self.prestrike(table, transcript_chunks)
+        sentences = self.sentence_starts(table, transcript_chunks)
+
+        # Process chunks concurrently; each result is written as soon as all earlier chunks are done
         try:
-            with open(edited_markdown_file, 'w') as outfile:
-                for result in results:
-                    outfile.write(result)
-                    outfile.write('\n\n')  # Add separator between chunks
-            print(f"Edited markdown file created at: {edited_markdown_file}")
-        except Exception as e:
+            with self.open_writer(audio_file_path, transcript_chunks, edited_markdown_file, resume) as writer:
+                asyncio.run(self.aprocess_chunks(chunks, writer, prestruck, sentences))
+            self.finish_episode(audio_file_path, table, transcript_chunks, writer, edited_markdown_file,
+                                cut_list_file, cut_list_format, rendered_audio_file)
+        except (OSError, ValueError) as e:
             print(f"An error occurred while writing to the file: {e}")
 
 # Example usage
 if __name__ == "__main__":
     audio_file_path = "/Users/adi/Downloads/ae_studio.mp3"
     processor = AudioTranscriptProcessor(chunk_size=700)
-    processor.process_audio_file(audio_file_path)
\ No newline at end of file
+    processor.process_audio_file(audio_file_path)
@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from src.audio_transcript_processor import AudioTranscriptProcessor
+from src.disfluency import DEFAULT_FILLERS, DisfluencyConfig
+from src.pipeline import STRATEGIES
+from src.request_budget import SharedRequestBudget
+from src.tracing import configure_tracing, get_tracer
+from src.transcriber.segmented_transcriber import SegmentedTranscriber
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".flac", ".aac", ".ogg", ".mp4", ".mov")
+
+
+@dataclass
+class Episode:
+    path: str
+    output_path: str
+    priority: int = 0
+    # Relative share of the queue among episodes with the same priority
+    weight: float = 1.0
+    cut_list_file: Optional[str] = None
+
+
+def discover_episodes(source: str, output_dir: Optional[str] = None) -> List[Episode]:
+    # A directory is scanned for audio files; a .json/.jsonl manifest lists episodes explicitly
+    def default_output(path: str) -> str:
+        base = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(output_dir or os.path.dirname(os.path.abspath(path)), f"{base}_edited.md")
+
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        )
+        return [Episode(path, default_output(path)) for path in paths]
+
+    with open(source, 'r') as f:
+        if source.endswith(".jsonl"):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+    manifest_dir = os.path.dirname(os.path.abspath(source))
+    episodes = []
+    for entry in entries:
+        path = entry["path"] if os.path.isabs(entry["path"]) else os.path.join(manifest_dir, entry["path"])
+        episodes.append(Episode(
+            path=path,
+            output_path=entry.get("output") or default_output(path),
+            priority=int(entry.get("priority", 0)),
+            weight=float(entry.get("weight", 1.0)),
+            cut_list_file=entry.get("cut_list"),
+        ))
+    return episodes
+
+
+class BatchRunner:
+    """Schedules the chunks of many episodes through one processor, engine and request budget."""
+
+    def __init__(self, processor: AudioTranscriptProcessor, workers: Optional[int] = None, resume: bool = True):
+        self.processor = processor
+        self.workers = workers or processor.engine.max_concurrency
+        self.resume = resume
+        self._sequence = itertools.count()
+
+    def run(self, episodes: List[Episode]):
+        asyncio.run(self.arun(episodes))
+
+    async def arun(self, episodes: List[Episode]):
+        queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        states = {}
+
+        async def prepare(episode_index: int, episode: Episode):
+            try:
+                table, transcript_chunks = await asyncio.to_thread(self.processor.prepare_episode, episode.path)
+                writer = self.processor.open_writer(episode.path, transcript_chunks, episode.output_path, self.resume)
+                writer.open()
+            except Exception as e:
+                # One broken episode must not stop the rest of the batch
+                print(f"Skipping {episode.path}: {e}")
+                return
+            chunks = [chunk.text for chunk in transcript_chunks]
+            prestruck = self.processor.prestrike(table, transcript_chunks)
+            sentences = self.processor.sentence_starts(table, transcript_chunks)
+            pending = [i for i in range(len(chunks)) if not writer.is_reused(i)]
+            states[episode_index] = {"table": table, "chunks": transcript_chunks, "texts": chunks,
+                                     "prestruck": prestruck, "sentences": sentences, "writer": writer,
+                                     "remaining": len(pending)}
+            for position, chunk_index in enumerate(pending):
+                # Higher priority first; within a priority, episodes take turns in proportion to their weight
+                key = (-episode.priority, position / max(episode.weight, 1e-6), next(self._sequence))
+                queue.put_nowait((key, episode_index, chunk_index, time.monotonic()))
+            if not pending:
+                self._finish(episode, states.pop(episode_index))
+
+        async def worker():
+            while True:
+                _, episode_index, chunk_index, enqueued_at = await queue.get()
+                get_tracer().record("episode_queue_wait", time.monotonic() - enqueued_at,
+                                    episode=episodes[episode_index].path, chunk=chunk_index)
+                state = states[episode_index]
+                try:
+                    try:
+                        await self.processor.aprocess_indexed_chunk(state["texts"], chunk_index, state["writer"],
+                                                                   state["prestruck"], sentences=state["sentences"])
+                    except Exception as e:
+                        # A failed write must not take the worker, and with it the queue, down
+                        self._fail_chunk(episodes[episode_index], state["writer"], chunk_index, e)
+                    state["remaining"] -= 1
+                    if state["remaining"] == 0:
+                        self._finish(episodes[episode_index], states.pop(episode_index))
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*(prepare(i, episode) for i, episode in enumerate(episodes)))
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for state in states.values():
+                state["writer"].close()
+            await self.processor.pipeline.aclose()
+            await self.processor.engine.aclose()
+
+    def _fail_chunk(self, episode: Episode, writer, chunk_index: int, error: Exception):
+        print(f"Chunk {chunk_index} of {episode.path} failed: {error}")
+        try:
+            writer.submit(chunk_index, "", failed=True, error=str(error))
+        except Exception as e:
+            print(f"Could not record the failure of chunk {chunk_index} of {episode.path}: {e}")
+
+    def _finish(self, episode: Episode, state):
+        writer = state["writer"]
+        try:
+            writer.close()
+            self.processor.finish_episode(episode.path, state["table"], state["chunks"], writer,
+                                          episode.output_path, episode.cut_list_file)
+        except Exception as e:
+            print(f"An error occurred while finishing {episode.path}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edit a batch of episodes under one shared request budget.")
+    parser.add_argument("source", help="Directory of audio files, or a .json/.jsonl episode manifest")
+    parser.add_argument("--output-dir", help="Where edited transcripts go (defaults to beside each audio file)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-tokens", type=int, default=None,
+                        help="Size chunks by estimated tokens instead of words")
+    parser.add_argument("--content-defined-chunks", action="store_true",
+                        help="Keep chunk boundaries stable across small transcript corrections")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Requests in flight across every batch process on this host")
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    parser.add_argument("--no-resume", action="store_true")
+    parser.add_argument("--strategy", default="two_call", choices=sorted(STRATEGIES))
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream edits, showing the head chunk as it is written and cutting off diverging output")
+    parser.add_argument("--stage-concurrency", action="append", default=[], metavar="MODEL=N",
+                        help="Give one model stage its own request limit; may be repeated")
+    parser.add_argument("--prepass", action="store_true",
+                        help="Strike fillers, stutters and false starts locally before the model sees a chunk")
+    parser.add_argument("--filler", action="append", default=[], metavar="WORDS",
+                        help="Also strike this filler word or phrase in the pre-pass; may be repeated")
+    parser.add_argument("--prepass-confidence", type=float, default=0.5,
+                        help="Leave words below this transcription confidence to the model")
+    parser.add_argument("--segmented", action="store_true",
+                        help="Split WAV episodes at silences and transcribe the pieces in parallel")
+    parser.add_argument("--trace-file", help="Write per-chunk timing spans as JSON lines")
+    parser.add_argument("--metrics-file", help="Write Prometheus text metrics when the batch ends")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus text metrics on this port")
+    args = parser.parse_args()
+
+    configure_tracing(args.trace_file, args.metrics_file, args.metrics_port)
+    stage_concurrency = {}
+    for value in args.stage_concurrency:
+        model, _, limit = value.partition("=")
+        stage_concurrency[model] = int(limit)
+
+    prepass = None
+    if args.prepass:
+        prepass = DisfluencyConfig(fillers=DEFAULT_FILLERS + tuple(args.filler),
+                                   min_confidence=args.prepass_confidence)
+
+    segmented = SegmentedTranscriber() if args.segmented else None
+    budget = SharedRequestBudget(max_concurrency=args.concurrency, tokens_per_minute=args.tokens_per_minute)
+    processor = AudioTranscriptProcessor(chunk_size=args.chunk_size, max_concurrency=args.concurrency,
+                                         initial_concurrency=min(10, args.concurrency), budget=budget,
+                                         chunk_tokens=args.chunk_tokens,
+                                         content_defined_chunks=args.content_defined_chunks,
+                                         strategy=args.strategy, stage_concurrency=stage_concurrency or None,
+                                         stream=args.stream, prepass=prepass,
+                                         segmented_transcriber=segmented)
+    episodes = discover_episodes(args.source, args.output_dir)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    BatchRunner(processor, resume=not args.no_resume).run(episodes)
+    ratio = processor.engine.cached_token_ratio()
+    if ratio is not None:
+        print(f"{processor.engine.usage['requests']} requests, {ratio:.0%} of prompt tokens served from the prompt cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.llm_engine import LLMEngine
+from src.mock_llm_server import MockLLMServer, MockServerConfig
+from src.pipeline import StagedPipeline, make_strategy
+from src.report_format import format_report
+from src.transcriber.chunked_transcriber import ChunkedTranscriber
+from src.transcriber.word_table import WordTable
+
+VOCABULARY = ("the model we forecast question people think really about data work team time good "
+              "thing future world system make question answer because which actually right").split()
+FILLERS = ("um", "uh", "basically")
+
+
+def synthetic_table(words: int = 10000, speakers: int = 2, seed: int = 0) -> WordTable:
+    # Sentences of 4-30 words with occasional fillers, alternating speakers every few sentences
+    rng = random.Random(seed)
+    sentences = []
+    position = 0
+    speaker = "A"
+    while position < words:
+        if rng.random() < 0.2:
+            speaker = chr(ord("A") + rng.randrange(speakers))
+        length = min(rng.randint(4, 30), words - position)
+        tokens = [rng.choice(FILLERS) if rng.random() < 0.05 else rng.choice(VOCABULARY) for _ in range(length)]
+        tokens[-1] += "."
+        sentences.append(SimpleNamespace(speaker=speaker, words=[
+            SimpleNamespace(text=token, start=(position + i) * 300, end=(position + i) * 300 + 250,
+                            confidence=0.95, speaker=speaker)
+            for i, token in enumerate(tokens)
+        ]))
+        position += length
+    return WordTable.from_sentences(sentences)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    return float(np.percentile(values, q)) if values else None
+
+
+async def run_episode(pipeline: StagedPipeline, chunks: List[str]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    failures = 0
+
+    async def process(chunk: str):
+        nonlocal failures
+        start = time.monotonic()
+        try:
+            await pipeline.process(chunk)
+            latencies.append(time.monotonic() - start)
+        except Exception:
+            failures += 1
+
+    start = time.monotonic()
+    try:
+        await pipeline.strategy.engine.map(chunks, process)
+    finally:
+        await pipeline.aclose()
+        await pipeline.strategy.engine.aclose()
+    return {"wall": time.monotonic() - start, "latencies": latencies, "failures": failures}
+
+
+def run_benchmark(base_url: str, chunk_sizes: List[int], concurrencies: List[int], strategies: List[str],
+                  words: int = 10000, response_mode: str = "strikethrough", seed: int = 0) -> List[Dict[str, Any]]:
+    # The clients insist on an API key even though the mock server ignores it
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    table = synthetic_table(words, seed=seed)
+    rows = []
+    for chunk_size in chunk_sizes:
+        chunks = [chunk.text for chunk in ChunkedTranscriber(chunk_size).chunk_table(table)]
+        for concurrency in concurrencies:
+            for strategy in strategies:
+                engine = LLMEngine(api_key="mock", base_url=base_url, initial_concurrency=concurrency,
+                                   min_concurrency=1, max_concurrency=concurrency)
+                client = make_strategy(strategy, engine=engine, use_cache=False, response_mode=response_mode)
+                pipeline = StagedPipeline(client, default_concurrency=concurrency)
+                result = asyncio.run(run_episode(pipeline, chunks))
+                tokens = engine.usage["prompt_tokens"] + engine.usage["completion_tokens"]
+                rows.append({
+                    "strategy": strategy,
+                    "chunk_size": chunk_size,
+                    "concurrency": concurrency,
+                    "chunks": len(chunks),
+                    "failures": result["failures"],
+                    "wall_s": round(result["wall"], 3),
+                    "episodes_per_hour": round(3600 / result["wall"], 1) if result["wall"] else None,
+                    "p50_chunk_s": percentile(result["latencies"], 50),
+                    "p99_chunk_s": percentile(result["latencies"], 99),
+                    "requests": engine.usage["requests"],
+                    "hedges": engine.hedges_sent,
+                    "prompt_tokens": engine.usage["prompt_tokens"],
+                    "completion_tokens": engine.usage["completion_tokens"],
+                    "cached_token_ratio": engine.cached_token_ratio(),
+                    "tokens_per_chunk": round(tokens / len(chunks), 1) if chunks else 0,
+                })
+    return rows
+
+
+REPORT_COLUMNS = ["strategy", "chunk_size", "concurrency", "chunks", "failures", "wall_s", "episodes_per_hour",
+                  "p50_chunk_s", "p99_chunk_s", "requests", "tokens_per_chunk", "cached_token_ratio"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the editing pipeline against a local mock LLM server.")
+    parser.add_argument("--chunk-sizes", default="500,1000", help="Comma-separated chunk sizes in words")
+    parser.add_argument("--concurrency", default="8,32", help="Comma-separated concurrency limits")
+    parser.add_argument("--strategies", default="two_call,combined")
+    parser.add_argument("--words", type=int, default=10000, help="Length of the synthetic episode")
+    parser.add_argument("--response-mode", default="strikethrough", choices=["strikethrough", "spans"])
+    parser.add_argument("--base-url", help="Benchmark an already running server instead of starting a mock")
+    parser.add_argument("--latency-median", type=float, default=1.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per configuration")
+    args = parser.parse_args()
+
+    def sweep(base_url):
+        return run_benchmark(base_url, [int(v) for v in args.chunk_sizes.split(",")],
+                             [int(v) for v in args.concurrency.split(",")], args.strategies.split(","),
+                             args.words, args.response_mode)
+
+    if args.base_url:
+        rows = sweep(args.base_url)
+    else:
+        config = MockServerConfig(args.latency_median, args.latency_sigma, args.tokens_per_second,
+                                  args.error_rate, args.rate_limit_rate, args.truncate_rate, seed=0)
+        with MockLLMServer(config) as server:
+            rows = sweep(server.base_url)
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+    else:
+        print(format_report(rows, REPORT_COLUMNS))
+
+
+if __name__ == "__main__":
+    main()
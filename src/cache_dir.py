@@ -0,0 +1,10 @@
+import os
+from typing import Optional
+
+
+def get_cache_dir(subdir: Optional[str] = None) -> str:
+    # VIDEO_EDITOR_CACHE_DIR lets batch workers share one cache location
+    base = os.getenv("VIDEO_EDITOR_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "video_editor")
+    path = os.path.join(base, subdir) if subdir else base
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,76 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from src.alignment import AlignmentResult
+from src.removal_spans import is_speaker_tag, render_strikethrough, split_words
+
+SENTENCE_END_PATTERN = re.compile(r"[.!?][\"')\]]*$")
+
+
+@dataclass
+class ChunkHalves:
+    left: str
+    right: str
+    # True when the right half was given a copy of the current speaker tag so it reads on its own
+    tag_added: bool
+    # Known sentence starts carried into each half, re-based to its own word positions
+    left_sentence_starts: Optional[List[int]] = None
+    right_sentence_starts: Optional[List[int]] = None
+
+
+def split_point(words: List[str], sentence_starts: Optional[Iterable[int]] = None) -> Optional[int]:
+    # The boundary nearest the middle wins; a speaker turn beats a sentence end at the same distance.
+    # sentence_starts are the positions of the words that open one of the transcript's sentences; without
+    # them, as for text-only transcripts, sentence ends are read from the punctuation.
+    starts = set(sentence_starts) if sentence_starts is not None else None
+    middle = len(words) / 2
+    best = None
+    best_key = None
+    for i in range(1, len(words)):
+        if is_speaker_tag(words[i]):
+            key = (abs(i - middle), 0)
+        elif is_speaker_tag(words[i - 1]):
+            continue
+        elif i in starts if starts is not None else SENTENCE_END_PATTERN.search(words[i - 1]):
+            key = (abs(i - middle), 1)
+        else:
+            continue
+        if best_key is None or key < best_key:
+            best, best_key = i, key
+    return best
+
+
+def bisect_chunk(chunk: str, min_words: int = 100,
+                 sentence_starts: Optional[List[int]] = None) -> Optional[ChunkHalves]:
+    words = split_words(chunk)
+    if sum(1 for word in words if not is_speaker_tag(word)) < 2 * min_words:
+        return None
+    # A single run-on sentence is still split, at the middle word
+    index = split_point(words, sentence_starts) or len(words) // 2
+    left, right = words[:index], words[index:]
+    tag_added = False
+    if not is_speaker_tag(right[0]):
+        speaker = next((word for word in reversed(left) if is_speaker_tag(word)), None)
+        if speaker:
+            right = [speaker] + right
+            tag_added = True
+    halves = ChunkHalves(" ".join(left), " ".join(right), tag_added)
+    if sentence_starts is not None:
+        halves.left_sentence_starts = [p for p in sentence_starts if p < index]
+        halves.right_sentence_starts = [p - index + tag_added for p in sentence_starts if p > index]
+    return halves
+
+
+def stitch_alignments(chunk: str, halves: ChunkHalves, left: AlignmentResult, right: AlignmentResult) -> AlignmentResult:
+    words = split_words(chunk)
+    removed = left.removed + (right.removed[1:] if halves.tag_added else right.removed)
+    total = max(len(left.removed) + len(right.removed), 1)
+    return AlignmentResult(
+        text=render_strikethrough(words, removed),
+        removed=removed,
+        drift=(left.drift * len(left.removed) + right.drift * len(right.removed)) / total,
+        matched=left.matched + right.matched,
+        dropped=left.dropped + right.dropped,
+        inserted=left.inserted + right.inserted,
+    )
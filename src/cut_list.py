@@ -0,0 +1,128 @@
+import json
+import os
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.alignment import align_edit
+from src.removal_spans import split_words
+
+
+def keep_mask(word_count: int, chunk_word_indices: Iterable[Sequence[int]],
+              chunk_removed: Iterable[Sequence[bool]]) -> np.ndarray:
+    # Scatter each chunk's per-token removal flags onto the episode's word indices
+    keep = np.ones(word_count, dtype=bool)
+    for indices, removed in zip(chunk_word_indices, chunk_removed):
+        indices = np.asarray(indices, dtype=np.int64)
+        removed = np.asarray(removed, dtype=bool)
+        timed = indices >= 0
+        keep[indices[timed & removed]] = False
+    return keep
+
+
+def keep_intervals(start: np.ndarray, end: np.ndarray, keep: np.ndarray,
+                   min_cut_ms: int = 250, padding_ms: int = 40) -> np.ndarray:
+    """Merge kept words into [start, end) millisecond intervals.
+
+    Consecutive kept words stay joined when nothing was removed between them, or when the
+    removed stretch is shorter than min_cut_ms and not worth a cut.
+    """
+    kept = np.flatnonzero(keep)
+    if kept.size == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    removed_between = np.diff(kept) > 1
+    gap = start[kept[1:]] - end[kept[:-1]]
+    breaks = np.flatnonzero(removed_between & (gap >= min_cut_ms))
+    first = kept[np.concatenate(([0], breaks + 1))]
+    last = kept[np.concatenate((breaks, [kept.size - 1]))]
+
+    intervals = np.stack((start[first] - padding_ms, end[last] + padding_ms), axis=1).astype(np.int64)
+    intervals[:, 0] = np.maximum(intervals[:, 0], 0)
+    # Padding can make neighbours overlap; fold those together
+    running_end = np.maximum.accumulate(intervals[:, 1])
+    starts_new = np.concatenate(([True], intervals[1:, 0] > running_end[:-1]))
+    group_starts = np.flatnonzero(starts_new)
+    group_ends = np.concatenate((group_starts[1:], [len(intervals)])) - 1
+    return np.stack((intervals[group_starts, 0], running_end[group_ends]), axis=1)
+
+
+def cut_intervals(keep: np.ndarray, total_ms: Optional[int] = None) -> np.ndarray:
+    if keep.size == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    bounds = np.concatenate(([0], keep.ravel(), [total_ms if total_ms is not None else keep[-1, 1]]))
+    cuts = bounds.reshape(-1, 2)
+    return cuts[cuts[:, 1] > cuts[:, 0]]
+
+
+def removed_masks_from_output(chunk_texts: Sequence[str], edited_texts: Sequence[str]) -> List[List[bool]]:
+    masks = []
+    for chunk, edited in zip(chunk_texts, edited_texts):
+        if edited is None:
+            masks.append([False] * len(split_words(chunk)))
+        else:
+            masks.append(align_edit(chunk, edited).removed)
+    return masks
+
+
+def _frames(ms: int, fps: int) -> int:
+    return int(round(ms * fps / 1000))
+
+
+def _timecode(frames: int, fps: int) -> str:
+    hours, frames = divmod(frames, 3600 * fps)
+    minutes, frames = divmod(frames, 60 * fps)
+    seconds, frames = divmod(frames, fps)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
+
+
+def to_json(keep: np.ndarray, total_ms: Optional[int] = None) -> str:
+    return json.dumps({
+        "unit": "ms",
+        "keep": keep.tolist(),
+        "cut": cut_intervals(keep, total_ms).tolist(),
+    })
+
+
+def to_edl(keep: np.ndarray, media_path: str, fps: int = 30, title: str = "Edited Episode") -> str:
+    lines = [f"TITLE: {title}", "FCM: NON-DROP FRAME", ""]
+    record = 0
+    clip_name = os.path.basename(media_path)
+    for event, (begin, end) in enumerate(keep.tolist(), start=1):
+        # Work in whole frames so the record timeline never drifts from the source durations
+        source_in, source_out = _frames(begin, fps), _frames(end, fps)
+        duration = source_out - source_in
+        lines.append(
+            f"{event:03d}  AX       AA/V  C        "
+            f"{_timecode(source_in, fps)} {_timecode(source_out, fps)} "
+            f"{_timecode(record, fps)} {_timecode(record + duration, fps)}"
+        )
+        lines.append(f"* FROM CLIP NAME: {clip_name}")
+        record += duration
+    return "\n".join(lines) + "\n"
+
+
+def to_ffmpeg_concat(keep: np.ndarray, media_path: str) -> str:
+    escaped = media_path.replace("'", "'\\''")
+    lines = ["ffconcat version 1.0"]
+    for begin, end in keep.tolist():
+        lines.append(f"file '{escaped}'")
+        lines.append(f"inpoint {begin / 1000:.3f}")
+        lines.append(f"outpoint {end / 1000:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_cut_list(keep: np.ndarray, path: str, fmt: str = "json", media_path: Optional[str] = None,
+                   total_ms: Optional[int] = None):
+    if fmt == "json":
+        content = to_json(keep, total_ms)
+    elif fmt == "edl":
+        content = to_edl(keep, media_path or "source")
+    elif fmt == "ffmpeg":
+        if not media_path:
+            raise ValueError("media_path is required for an ffmpeg concat script")
+        content = to_ffmpeg_concat(keep, media_path)
+    else:
+        raise ValueError(f"Unknown cut list format: {fmt}")
+    with open(path, 'w') as f:
+        f.write(content)
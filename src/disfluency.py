@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.alignment import normalize_word
+from src.removal_spans import is_speaker_tag, split_words
+from src.transcriber.word_table import WordTable
+
+DEFAULT_FILLERS = ("um", "umm", "uh", "uhm", "erm", "er", "ah", "hmm", "mm")
+# Words whose doubling is usually grammatical ("had had", "that that", "what it is is", "do do") rather than a stutter
+DEFAULT_REPEAT_EXCEPTIONS = ("had", "that", "is", "do")
+
+
+@dataclass
+class DisfluencyConfig:
+    # Fillers may be phrases, e.g. "you know"; they are matched on normalized words
+    fillers: Tuple[str, ...] = DEFAULT_FILLERS
+    repeat_exceptions: Tuple[str, ...] = DEFAULT_REPEAT_EXCEPTIONS
+    # Longest phrase whose immediate repetition is struck
+    max_repeat: int = 3
+    # Words the transcriber is unsure of are left for the model
+    min_confidence: float = 0.5
+    # Chunks with fewer words left than this are finished locally, without a model call
+    min_model_words: int = 12
+
+
+@dataclass
+class CondensedChunk:
+    text: str
+    # Position in the full chunk of every token of text
+    positions: List[int]
+
+
+def _windows_all(values: np.ndarray, width: int) -> np.ndarray:
+    # result[i] is True when values[i:i + width] are all True
+    result = values[:len(values) - width + 1].copy()
+    for k in range(1, width):
+        result &= values[k:len(values) - width + 1 + k]
+    return result
+
+
+def disfluency_mask(table: WordTable, config: DisfluencyConfig = DisfluencyConfig()) -> np.ndarray:
+    # Marks fillers, truncated false starts and the first copy of immediately repeated phrases
+    count = len(table)
+    removed = np.zeros(count, dtype=bool)
+    if count == 0:
+        return removed
+    raw = np.asarray(table.text, dtype=str)
+    tokens = np.asarray([normalize_word(word) for word in table.text], dtype=str)
+    confident = table.confidence >= config.min_confidence
+    spoken = tokens != ""
+
+    for filler in config.fillers:
+        phrase = [normalize_word(word) for word in filler.split()]
+        width = len(phrase)
+        if not width or width > count:
+            continue
+        match = _windows_all(confident, width)
+        for k, token in enumerate(phrase):
+            match &= tokens[k:count - width + 1 + k] == token
+        # A phrase never spans a change of speaker
+        match &= table.speaker[:count - width + 1] == table.speaker[width - 1:]
+        for k in range(width):
+            removed[k:count - width + 1 + k] |= match
+
+    # "th-" or "wh—": a word cut off before it was finished
+    truncated = np.char.endswith(raw, "-") | np.char.endswith(raw, "—")
+    removed |= truncated & spoken & confident
+
+    # Repetitions are found with the fillers already gone, so "I, um, I think" counts as a repeat
+    kept = np.flatnonzero(~removed & spoken)
+    sequence = tokens[kept]
+    speakers = table.speaker[kept]
+    sure = confident[kept]
+    struck = np.zeros(len(kept), dtype=bool)
+    exceptions = np.asarray([normalize_word(word) for word in config.repeat_exceptions], dtype=str)
+    for width in range(config.max_repeat, 0, -1):
+        starts = len(kept) - 2 * width + 1
+        if starts <= 0:
+            continue
+        match = _windows_all(sure, 2 * width)
+        for k in range(width):
+            match &= sequence[k:k + starts] == sequence[width + k:width + k + starts]
+        match &= speakers[:starts] == speakers[2 * width - 1:2 * width - 1 + starts]
+        if width == 1:
+            match &= ~np.isin(sequence[:starts], exceptions)
+        # The first copy goes; the speaker's final attempt stays
+        for k in range(width):
+            struck[k:k + starts] |= match
+    removed[kept[struck]] = True
+    return removed
+
+
+def chunk_masks(mask: np.ndarray, chunk_word_indices: Sequence[Sequence[int]]) -> List[List[bool]]:
+    # Speaker tags carry index -1 and are never struck
+    return [[index >= 0 and bool(mask[index]) for index in indices] for indices in chunk_word_indices]
+
+
+def condense(words: List[str], struck: List[bool]) -> CondensedChunk:
+    # Drops struck words, and any speaker tag left with nothing after it
+    positions = [i for i, word in enumerate(words) if not struck[i]]
+    positions = [i for n, i in enumerate(positions) if not is_speaker_tag(words[i])
+                 or (n + 1 < len(positions) and not is_speaker_tag(words[positions[n + 1]]))]
+    return CondensedChunk(" ".join(words[i] for i in positions), positions)
+
+
+def expand(word_count: int, struck: List[bool], condensed: CondensedChunk, removed: List[bool]) -> List[bool]:
+    # Merges the model's removals on the condensed text with the words struck locally
+    merged = list(struck[:word_count])
+    for position, gone in zip(condensed.positions, removed):
+        merged[position] = merged[position] or gone
+    return merged
+
+
+def content_word_count(text: str) -> int:
+    return sum(1 for word in split_words(text) if not is_speaker_tag(word) and normalize_word(word))
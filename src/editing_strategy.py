@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List
+
+
+@dataclass
+class Stage:
+    # run(chunk, previous stage's result, refresh) -> this stage's result; the last stage returns the edited text
+    model: str
+    run: Callable[[str, Any, bool], Awaitable[Any]]
+
+
+class EditingStrategy(ABC):
+    """Common interface of the editing clients: the model stages each chunk passes through, in order."""
+
+    @abstractmethod
+    def stages(self) -> List[Stage]:
+        ...
+
+    async def aprocess_chunk(self, chunk: str, refresh: bool = False) -> str:
+        result = None
+        for stage in self.stages():
+            result = await stage.run(chunk, result, refresh)
+        return result
@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Any, Dict, Optional
+
+from src.cache_dir import get_cache_dir
+
+
+def default_socket_path() -> str:
+    return os.getenv("VIDEO_EDITOR_SOCKET") or os.path.join(get_cache_dir(), "editor.sock")
+
+
+def send_job(job: Dict[str, Any], socket_path: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+    # One JSON line out, one JSON line back
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(socket_path or default_socket_path())
+        conn.sendall(json.dumps(job).encode("utf-8") + b"\n")
+        with conn.makefile("rb") as reply:
+            line = reply.readline()
+    if not line:
+        raise ConnectionError("The editor daemon closed the connection without replying")
+    return json.loads(line)
+
+
+def main():
+    # Deliberately light: only the standard library is imported, the daemon holds everything else
+    parser = argparse.ArgumentParser(description="Send a job to a running editor daemon")
+    parser.add_argument("--socket", help="Daemon socket (defaults to $VIDEO_EDITOR_SOCKET or the cache directory)")
+    parser.add_argument("--timeout", type=float, default=None)
+    jobs = parser.add_subparsers(dest="job", required=True)
+    process = jobs.add_parser("process", help="Edit every chunk of an audio file that is not already done")
+    process.add_argument("path")
+    process.add_argument("--output")
+    process.add_argument("--cut-list")
+    edit = jobs.add_parser("edit", help="Re-edit the chunks from START up to but not including END")
+    edit.add_argument("path")
+    edit.add_argument("start", type=int)
+    edit.add_argument("end", type=int)
+    edit.add_argument("--output")
+    edit.add_argument("--cut-list")
+    edit.add_argument("--cached", action="store_true", help="Accept cached model responses for the range")
+    for name in ("ping", "stats", "shutdown"):
+        jobs.add_parser(name)
+    args = parser.parse_args()
+
+    job: Dict[str, Any] = {"job": args.job}
+    if args.job in ("process", "edit"):
+        # The daemon may run from another directory
+        job.update(path=os.path.abspath(args.path),
+                   output=os.path.abspath(args.output) if args.output else None,
+                   cut_list=os.path.abspath(args.cut_list) if args.cut_list else None)
+    if args.job == "edit":
+        job.update(start=args.start, end=args.end, refresh=not args.cached)
+
+    try:
+        reply = send_job(job, args.socket, args.timeout)
+    except OSError as e:
+        print(f"Could not reach the editor daemon: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(reply, indent=2))
+    if not reply.get("ok"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
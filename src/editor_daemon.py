@@ -0,0 +1,215 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from src.audio_transcript_processor import AudioTranscriptProcessor
+from src.disfluency import DisfluencyConfig
+from src.editor_client import default_socket_path
+from src.pipeline import STRATEGIES
+from src.request_policy import ChunkFailure
+
+# Episodes whose word table and chunks stay in memory between jobs
+MAX_EPISODES = 8
+
+
+class JobError(Exception):
+    """A job that cannot be run as sent; reported to the client instead of stopping the daemon."""
+
+
+class EditorDaemon:
+    """Keeps one processor warm, with its clients, connection pools, caches and episode chunks, and runs jobs
+    sent as JSON lines over a Unix socket."""
+
+    def __init__(self, processor: AudioTranscriptProcessor, socket_path: Optional[str] = None,
+                 max_episodes: int = MAX_EPISODES):
+        self.processor = processor
+        self.socket_path = socket_path or default_socket_path()
+        self.max_episodes = max_episodes
+        self.started_at = time.time()
+        self.jobs = 0
+        self._episodes: OrderedDict = OrderedDict()
+        # Jobs writing the same output file run one at a time; each lock counts the jobs holding or awaiting it
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self._server = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self._stopped = asyncio.Event()
+        if os.path.exists(self.socket_path):
+            # Left behind by a daemon that did not shut down cleanly
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        # Jobs name files to read and write, so only the owner may connect
+        os.chmod(self.socket_path, 0o600)
+        print(f"Editor daemon listening on {self.socket_path}")
+        try:
+            await self._stopped.wait()
+        finally:
+            self._server.close()
+            await self._server.wait_closed()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            await self.processor.pipeline.aclose()
+            await self.processor.engine.aclose()
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self.handle_line(line)
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line: bytes) -> Dict[str, Any]:
+        start = time.monotonic()
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise JobError("A job must be a JSON object")
+            reply = await self.run_job(job)
+            reply["ok"] = True
+        except (JobError, KeyError, OSError, ValueError) as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            # Anything else is logged too, but the daemon keeps serving
+            print(f"Job failed: {type(e).__name__}: {e}")
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        reply["seconds"] = round(time.monotonic() - start, 6)
+        return reply
+
+    async def run_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        kind = job.get("job")
+        if kind == "ping":
+            return {}
+        if kind == "stats":
+            return self.stats()
+        if kind == "shutdown":
+            self.stop()
+            return {}
+        if kind not in ("process", "edit"):
+            raise JobError(f"Unknown job {kind!r}")
+        if not job.get("path"):
+            raise JobError("The job has no path")
+        self.jobs += 1
+        redo = None
+        if kind == "edit":
+            redo = range(int(job["start"]), int(job["end"]))
+        return await self.run_episode(job["path"], job.get("output"), redo=redo,
+                                      refresh=bool(job.get("refresh", False)), cut_list_file=job.get("cut_list"))
+
+    async def episode(self, path: str):
+        # The word table and chunks are reused until the audio file changes. The cache holds the future
+        # preparing them, so jobs arriving while an episode is prepared wait for it instead of repeating it.
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._episodes.get(path)
+        if cached is not None and cached[0] == version:
+            self._episodes.move_to_end(path)
+        else:
+            cached = (version, asyncio.ensure_future(self._prepare(path)))
+            self._episodes[path] = cached
+            while len(self._episodes) > self.max_episodes:
+                self._episodes.popitem(last=False)
+        try:
+            return await asyncio.shield(cached[1])
+        except Exception:
+            # A failed preparation is not cached; the next job tries again
+            if self._episodes.get(path) is cached:
+                del self._episodes[path]
+            raise
+
+    async def _prepare(self, path: str):
+        table, transcript_chunks = await asyncio.to_thread(self.processor.prepare_episode, path)
+        return (table, transcript_chunks, self.processor.prestrike(table, transcript_chunks),
+                self.processor.sentence_starts(table, transcript_chunks))
+
+    @asynccontextmanager
+    async def _writing(self, output: str):
+        # The lock is dropped once no job holds or awaits it, so the table only holds outputs in use
+        lock, users = self._locks.get(output, (asyncio.Lock(), 0))
+        self._locks[output] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[output]
+            if users == 1:
+                del self._locks[output]
+            else:
+                self._locks[output] = (lock, users - 1)
+
+    async def run_episode(self, path: str, output: Optional[str] = None, redo: Optional[range] = None,
+                          refresh: bool = False, cut_list_file: Optional[str] = None) -> Dict[str, Any]:
+        table, transcript_chunks, prestruck, sentences = await self.episode(path)
+        if redo is not None and (redo.start < 0 or redo.stop > len(transcript_chunks) or not len(redo)):
+            raise JobError(f"Chunk range {redo.start}-{redo.stop} is outside the episode's "
+                           f"{len(transcript_chunks)} chunks")
+        output = output or f"{os.path.splitext(path)[0]}_edited.md"
+        chunks = [chunk.text for chunk in transcript_chunks]
+        async with self._writing(output):
+            # Chunks outside the range are copied from the last output, or edited if it has none
+            with self.processor.open_writer(path, transcript_chunks, output, resume=True, redo=redo) as writer:
+                results = await self.processor.arun_chunks(chunks, writer, prestruck, refresh, sentences)
+            await asyncio.to_thread(self.processor.finish_episode, path, table, transcript_chunks, writer,
+                                    output, cut_list_file)
+        return {
+            "output": output,
+            "chunks": len(chunks),
+            "edited": len(results),
+            "failed": sum(1 for result in results if isinstance(result, (ChunkFailure, BaseException))),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "uptime": round(time.time() - self.started_at, 3),
+            "jobs": self.jobs,
+            "episodes": list(self._episodes),
+            "usage": dict(self.processor.engine.usage),
+            "cached_token_ratio": self.processor.engine.cached_token_ratio(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve editing jobs from one warm process")
+    parser.add_argument("--socket", help="Socket path (defaults to $VIDEO_EDITOR_SOCKET or the cache directory)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-tokens", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--strategy", default="two_call", choices=sorted(STRATEGIES))
+    parser.add_argument("--prepass", action="store_true",
+                        help="Strike fillers, stutters and false starts locally before the model sees a chunk")
+    parser.add_argument("--max-episodes", type=int, default=MAX_EPISODES,
+                        help="Episodes whose chunks are kept in memory between jobs")
+    args = parser.parse_args()
+
+    processor = AudioTranscriptProcessor(chunk_size=args.chunk_size, max_concurrency=args.concurrency,
+                                         initial_concurrency=min(10, args.concurrency),
+                                         chunk_tokens=args.chunk_tokens, strategy=args.strategy,
+                                         prepass=DisfluencyConfig() if args.prepass else None)
+    daemon = EditorDaemon(processor, args.socket, max_episodes=args.max_episodes)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from src.cache_dir import get_cache_dir
+from src.token_estimate import estimate_tokens
+from src.tracing import get_tracer
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class LLMCache:
+    """Content-addressed SQLite cache for parsed model responses, shared safely between processes."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024,
+                 max_age_seconds: float = 30 * 24 * 3600, evict_every: int = 100):
+        self.path = path or os.path.join(get_cache_dir(), "llm_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.evict_every = evict_every
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        # WAL lets readers in other processes proceed while one process writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(messages: List[Dict[str, Any]], response_format: Type[BaseModel], params: Dict[str, Any]) -> str:
+        payload = {
+            "messages": messages,
+            "params": params,
+            "response_format": response_format.model_json_schema(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, response_format: Type[M]) -> Optional[M]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.max_age_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        try:
+            return response_format.model_validate_json(row[0])
+        except ValueError:
+            # Schema changed since the entry was written; treat it as a miss
+            return None
+
+    def put(self, key: str, value: BaseModel):
+        data = value.model_dump_json()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= self.evict_every:
+                self._evict()
+                self._puts_since_evict = 0
+
+    async def aget(self, key: str, response_format: Type[M]) -> Optional[M]:
+        # SQLite may wait up to its timeout on another process's write lock; keep that off the event loop
+        return await asyncio.to_thread(self.get, key, response_format)
+
+    async def aput(self, key: str, value: BaseModel):
+        await asyncio.to_thread(self.put, key, value)
+
+    def evict(self):
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Drop least recently used entries until we are back under 90% of the budget
+                excess = total - int(self.max_bytes * 0.9)
+                freed = 0
+                stale_keys = []
+                for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                    stale_keys.append((key,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cache_enabled(use_cache: Optional[bool] = None) -> bool:
+    if use_cache is not None:
+        return use_cache
+    return os.getenv("VIDEO_EDITOR_NO_CACHE", "") not in ("1", "true", "yes")
+
+
+def parse_with_cache(cache: Optional[LLMCache], client, messages: List[Dict[str, Any]],
+                     response_format: Type[M], params: Dict[str, Any]) -> M:
+    key = LLMCache.make_key(messages, response_format, params) if cache else None
+    if cache:
+        cached = cache.get(key, response_format)
+        if cached is not None:
+            return cached
+    response = client.beta.chat.completions.parse(messages=messages, response_format=response_format, **params)
+    parsed = response.choices[0].message.parsed
+    if cache and parsed is not None:
+        cache.put(key, parsed)
+    return parsed
+
+
+async def aparse_with_cache(cache: Optional[LLMCache], engine, messages: List[Dict[str, Any]],
+                            response_format: Type[M], params: Dict[str, Any], refresh: bool = False) -> M:
+    model = params.get("model", "default")
+    with get_tracer().span("model_call", model=model) as span:
+        # refresh skips the lookup but still overwrites the entry with the new response
+        key = LLMCache.make_key(messages, response_format, params) if cache else None
+        if cache and not refresh:
+            cached = await cache.aget(key, response_format)
+            if cached is not None:
+                span.set(cached=True)
+                return cached
+        # Reserve budget for the prompt plus a completion of similar size; corrected from usage afterwards
+        response = await engine.call(lambda client: client.beta.chat.completions.parse(
+            messages=messages, response_format=response_format, **params
+        ), tokens=2 * estimate_tokens(messages), model=model)
+        parsed = response.choices[0].message.parsed
+        if cache and parsed is not None:
+            await cache.aput(key, parsed)
+        return parsed
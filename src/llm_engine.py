@@ -0,0 +1,289 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
+
+from src.request_budget import SharedRequestBudget
+from src.request_policy import (AbortedRequest, CircuitBreaker, CircuitOpenError, LatencyTracker, RetryPolicy,
+                                is_retryable)
+from src.tracing import get_tracer
+
+BASE_URL = "http://192.168.2.210:4000"
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def cached_tokens(usage) -> int:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+class AdaptiveConcurrencyLimiter:
+    """Semaphore whose size follows observed latency and 429s (additive increase, multiplicative decrease)."""
+
+    def __init__(self, initial: int = 10, min_limit: int = 1, max_limit: int = 32,
+                 latency_tolerance: float = 2.0, backoff_factor: float = 0.5, smoothing: float = 0.2):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("Concurrency limits must satisfy 1 <= min_limit <= initial <= max_limit")
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_factor = backoff_factor
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.ewma_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self._successes_since_change = 0
+        self._completions_since_decrease = initial
+        self._condition: Optional[asyncio.Condition] = None
+
+    def reset_loop(self):
+        # asyncio primitives are bound to the loop they are first used on
+        self._condition = None
+        self.in_flight = 0
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float] = None, rate_limited: bool = False):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            self.record(latency, rate_limited)
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        start = time.monotonic()
+        outcome = {"rate_limited": False, "cancelled": False}
+        try:
+            yield outcome
+        except RateLimitError:
+            outcome["rate_limited"] = True
+            raise
+        except (asyncio.CancelledError, AbortedRequest):
+            # A losing hedge or an aborted stream is cut short; its latency would drag the baseline down
+            outcome["cancelled"] = True
+            raise
+        finally:
+            # Callers may move the start past their own waits so only the request itself is timed
+            timed = not (outcome["rate_limited"] or outcome["cancelled"])
+            latency = time.monotonic() - outcome.get("start", start) if timed else None
+            await self.release(latency, outcome["rate_limited"])
+
+    def record(self, latency: Optional[float], rate_limited: bool = False):
+        self._completions_since_decrease += 1
+        if rate_limited:
+            self._decrease()
+            return
+        if latency is None:
+            return
+
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += self.smoothing * (latency - self.ewma_latency)
+        if self.baseline_latency is None or self.ewma_latency < self.baseline_latency:
+            self.baseline_latency = self.ewma_latency
+
+        if self.ewma_latency > self.baseline_latency * self.latency_tolerance:
+            self._decrease()
+            return
+
+        # Grow by one slot after a full window of healthy completions
+        self._successes_since_change += 1
+        if self._successes_since_change >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes_since_change = 0
+
+    def _decrease(self):
+        # Only back off once per window so a burst of 429s from one wave doesn't collapse the limit
+        if self._completions_since_decrease < self.limit:
+            return
+        self.limit = max(self.min_limit, int(self.limit * self.backoff_factor))
+        self._successes_since_change = 0
+        self._completions_since_decrease = 0
+        # Latency is expected to recover at the lower level; re-learn the baseline from there
+        self.ewma_latency = self.baseline_latency
+
+
+class LLMEngine:
+    """Shared asyncio engine: one AsyncOpenAI client, one connection pool, adaptive limiters per deployment."""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = BASE_URL,
+                 initial_concurrency: int = 10, min_concurrency: int = 1, max_concurrency: int = 32,
+                 timeout: float = 600.0, max_retries: int = 3, budget: Optional[SharedRequestBudget] = None,
+                 retry_policy: Optional[RetryPolicy] = None, hedge_percentile: Optional[float] = 0.95,
+                 breaker_threshold: int = 5, breaker_reset_timeout: float = 30.0,
+                 model_concurrency: Optional[Dict[str, int]] = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("API key must be set as OPENAI_API_KEY environment variable")
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=max_retries + 1)
+        # A duplicate request is sent once a call outlives this percentile of its model's recent latencies
+        self.hedge_percentile = hedge_percentile
+        self.hedges_sent = 0
+        # Running totals from response usage, for benchmarks and reports
+        self.usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.max_concurrency = max_concurrency
+        self.limiter = AdaptiveConcurrencyLimiter(initial_concurrency, min_concurrency, max_concurrency)
+        # Models listed here get a limiter of their own, sized to what their deployment can serve;
+        # every other model shares the default limiter
+        self.limiters: Dict[str, AdaptiveConcurrencyLimiter] = {
+            model: AdaptiveConcurrencyLimiter(min(initial_concurrency, limit), min(min_concurrency, limit), limit)
+            for model, limit in (model_concurrency or {}).items()
+        }
+        # Optional host-wide budget shared with other worker processes
+        self.budget = budget
+        self._client: Optional[AsyncOpenAI] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Connections are pooled per event loop, sized to the most requests we will ever keep in flight
+            connections = self.max_concurrency + sum(limiter.max_limit for limiter in self.limiters.values())
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+                timeout=self.timeout,
+            )
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                       http_client=http_client, max_retries=0)
+            self._loop = loop
+            self.limiter.reset_loop()
+            for limiter in self.limiters.values():
+                limiter.reset_loop()
+        return self._client
+
+    def limiter_for(self, model: str) -> AdaptiveConcurrencyLimiter:
+        return self.limiters.get(model, self.limiter)
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(self.breaker_threshold, self.breaker_reset_timeout)
+        return self.breakers[model]
+
+    async def call(self, request: Callable[[AsyncOpenAI], Awaitable[T]], tokens: Optional[int] = None,
+                   model: str = "default", hedge: bool = True) -> T:
+        client = self.client
+        breaker = self.breaker(model)
+        # Retries live here rather than inside the SDK so the limiter sees 429s and backs off first
+        for attempt in range(self.retry_policy.max_attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(model, breaker.retry_in())
+            try:
+                response = await self._hedged(client, request, tokens, model, hedge)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The model answered; a bad request or an unparsable reply says nothing about its health
+                    breaker.record_success()
+                    raise
+                if isinstance(e, RateLimitError):
+                    # Throttling is the limiter's concern, not a sign the model is down
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                if attempt == self.retry_policy.max_attempts - 1:
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt, e))
+            except BaseException:
+                breaker.release_probe()
+                raise
+            else:
+                breaker.record_success()
+                return response
+
+    async def _hedged(self, client: AsyncOpenAI, request: Callable[[AsyncOpenAI], Awaitable[T]],
+                      tokens: Optional[int], model: str, hedge: bool = True) -> T:
+        tracker = self.latencies.setdefault(model, LatencyTracker())
+        threshold = tracker.percentile(self.hedge_percentile) if self.hedge_percentile and hedge else None
+        tasks = [asyncio.ensure_future(self._attempt(client, request, tokens, tracker, model))]
+        try:
+            if threshold is not None:
+                done, _ = await asyncio.wait(tasks, timeout=threshold)
+                # Only hedge into spare capacity; a duplicate queued behind other chunks cannot win
+                limiter = self.limiter_for(model)
+                if not done and limiter.in_flight < limiter.limit:
+                    tasks.append(asyncio.ensure_future(self._attempt(client, request, tokens, tracker, model, hedge=True)))
+                    self.hedges_sent += 1
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempt(self, client: AsyncOpenAI, request: Callable[[AsyncOpenAI], Awaitable[T]],
+                       tokens: Optional[int], tracker: LatencyTracker, model: str, hedge: bool = False) -> T:
+        tracer = get_tracer()
+        queued = time.monotonic()
+        # The host-wide lease is only taken once this process has a slot of its own, so tasks queued on
+        # the local limiter never hold capacity other processes could use
+        async with self.limiter_for(model).slot() as outcome:
+            reservation = self.budget.reserve(tokens or 0) if self.budget else nullcontext({})
+            async with reservation as usage:
+                start = outcome["start"] = time.monotonic()
+                tracer.record("queue_wait", start - queued, model=model)
+                with tracer.span("request", model=model, hedge=hedge) as span:
+                    response = await request(client)
+                    tracker.record(time.monotonic() - start)
+                    if getattr(response, "usage", None) is not None:
+                        span.set(prompt_tokens=response.usage.prompt_tokens,
+                                 completion_tokens=response.usage.completion_tokens,
+                                 cached_tokens=cached_tokens(response.usage))
+                if getattr(response, "usage", None) is not None:
+                    usage["tokens"] = response.usage.total_tokens
+        if getattr(response, "usage", None) is not None:
+            self.usage["prompt_tokens"] += response.usage.prompt_tokens
+            self.usage["completion_tokens"] += response.usage.completion_tokens
+            self.usage["cached_tokens"] += cached_tokens(response.usage)
+            tracer.add_tokens(model, response.usage.prompt_tokens, response.usage.completion_tokens,
+                              cached_tokens(response.usage))
+        self.usage["requests"] += 1
+        return response
+
+    def cached_token_ratio(self) -> Optional[float]:
+        # Share of prompt tokens the provider served from its prefix cache
+        if not self.usage["prompt_tokens"]:
+            return None
+        return self.usage["cached_tokens"] / self.usage["prompt_tokens"]
+
+    async def map(self, items: Iterable[T], worker: Callable[[T], Awaitable[R]]) -> List[Any]:
+        # Results come back in input order; exceptions are returned in place rather than raised
+        tasks = [asyncio.ensure_future(worker(item)) for item in items]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._loop = None
@@ -0,0 +1,292 @@
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from src.removal_spans import split_words
+from src.token_estimate import CHARS_PER_TOKEN
+
+FILLER_WORDS = {"um", "uh", "erm", "hmm", "basically", "literally"}
+NUMBERED_WORD_PATTERN = re.compile(r"\[(\d+)\](\S+)")
+# Prompt prefixes are cached in whole blocks, as in a paged KV cache
+PREFIX_BLOCK_TOKENS = 16
+# Characters per streamed delta
+STREAM_PIECE_CHARS = 16
+
+
+@dataclass
+class MockServerConfig:
+    # Time to first token is log-normal around latency_median; completion tokens then stream at tokens_per_second
+    latency_median: float = 1.0
+    latency_sigma: float = 0.5
+    tokens_per_second: float = 100.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Fraction of responses cut off with finish_reason "length"
+    truncate_rate: float = 0.0
+    # Fraction of responses whose edited transcript is reworded instead of marked up
+    diverge_rate: float = 0.0
+    retry_after: float = 1.0
+    # Report prompt prefixes shared with recent requests as cached tokens
+    prompt_cache: bool = True
+    seed: Optional[int] = None
+
+
+def _is_filler(word: str) -> bool:
+    return re.sub(r"[^\w]", "", word.lower()) in FILLER_WORDS
+
+
+def strike_fillers(transcript: str) -> str:
+    parts = []
+    for token in split_words(transcript):
+        parts.append(f"~~{token}~~" if _is_filler(token) else token)
+    return " ".join(parts)
+
+
+def filler_spans(numbered_transcript: str) -> List[Dict[str, int]]:
+    return [{"start": int(index), "end": int(index)}
+            for index, word in NUMBERED_WORD_PATTERN.findall(numbered_transcript) if _is_filler(word)]
+
+
+def example_value(schema: Dict[str, Any], defs: Dict[str, Any], name: str = "") -> Any:
+    if "$ref" in schema:
+        return example_value(defs[schema["$ref"].split("/")[-1]], defs, name)
+    if "anyOf" in schema:
+        return example_value(schema["anyOf"][0], defs, name)
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: example_value(value, defs, key) for key, value in schema.get("properties", {}).items()}
+    if kind == "array":
+        return []
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    return f"Mock {name.replace('_', ' ')}." if name else "Mock text."
+
+
+def build_content(body: Dict[str, Any], diverge: bool = False) -> str:
+    schema = body.get("response_format", {}).get("json_schema", {}).get("schema", {})
+    user_input: Dict[str, Any] = {}
+    for message in body.get("messages", []):
+        if message.get("role") == "user":
+            try:
+                user_input = json.loads(message.get("content") or "{}")
+            except json.JSONDecodeError:
+                user_input = {}
+    value = example_value(schema, schema.get("$defs", {}))
+    if not isinstance(value, dict):
+        return json.dumps(value)
+    # Fill the fields the pipeline reads with a plausible edit of the submitted transcript
+    if "edited_transcript" in value:
+        transcript = user_input.get("raw_transcript", "")
+        if diverge:
+            value["edited_transcript"] = " ".join(f"reworded{i}" for i, _ in enumerate(split_words(transcript)))
+        else:
+            value["edited_transcript"] = strike_fillers(transcript)
+    if "removals" in value:
+        value["removals"] = filler_spans(user_input.get("numbered_transcript", ""))
+    return json.dumps(value)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the client's connection pool behaves as it does against the real proxy
+    protocol_version = "HTTP/1.1"
+    server: "MockLLMServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.loads(raw or b"{}")
+        config = self.server.config
+        outcome = self.server.draw()
+        self.server.count("requests")
+
+        if outcome < config.rate_limit_rate:
+            self.server.count("rate_limited")
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                       {"retry-after": str(config.retry_after)})
+            return
+
+        # The remaining outcomes split into truncated, failed, diverging and normal responses
+        outcome -= config.rate_limit_rate
+        failure_bands = config.truncate_rate + config.error_rate
+        diverge = failure_bands <= outcome < failure_bands + config.diverge_rate
+        if diverge:
+            self.server.count("diverged")
+        content = build_content(body, diverge)
+        prompt_tokens = len(raw) // CHARS_PER_TOKEN + 1
+        prompt = "".join(str(message.get("content") or "") for message in body.get("messages", []))
+        cached_tokens = min(self.server.cached_prefix_tokens(prompt), prompt_tokens) if config.prompt_cache else 0
+        completion_tokens = len(content) // CHARS_PER_TOKEN + 1
+        finish_reason = "stop"
+        if outcome < config.truncate_rate:
+            self.server.count("truncated")
+            finish_reason = "length"
+            completion_tokens //= 2
+            content = content[:len(content) // 2]
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens,
+                 "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+
+        if config.truncate_rate <= outcome < failure_bands:
+            time.sleep(self.server.latency() + completion_tokens / config.tokens_per_second)
+            self.server.count("errors")
+            self._send(500, {"error": {"message": "Mock server error", "type": "server_error"}})
+            return
+        if body.get("stream"):
+            time.sleep(self.server.latency())
+            self._stream(body, content, finish_reason, usage)
+            return
+        time.sleep(self.server.latency() + completion_tokens / config.tokens_per_second)
+        self._send(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "finish_reason": finish_reason,
+                "logprobs": None,
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, body: Dict[str, Any], content: str, finish_reason: str, usage: Dict[str, Any]):
+        # Server-sent events, one delta per few tokens at the configured generation speed
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "mock")}
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(payload):
+            self.wfile.write(f"data: {json.dumps({**base, **payload})}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def choice(delta, reason=None):
+            return {"choices": [{"index": 0, "delta": delta, "finish_reason": reason, "logprobs": None}]}
+
+        delay = STREAM_PIECE_CHARS / CHARS_PER_TOKEN / self.server.config.tokens_per_second
+        try:
+            event(choice({"role": "assistant", "content": ""}))
+            for start in range(0, len(content), STREAM_PIECE_CHARS):
+                time.sleep(delay)
+                event(choice({"content": content[start:start + STREAM_PIECE_CHARS]}))
+            event(choice({}, finish_reason))
+            if body.get("stream_options", {}).get("include_usage"):
+                event({"choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. after cancelling a diverging generation
+            self.server.count("cancelled")
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Local stand-in for the chat-completions proxy, with configurable latency, errors and throttling."""
+
+    daemon_threads = True
+
+    def __init__(self, config: Optional[MockServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), MockLLMHandler)
+        self.config = config or MockServerConfig()
+        self.stats = {"requests": 0, "rate_limited": 0, "truncated": 0, "errors": 0, "diverged": 0, "cancelled": 0}
+        self._random = random.Random(self.config.seed)
+        self._recent_prompts: deque = deque(maxlen=64)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def latency(self) -> float:
+        with self._lock:
+            return self.config.latency_median * math.exp(self._random.gauss(0, self.config.latency_sigma))
+
+    def cached_prefix_tokens(self, prompt: str) -> int:
+        # The longest prefix this prompt shares with a recent one, as a provider prefix cache would find it
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, seen])) for seen in self._recent_prompts), default=0)
+            self._recent_prompts.append(prompt)
+        return shared // CHARS_PER_TOKEN // PREFIX_BLOCK_TOKENS * PREFIX_BLOCK_TOKENS
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--latency-median", type=float, default=1.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--diverge-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockServerConfig(args.latency_median, args.latency_sigma, args.tokens_per_second, args.error_rate,
+                              args.rate_limit_rate, args.truncate_rate, args.diverge_rate, seed=args.seed)
+    server = MockLLMServer(config, args.host, args.port)
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
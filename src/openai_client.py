@@ -1,9 +1,15 @@
-import json
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from src.editing_strategy import EditingStrategy, Stage
+from src.llm_cache import LLMCache, aparse_with_cache, cache_enabled, parse_with_cache
+from src.llm_engine import BASE_URL, LLMEngine
+from src.prompt_templates import PromptTemplate
+from src.removal_spans import TranscriptRemovalResponse, number_words, render_removals, split_words
+from src.streaming import astream_with_cache, stream_listener
 
 REASONING_PROMPT = {
   "role": "You are an AI assistant specialized in analyzing podcast transcripts for optimal video editing.",
@@ -85,6 +91,37 @@ EDITING_PROMPT = {
   ]
 }
 
+SPAN_EDITING_PROMPT = {
+  **EDITING_PROMPT,
+  "task": "Using the provided chain of thought reasoning, select the parts of the given numbered transcript to remove by returning word index ranges.",
+  "input_format": {
+    "type": "JSON",
+    "structure": {
+        "numbered_transcript": "The transcript to be edited, with every word prefixed by its index in [n] form.",
+        "chain_of_thought": "The reasoning behind the editing decisions.",
+        "instructions": "Extra guidelines for the this specific transcript editing."
+    }
+  },
+  "output_format": {
+    "type": "JSON",
+    "structure": {
+        "removals": "List of {start, end} inclusive word index ranges to remove, in transcript order."
+    }
+  },
+  "instructions": [
+    "Use the chain of thought reasoning to guide your editing process.",
+    "Return only the index ranges of words to remove; do not repeat the transcript.",
+    "Merge adjacent removed words into a single range.",
+    "Ensure the transcript reads coherently once the selected ranges are removed.",
+    "Consider the pacing and rhythm of speech for smooth video transitions.",
+    "Aim for clarity and conciseness while preserving the speaker's unique voice and style."
+  ],
+  "constraints": [
+    "Every index must refer to a numbered word in the transcript.",
+    "Speaker annotations (**<speaker>:**) are not numbered and can never be removed."
+  ]
+}
+
 load_dotenv()  # Load environment variables from .env file
 
 class ChainOfThought(BaseModel):
@@ -96,74 +133,128 @@ class ChainOfThought(BaseModel):
 class TranscriptResponse(BaseModel):
     edited_transcript: str
 
-class OpenAIClient:
-    def __init__(self):
+REASONING_PARAMS = {
+    "model": "episode-editor-reasoning",
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "frequency_penalty": 0.3,
+    "presence_penalty": 0.2
+}
+
+EDITING_PARAMS = {
+    "model": "episode-editor-marking",
+    "temperature": 0.2,
+    "top_p": 0.95,
+    "frequency_penalty": 0.1,
+    "presence_penalty": 0.1
+}
+
+DEFAULT_ADDITIONAL_CONTEXT = """
+The presentation outlines a process for implementing AI in business tasks, emphasizing task selection, deep understanding of work, and AI performance optimization. It stresses the importance of high-quality examples, realistic expectations, and iterative improvement to achieve human-level or better performance. The speaker advises businesses to focus on multiple "good enough" solutions across various areas, given the rapid evolution of AI technology.
+"""
+
+REASONING_TEMPLATE = PromptTemplate(
+    REASONING_PROMPT,
+    instructions="Analyze this raw transcript and provide a detailed chain of thought on how to edit it for video content. Focus on identifying parts that can be removed to improve clarity and conciseness while maintaining the core message and speaker's voice. Consider the audio-visual nature of the final product and how edits might affect pacing and flow.",
+)
+
+EDITING_TEMPLATE = PromptTemplate(
+    EDITING_PROMPT,
+    instructions="Please apply the above chain of thought reasoning to edit the raw transcript provided. Follow the original instructions earlier, particularly regarding the use of strikethrough for marking removals and preserving the original order of the text. Return output in a JSON format with edited_transcript as the key.",
+)
+
+SPAN_EDITING_TEMPLATE = PromptTemplate(
+    SPAN_EDITING_PROMPT,
+    instructions="Please apply the above chain of thought reasoning to the numbered transcript provided. Return output in a JSON format with removals as the key, listing the inclusive word index ranges to remove.",
+)
+
+class OpenAIClient(EditingStrategy):
+    def __init__(self, engine: Optional[LLMEngine] = None, cache: Optional[LLMCache] = None,
+                 use_cache: Optional[bool] = None, response_mode: str = "strikethrough",
+                 cache_marking: bool = True, additional_context: str = DEFAULT_ADDITIONAL_CONTEXT):
+        if response_mode not in ("strikethrough", "spans"):
+            raise ValueError("response_mode must be 'strikethrough' or 'spans'")
+        self.response_mode = response_mode
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("API key must be set as OPENAI_API_KEY environment variable")
-        self.client = OpenAI(api_key=api_key, base_url="http://192.168.2.210:4000")
+        self.client = OpenAI(api_key=api_key, base_url=BASE_URL)
+        self.engine = engine or LLMEngine(api_key)
+        # The reasoning and editing calls are cached under separate keys
+        self.cache = (cache or LLMCache()) if cache_enabled(use_cache) else None
+        # With cache_marking off only the reasoning is reused, so every run re-marks with the current prompt
+        self.cache_marking = cache_marking
+        # Episode-level context; it sits in the shared prompt prefix ahead of the transcript
+        self.additional_context = additional_context
 
     def create_and_format_reasoning_input(self, chunk: str) -> List[Dict[str, str]]:
-        input_data = {
-            "raw_transcript": chunk,
-            "instructions": "Analyze this raw transcript and provide a detailed chain of thought on how to edit it for video content. Focus on identifying parts that can be removed to improve clarity and conciseness while maintaining the core message and speaker's voice. Consider the audio-visual nature of the final product and how edits might affect pacing and flow.",
-            "additional_context": """
-The presentation outlines a process for implementing AI in business tasks, emphasizing task selection, deep understanding of work, and AI performance optimization. It stresses the importance of high-quality examples, realistic expectations, and iterative improvement to achieve human-level or better performance. The speaker advises businesses to focus on multiple "good enough" solutions across various areas, given the rapid evolution of AI technology.
-"""
-        }
-        return [
-            {"role": "system", "content": json.dumps(REASONING_PROMPT)},
-            {"role": "user", "content": json.dumps(input_data)}
-        ]
+        return REASONING_TEMPLATE.messages({"raw_transcript": chunk}, additional_context=self.additional_context)
 
     def create_and_format_editing_input(self, chunk: str, chain_of_thought: ChainOfThought) -> List[Dict[str, str]]:
-        input_data = {
-            "raw_transcript": chunk,
-            "chain_of_thought": chain_of_thought.dict(),
-            "instructions": "Please apply the above chain of thought reasoning to edit the raw transcript provided. Follow the original instructions earlier, particularly regarding the use of strikethrough for marking removals and preserving the original order of the text. Return output in a JSON format with edited_transcript as the key.",
-            "additional_context": """
-The presentation outlines a process for implementing AI in business tasks, emphasizing task selection, deep understanding of work, and AI performance optimization. It stresses the importance of high-quality examples, realistic expectations, and iterative improvement to achieve human-level or better performance. The speaker advises businesses to focus on multiple "good enough" solutions across various areas, given the rapid evolution of AI technology.
-"""
-        }
-        return [
-            {"role": "system", "content": json.dumps(EDITING_PROMPT)},
-            {"role": "user", "content": json.dumps(input_data)}
-        ]
+        return EDITING_TEMPLATE.messages(
+            {"raw_transcript": chunk, "chain_of_thought": chain_of_thought.model_dump()},
+            additional_context=self.additional_context,
+        )
+
+    def create_and_format_span_editing_input(self, chunk: str, chain_of_thought: ChainOfThought) -> List[Dict[str, str]]:
+        return SPAN_EDITING_TEMPLATE.messages({
+            "numbered_transcript": number_words(split_words(chunk)),
+            "chain_of_thought": chain_of_thought.model_dump(),
+        }, additional_context=self.additional_context)
+
+    def _editing_request(self, chunk: str, chain_of_thought: ChainOfThought):
+        if self.response_mode == "spans":
+            return self.create_and_format_span_editing_input(chunk, chain_of_thought), TranscriptRemovalResponse
+        return self.create_and_format_editing_input(chunk, chain_of_thought), TranscriptResponse
+
+    def _render_edit(self, chunk: str, edited) -> str:
+        # Span responses are rendered locally so the text can never drift from the source
+        if isinstance(edited, TranscriptRemovalResponse):
+            return render_removals(chunk, edited.removals)
+        return edited.edited_transcript
 
     def process_chunk(self, chunk: str) -> str:
         try:
             # First API call to get the chain of thought reasoning
             reasoning_messages = self.create_and_format_reasoning_input(chunk)
-            reasoning_response = self.client.beta.chat.completions.parse(
-                model="episode-editor-reasoning",
-                messages=reasoning_messages,
-                response_format=ChainOfThought,
-                temperature=0.7,
-                top_p=0.9,
-                frequency_penalty=0.3,
-                presence_penalty=0.2
+            chain_of_thought = parse_with_cache(
+                self.cache, self.client, reasoning_messages, ChainOfThought, REASONING_PARAMS
             )
-            chain_of_thought = reasoning_response.choices[0].message.parsed
 
             # Second API call to get the edited transcript
-            editing_messages = self.create_and_format_editing_input(chunk, chain_of_thought)
-            editing_response = self.client.beta.chat.completions.parse(
-                model="episode-editor-marking",
-                messages=editing_messages,
-                response_format=TranscriptResponse,
-                temperature=0.2,
-                top_p=0.95,
-                frequency_penalty=0.1,
-                presence_penalty=0.1,
-
+            editing_messages, response_format = self._editing_request(chunk, chain_of_thought)
+            edited = parse_with_cache(
+                self.cache, self.client, editing_messages, response_format, EDITING_PARAMS
             )
-            edited_transcript = editing_response.choices[0].message.parsed.edited_transcript
 
-            return edited_transcript
+            return self._render_edit(chunk, edited)
         except Exception as e:
             print(f"Error processing chunk: {str(e)}")
             return ""
 
+    def stages(self) -> List[Stage]:
+        return [Stage(REASONING_PARAMS["model"], self.areason), Stage(EDITING_PARAMS["model"], self.amark)]
+
+    async def areason(self, chunk: str, _previous=None, refresh: bool = False) -> ChainOfThought:
+        # refresh only re-issues the marking call; the reasoning is reused from the cache
+        reasoning_messages = self.create_and_format_reasoning_input(chunk)
+        return await aparse_with_cache(
+            self.cache, self.engine, reasoning_messages, ChainOfThought, REASONING_PARAMS
+        )
+
+    async def amark(self, chunk: str, chain_of_thought: ChainOfThought, refresh: bool = False) -> str:
+        editing_messages, response_format = self._editing_request(chunk, chain_of_thought)
+        cache = self.cache if self.cache_marking else None
+        listener = stream_listener.get()
+        if listener is not None and response_format is TranscriptResponse:
+            edited = await astream_with_cache(
+                cache, self.engine, editing_messages, response_format, EDITING_PARAMS, listener, refresh=refresh
+            )
+        else:
+            edited = await aparse_with_cache(
+                cache, self.engine, editing_messages, response_format, EDITING_PARAMS, refresh=refresh
+            )
+        return self._render_edit(chunk, edited)
 
 if __name__ == "__main__":
     client = OpenAIClient()
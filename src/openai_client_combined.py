@@ -1,9 +1,15 @@
-import json
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from src.editing_strategy import EditingStrategy, Stage
+from src.llm_cache import LLMCache, aparse_with_cache, cache_enabled, parse_with_cache
+from src.llm_engine import BASE_URL, LLMEngine
+from src.prompt_templates import PromptTemplate
+from src.removal_spans import RemovalSpan, number_words, render_removals, split_words
+from src.streaming import astream_with_cache, stream_listener
 
 PROMPT = {
     "role": "You are an AI assistant specialized in refining podcast transcripts for optimal video editing across various podcast types.",
@@ -58,6 +64,37 @@ PROMPT = {
     ]
 }
 
+SPAN_PROMPT = {
+    **PROMPT,
+    "input_format": {
+        "type": "JSON",
+        "structure": {
+            "numbered_transcript": "The portion of the transcript to be edited, with every word prefixed by its index in [n] form.",
+            "additional_context": "Additional context for this specific transcript editing."
+        }
+    },
+    "output_format": {
+        "type": "JSON",
+        "structure": {
+            "chain_of_thought": PROMPT["output_format"]["structure"]["chain_of_thought"],
+            "removals": "List of {start, end} inclusive word index ranges to remove, in transcript order, based on the reasoning in the chain of thought."
+        }
+    },
+    "instructions": PROMPT["instructions"][:6] + [
+        "- Briefly describe the next step of selecting word ranges for removal.",
+        "3. After completing your chain of thought, use this reasoning to select removals:",
+        "- Return only the index ranges of words to remove; do not repeat the transcript.",
+        "- Merge adjacent removed words into a single range.",
+        "- Ensure the selected removals align with your chain of thought reasoning."
+    ],
+    "constraints": [
+        "The following constraints apply ONLY to the removals:",
+        "1. Every index must refer to a numbered word in the transcript.",
+        "2. Speaker annotations (**<speaker>:**) are not numbered and can never be removed.",
+        "3. The transcript, when read without the removed words, must be grammatically correct and maintain a smooth flow for video editing."
+    ]
+}
+
 load_dotenv()  # Load environment variables from .env file
 
 class ChainOfThought(BaseModel):
@@ -71,43 +108,76 @@ class TranscriptResponse(BaseModel):
     chain_of_thought: ChainOfThought
     edited_transcript: str
 
-class OpenAIClientCombined:
-    def __init__(self):
+class TranscriptRemovalResponse(BaseModel):
+    chain_of_thought: ChainOfThought
+    removals: List[RemovalSpan]
+
+COMBINED_PARAMS = {
+    "model": "episode-editor",
+    "temperature": 0.5,
+    "top_p": 0.8,
+    "frequency_penalty": 0.2,
+    "presence_penalty": 0.1
+}
+
+TEMPLATE = PromptTemplate(PROMPT)
+SPAN_TEMPLATE = PromptTemplate(SPAN_PROMPT)
+
+class OpenAIClientCombined(EditingStrategy):
+    def __init__(self, engine: Optional[LLMEngine] = None, cache: Optional[LLMCache] = None,
+                 use_cache: Optional[bool] = None, response_mode: str = "strikethrough"):
+        if response_mode not in ("strikethrough", "spans"):
+            raise ValueError("response_mode must be 'strikethrough' or 'spans'")
+        self.response_mode = response_mode
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("API key must be set as OPENAI_API_KEY environment variable")
-        self.client = OpenAI(api_key=api_key, base_url="http://192.168.2.210:4000")
+        self.client = OpenAI(api_key=api_key, base_url=BASE_URL)
+        self.engine = engine or LLMEngine(api_key)
+        self.cache = (cache or LLMCache()) if cache_enabled(use_cache) else None
 
     def create_and_format_input(self, chunk: str) -> List[Dict[str, str]]:
-        input_data = {
-            "raw_transcript": chunk
-        }
-        return [
-            {"role": "system", "content": json.dumps(PROMPT)},
-            {"role": "user", "content": json.dumps(input_data)}
-        ]
+        return TEMPLATE.messages({"raw_transcript": chunk})
+
+    def create_and_format_span_input(self, chunk: str) -> List[Dict[str, str]]:
+        return SPAN_TEMPLATE.messages({"numbered_transcript": number_words(split_words(chunk))})
+
+    def _request(self, chunk: str):
+        if self.response_mode == "spans":
+            return self.create_and_format_span_input(chunk), TranscriptRemovalResponse
+        return self.create_and_format_input(chunk), TranscriptResponse
+
+    def _render_edit(self, chunk: str, parsed) -> str:
+        if isinstance(parsed, TranscriptRemovalResponse):
+            return render_removals(chunk, parsed.removals)
+        return parsed.edited_transcript
 
     def process_chunk(self, chunk: str) -> str:
         try:
             # Single API call to get both the chain of thought reasoning and the edited transcript
-            messages = self.create_and_format_input(chunk)
-            response = self.client.beta.chat.completions.parse(
-                model="episode-editor",
-                messages=messages,
-                response_format=TranscriptResponse,
-                temperature=0.5,
-                top_p=0.8,
-                frequency_penalty=0.2,
-                presence_penalty=0.1
-            )
-            chain_of_thought = response.choices[0].message.parsed.chain_of_thought
-            edited_transcript = response.choices[0].message.parsed.edited_transcript
+            messages, response_format = self._request(chunk)
+            parsed = parse_with_cache(self.cache, self.client, messages, response_format, COMBINED_PARAMS)
+            chain_of_thought = parsed.chain_of_thought
+            edited_transcript = self._render_edit(chunk, parsed)
 
             return edited_transcript
         except Exception as e:
             print(f"Error processing chunk: {str(e)}")
             return ""
 
+    def stages(self) -> List[Stage]:
+        return [Stage(COMBINED_PARAMS["model"], self.aedit)]
+
+    async def aedit(self, chunk: str, _previous=None, refresh: bool = False) -> str:
+        messages, response_format = self._request(chunk)
+        listener = stream_listener.get()
+        if listener is not None and response_format is TranscriptResponse:
+            parsed = await astream_with_cache(self.cache, self.engine, messages, response_format, COMBINED_PARAMS,
+                                              listener, refresh=refresh)
+        else:
+            parsed = await aparse_with_cache(self.cache, self.engine, messages, response_format, COMBINED_PARAMS,
+                                             refresh=refresh)
+        return self._render_edit(chunk, parsed)
 
 if __name__ == "__main__":
     client = OpenAIClientCombined()
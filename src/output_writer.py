@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.tracing import get_tracer
+
+FAILURE_PLACEHOLDER = "OpenAI Call Failure"
+CHUNK_SEPARATOR = "\n\n"
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """Per-chunk status, timings and output byte offsets for one output file, rewritten atomically."""
+
+    def __init__(self, path: str, source: Optional[str] = None, chunks: Optional[List[Dict[str, Any]]] = None):
+        self.path = path
+        self.source = source
+        self.chunks = chunks or []
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RunManifest"]:
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return cls(path, data.get("source"), data.get("chunks", []))
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"source": self.source, "chunks": self.chunks}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def read_outputs(self, output_path: str) -> List[Optional[str]]:
+        # Written text per chunk, or None for failed and unwritten chunks
+        outputs: List[Optional[str]] = []
+        with open(output_path, 'rb') as f:
+            for entry in self.chunks:
+                if entry.get("status") != "done" or entry.get("offset") is None:
+                    outputs.append(None)
+                    continue
+                f.seek(entry["offset"])
+                outputs.append(f.read(entry["length"]).decode("utf-8"))
+        return outputs
+
+    def completed_outputs(self) -> Dict[str, Dict[str, Any]]:
+        # Only chunks that were actually written can be copied forward into a new run
+        return {
+            entry["hash"]: entry for entry in self.chunks
+            if entry.get("status") == "done" and entry.get("offset") is not None
+        }
+
+
+class OrderedOutputWriter:
+    """Writes chunk results to disk in order as soon as every earlier chunk is done.
+
+    On resume, chunks whose hash was written by a previous run are copied from the
+    previous output instead of being re-issued, except for the indices listed in redo.
+    """
+
+    def __init__(self, output_path: str, chunk_hashes: List[str], source: Optional[str] = None,
+                 manifest_path: Optional[str] = None, resume: bool = True, redo: Optional[Iterable[int]] = None):
+        self.output_path = output_path
+        self.previous_path = f"{output_path}.prev"
+        # Live text of the chunk being generated at the head of the output, when edits are streamed
+        self.partial_path = f"{output_path}.partial"
+        self.chunk_hashes = chunk_hashes
+        self.manifest = RunManifest(manifest_path or f"{output_path}.manifest.json", source)
+        self.resume = resume
+        self.redo = set(redo or ())
+        self._reusable: Dict[int, Dict[str, Any]] = {}
+        self._pending: Dict[int, Any] = {}
+        self._next_index = 0
+        self._file = None
+        self._previous_file = None
+
+    def __enter__(self) -> "OrderedOutputWriter":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def open(self):
+        previous = RunManifest.load(self.manifest.path) if self.resume else None
+        if previous and os.path.exists(self.output_path):
+            completed = previous.completed_outputs()
+            self._reusable = {i: completed[h] for i, h in enumerate(self.chunk_hashes)
+                              if h in completed and i not in self.redo}
+            if self._reusable:
+                os.replace(self.output_path, self.previous_path)
+                self._previous_file = open(self.previous_path, 'rb')
+
+        self.manifest.chunks = [
+            {"index": i, "hash": h, "status": "pending", "offset": None, "length": None,
+             "started_at": None, "finished_at": None, "duration": None}
+            for i, h in enumerate(self.chunk_hashes)
+        ]
+        self._file = open(self.output_path, 'wb')
+        for index in self._reusable:
+            self.manifest.chunks[index]["status"] = "done"
+            self.manifest.chunks[index]["duration"] = self._reusable[index].get("duration")
+            self._pending[index] = None
+        self.manifest.save()
+        self._flush()
+
+    def is_reused(self, index: int) -> bool:
+        return index in self._reusable
+
+    def start(self, index: int, at: Optional[float] = None):
+        # at backdates the start of a chunk that was begun before the writer opened
+        entry = self.manifest.chunks[index]
+        entry["status"] = "running"
+        entry["started_at"] = at or time.time()
+
+    def submit(self, index: int, text: str, failed: bool = False, **metrics):
+        entry = self.manifest.chunks[index]
+        entry.update(metrics)
+        entry["status"] = "failed" if failed else "done"
+        entry["finished_at"] = time.time()
+        if entry["started_at"] is not None:
+            entry["duration"] = entry["finished_at"] - entry["started_at"]
+        self._pending[index] = FAILURE_PLACEHOLDER if failed else text
+        self._flush()
+
+    def progress(self, index: int, text: str):
+        # Only the head chunk is shown; later chunks cannot be read in order yet
+        if index != self._next_index:
+            return
+        tmp_path = f"{self.partial_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self.partial_path)
+
+    def _read_previous(self, index: int) -> bytes:
+        entry = self._reusable[index]
+        self._previous_file.seek(entry["offset"])
+        return self._previous_file.read(entry["length"])
+
+    def _flush(self):
+        with get_tracer().span("write") as span:
+            span.set(chunks=self._write_ready())
+
+    def _write_ready(self) -> int:
+        wrote = 0
+        while self._next_index in self._pending:
+            index = self._next_index
+            text = self._pending.pop(index)
+            data = self._read_previous(index) if text is None else text.encode("utf-8")
+            entry = self.manifest.chunks[index]
+            entry["offset"] = self._file.tell()
+            entry["length"] = len(data)
+            self._file.write(data)
+            self._file.write(CHUNK_SEPARATOR.encode("utf-8"))
+            self._next_index += 1
+            wrote += 1
+        if wrote:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.manifest.save()
+            if os.path.exists(self.partial_path):
+                os.remove(self.partial_path)
+        return wrote
+
+    @property
+    def complete(self) -> bool:
+        return self._next_index == len(self.chunk_hashes)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.manifest.save()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+        if self._previous_file is not None:
+            self._previous_file.close()
+            self._previous_file = None
+            if self.complete:
+                os.remove(self.previous_path)
@@ -0,0 +1,93 @@
+import asyncio
+import contextvars
+import time
+from typing import Dict, List, Optional
+
+from src.editing_strategy import EditingStrategy
+from src.llm_engine import LLMEngine
+from src.openai_client import OpenAIClient
+from src.openai_client_combined import OpenAIClientCombined
+from src.tracing import get_tracer
+
+# Strategy name -> (client class, extra constructor arguments)
+STRATEGIES = {
+    "two_call": (OpenAIClient, {}),
+    "combined": (OpenAIClientCombined, {}),
+    "cached_reasoning": (OpenAIClient, {"cache_marking": False}),
+}
+
+
+def make_strategy(name: str, engine: Optional[LLMEngine] = None, use_cache: Optional[bool] = None,
+                  response_mode: str = "strikethrough") -> EditingStrategy:
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown editing strategy {name!r}; expected one of {', '.join(STRATEGIES)}")
+    client_class, options = STRATEGIES[name]
+    return client_class(engine=engine, use_cache=use_cache, response_mode=response_mode, **options)
+
+
+class StagedPipeline:
+    """Runs each stage of an editing strategy from its own queue and workers, so one chunk's marking
+    call overlaps the next chunk's reasoning call instead of waiting behind it."""
+
+    def __init__(self, strategy: EditingStrategy, stage_concurrency: Optional[Dict[str, int]] = None,
+                 default_concurrency: int = 8):
+        self.strategy = strategy
+        self.stages = strategy.stages()
+        self.concurrency = [(stage_concurrency or {}).get(stage.model, default_concurrency) for stage in self.stages]
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Queues and workers belong to one event loop; each asyncio.run gets a fresh set
+        self._loop = loop
+        self._queues = [asyncio.Queue() for _ in self.stages]
+        self._workers = [loop.create_task(self._work(index))
+                         for index, workers in enumerate(self.concurrency) for _ in range(workers)]
+
+    async def process(self, chunk: str, refresh: bool = False) -> str:
+        self._start()
+        future = self._loop.create_future()
+        # Stages run in the caller's context so their spans nest under its chunk span
+        self._queues[0].put_nowait((chunk, None, refresh, future, contextvars.copy_context(), time.monotonic()))
+        return await future
+
+    async def _work(self, index: int):
+        stage = self.stages[index]
+        queue = self._queues[index]
+        last = index == len(self.stages) - 1
+        while True:
+            chunk, previous, refresh, future, context, queued = await queue.get()
+            if future.done():
+                # The caller was cancelled while the chunk waited
+                continue
+            context.run(get_tracer().record, "stage_queue_wait", time.monotonic() - queued, model=stage.model)
+            try:
+                result = await asyncio.create_task(stage.run(chunk, previous, refresh), context=context)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if future.done():
+                continue
+            if last:
+                future.set_result(result)
+            else:
+                self._queues[index + 1].put_nowait((chunk, result, refresh, future, context, time.monotonic()))
+
+    async def aclose(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for queue in self._queues:
+            while not queue.empty():
+                queue.get_nowait()[3].cancel()
+        self._queues = []
+        self._workers = []
+        self._loop = None
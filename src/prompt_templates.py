@@ -0,0 +1,33 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+
+class PromptTemplate:
+    """System prompt and fixed input fields serialized once, so every chunk of an episode shares a
+    byte-identical prompt prefix that the provider can cache.
+
+    The user message is laid out fixed fields first, then episode-level fields such as additional_context,
+    then the per-chunk fields; the result is exactly json.dumps of the merged input.
+    """
+
+    def __init__(self, prompt: Dict[str, Any], **fixed_fields: Any):
+        self.system_message = {"role": "system", "content": json.dumps(prompt)}
+        self.fixed_fields = fixed_fields
+        self._heads: Dict[Tuple, str] = {}
+
+    def head(self, **episode_fields: Any) -> str:
+        # The serialized user message up to, but not including, the per-chunk fields
+        key = tuple(episode_fields.items())
+        head = self._heads.get(key)
+        if head is None:
+            if len(self._heads) >= 256:
+                self._heads.clear()
+            head = json.dumps({**self.fixed_fields, **episode_fields})[:-1]
+            self._heads[key] = head
+        return head
+
+    def messages(self, chunk_fields: Dict[str, Any], **episode_fields: Any) -> List[Dict[str, str]]:
+        head = self.head(**episode_fields)
+        body = json.dumps(chunk_fields)[1:]
+        content = head + body if head == "{" or body == "}" else f"{head}, {body}"
+        return [self.system_message, {"role": "user", "content": content}]
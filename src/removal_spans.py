@@ -0,0 +1,61 @@
+import re
+from typing import Iterable, List
+
+from pydantic import BaseModel
+
+# Speaker annotations contain a space, so they are matched before plain words
+TOKEN_PATTERN = re.compile(r"\*\*[^*]+?:\*\*|\S+")
+SPEAKER_TAG_PATTERN = re.compile(r"\*\*[^*]+?:\*\*")
+
+
+class RemovalSpan(BaseModel):
+    start: int
+    end: int
+
+
+class TranscriptRemovalResponse(BaseModel):
+    removals: List[RemovalSpan]
+
+
+def split_words(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text)
+
+
+def is_speaker_tag(word: str) -> bool:
+    return SPEAKER_TAG_PATTERN.fullmatch(word) is not None
+
+
+def number_words(words: List[str]) -> str:
+    # Speaker tags stay unnumbered so the model cannot select them for removal
+    return " ".join(word if is_speaker_tag(word) else f"[{i}]{word}" for i, word in enumerate(words))
+
+
+def removal_mask(word_count: int, spans: Iterable[RemovalSpan]) -> List[bool]:
+    mask = [False] * word_count
+    for span in spans:
+        start = max(span.start, 0)
+        end = min(span.end, word_count - 1)
+        for i in range(start, end + 1):
+            mask[i] = True
+    return mask
+
+
+def render_strikethrough(words: List[str], removed: List[bool]) -> str:
+    parts = []
+    run = []
+    for word, struck in zip(words, removed):
+        if struck and not is_speaker_tag(word):
+            run.append(word)
+            continue
+        if run:
+            parts.append(f"~~{' '.join(run)}~~")
+            run = []
+        parts.append(word)
+    if run:
+        parts.append(f"~~{' '.join(run)}~~")
+    return " ".join(parts)
+
+
+def render_removals(chunk: str, spans: Iterable[RemovalSpan]) -> str:
+    words = split_words(chunk)
+    return render_strikethrough(words, removal_mask(len(words), spans))
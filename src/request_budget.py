@@ -0,0 +1,119 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from src.cache_dir import get_cache_dir
+
+TOKEN_WINDOW_SECONDS = 60.0
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedRequestBudget:
+    """Host-wide cap on in-flight requests and tokens per minute, shared by every process through SQLite."""
+
+    def __init__(self, max_concurrency: int = 16, tokens_per_minute: Optional[int] = None,
+                 path: Optional[str] = None, lease_seconds: float = 900.0, poll_interval: float = 0.05):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.path = path or os.path.join(get_cache_dir(), "request_budget.sqlite3")
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, pid INTEGER NOT NULL, tokens INTEGER NOT NULL, "
+            "acquired_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_log (lease_id INTEGER PRIMARY KEY, at REAL NOT NULL, tokens INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS token_log_at ON token_log (at)")
+
+    def try_acquire(self, tokens: int) -> Optional[int]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Leases left behind by crashed or stalled processes are reclaimed
+                for lease_id, pid, expires_at in self._conn.execute("SELECT id, pid, expires_at FROM leases").fetchall():
+                    if expires_at < now or not _pid_alive(pid):
+                        self._conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+                self._conn.execute("DELETE FROM token_log WHERE at < ?", (now - TOKEN_WINDOW_SECONDS,))
+
+                in_flight = self._conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+                if in_flight >= self.max_concurrency:
+                    self._conn.execute("COMMIT")
+                    return None
+                if self.tokens_per_minute:
+                    used = self._conn.execute("SELECT COALESCE(SUM(tokens), 0) FROM token_log").fetchone()[0]
+                    # A single oversized request may still run on an idle budget
+                    if used and used + tokens > self.tokens_per_minute:
+                        self._conn.execute("COMMIT")
+                        return None
+
+                cursor = self._conn.execute(
+                    "INSERT INTO leases (pid, tokens, acquired_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (os.getpid(), tokens, now, now + self.lease_seconds)
+                )
+                lease_id = cursor.lastrowid
+                self._conn.execute("INSERT INTO token_log (lease_id, at, tokens) VALUES (?, ?, ?)", (lease_id, now, tokens))
+                self._conn.execute("COMMIT")
+                return lease_id
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def release(self, lease_id: int, actual_tokens: Optional[int] = None):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+            if actual_tokens is not None:
+                # Replace the up-front estimate with what the request really used
+                self._conn.execute("UPDATE token_log SET tokens = ? WHERE lease_id = ?", (actual_tokens, lease_id))
+
+    async def acquire(self, tokens: int) -> int:
+        # SQLite waits on other processes' locks, so every attempt runs off the event loop
+        while True:
+            attempt = asyncio.ensure_future(asyncio.to_thread(self.try_acquire, tokens))
+            try:
+                lease_id = await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                attempt.add_done_callback(self._release_abandoned)
+                raise
+            if lease_id is not None:
+                return lease_id
+            await asyncio.sleep(self.poll_interval * (0.5 + random.random()))
+
+    def _release_abandoned(self, attempt: "asyncio.Future[Optional[int]]"):
+        # A lease granted after its caller was cancelled is handed straight back
+        if not attempt.cancelled() and attempt.exception() is None and attempt.result() is not None:
+            asyncio.get_running_loop().run_in_executor(None, self.release, attempt.result())
+
+    @asynccontextmanager
+    async def reserve(self, tokens: int):
+        lease_id = await self.acquire(tokens)
+        usage = {"tokens": None}
+        try:
+            yield usage
+        finally:
+            # Shielded so a second cancellation cannot leave the lease behind
+            await asyncio.shield(asyncio.to_thread(self.release, lease_id, usage["tokens"]))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
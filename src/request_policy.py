@@ -0,0 +1,147 @@
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Union
+
+import httpx
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a model whose circuit breaker is open."""
+
+    def __init__(self, model: str, retry_in: float):
+        super().__init__(f"Circuit open for model {model}; retry in {retry_in:.1f}s")
+        self.model = model
+        self.retry_in = retry_in
+
+
+class AbortedRequest(Exception):
+    """Raised from inside a request to cut it short; its latency says nothing about the model's speed."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (APITimeoutError, APIConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date values are rare from the proxy; fall back to our own backoff
+        return None
+    return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter; a server-supplied Retry-After takes precedence."""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Per-model breaker: opens after consecutive failures and lets one probe through after a cool-down."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release_probe(self):
+        # A probe that ended without an answer, e.g. cancelled, leaves the next call to probe instead
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class LatencyTracker:
+    """Sliding window of successful request latencies, used to decide when to hedge."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class ChunkSuccess:
+    index: int
+    text: str
+    attempts: int
+    drift: float = 0.0
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ChunkFailure:
+    index: int
+    error: str
+    attempts: int
+    retryable: bool = False
+
+
+ChunkResult = Union[ChunkSuccess, ChunkFailure]
@@ -0,0 +1,278 @@
+import argparse
+import heapq
+import json
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.openai_client import DEFAULT_ADDITIONAL_CONTEXT, EDITING_PARAMS, EDITING_TEMPLATE, REASONING_PARAMS, \
+    REASONING_TEMPLATE, SPAN_EDITING_TEMPLATE
+from src.openai_client_combined import COMBINED_PARAMS, SPAN_TEMPLATE, TEMPLATE
+from src.prompt_templates import PromptTemplate
+from src.removal_spans import number_words, split_words
+from src.report_format import format_report
+from src.token_estimate import CHARS_PER_TOKEN, estimate_tokens
+from src.transcriber.chunked_transcriber import ChunkedTranscriber
+from src.transcriber.word_table import WordTable
+
+# Expected completion sizes; the chain of thought is also part of the marking prompt
+CHAIN_OF_THOUGHT_TOKENS = 350
+COMBINED_CHAIN_OF_THOUGHT_TOKENS = 450
+# A strikethrough edit repeats the chunk plus its ~~ markup; a span edit lists only the removals
+STRIKETHROUGH_COMPLETION_RATIO = 1.1
+SPAN_COMPLETION_TOKENS_PER_WORD = 0.1
+# Dollars per million (input, output) tokens, and the share of the input price charged for cached prefix tokens
+DEFAULT_PRICE = (2.50, 10.00)
+CACHED_PRICE_RATIO = 0.5
+PLAN_COLUMNS = ["strategy", "chunk_size", "concurrency", "chunks", "requests", "prompt_tokens", "cached_tokens",
+                "completion_tokens", "cost_usd", "critical_path_s", "wall_s"]
+
+
+@dataclass
+class ModelProfile:
+    # A request takes base_latency to the first token, then streams at tokens_per_second
+    base_latency: float = 1.0
+    tokens_per_second: float = 100.0
+    samples: int = 0
+
+    def latency(self, completion_tokens: int) -> float:
+        return self.base_latency + completion_tokens / self.tokens_per_second
+
+
+@dataclass
+class StageRequest:
+    model: str
+    prompt_tokens: int
+    # Leading prompt tokens shared by every chunk of the episode, which the provider can serve from its cache
+    prefix_tokens: int
+    completion_tokens: int
+
+
+def fit_profile(durations: Sequence[float], completion_tokens: Sequence[int],
+                default: ModelProfile = ModelProfile()) -> ModelProfile:
+    durations = np.asarray(durations, dtype=float)
+    completions = np.asarray(completion_tokens, dtype=float)
+    if len(durations) >= 3 and np.ptp(completions) > 0:
+        slope, intercept = np.polyfit(completions, durations, 1)
+        if slope > 0:
+            return ModelProfile(max(float(intercept), 0.0), float(1 / slope), len(durations))
+    if len(durations):
+        # Too little spread to separate the two terms: keep the default speed and fit the base latency
+        base = float(np.median(durations - completions / default.tokens_per_second))
+        return ModelProfile(max(base, 0.0), default.tokens_per_second, len(durations))
+    return default
+
+
+def load_profiles(trace_paths: Iterable[str]) -> Dict[str, ModelProfile]:
+    # Per-model latency from the "request" spans of earlier runs' trace files
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    for path in trace_paths:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("name") != "request" or "error" in event or "completion_tokens" not in event:
+                    continue
+                samples[event.get("model", "default")].append((event["duration"], event["completion_tokens"]))
+    return {model: fit_profile([d for d, _ in pairs], [c for _, c in pairs]) for model, pairs in samples.items()}
+
+
+def _prefix_tokens(template: PromptTemplate, **episode_fields) -> int:
+    return (len(template.system_message["content"]) + len(template.head(**episode_fields))) // CHARS_PER_TOKEN
+
+
+def simulate_wall_time(chunk_latencies: List[List[Tuple[str, float]]], concurrency: int,
+                       stage_concurrency: Optional[Dict[str, int]] = None) -> float:
+    # Requests start in the order they become ready, each on the first free slot of its model's limiter;
+    # a chunk's next stage becomes ready when its previous stage finishes
+    stage_concurrency = stage_concurrency or {}
+    slots = {model: [0.0] * limit for model, limit in stage_concurrency.items()}
+    shared = [0.0] * concurrency
+    ready = [(0.0, chunk, 0) for chunk in range(len(chunk_latencies)) if chunk_latencies[chunk]]
+    heapq.heapify(ready)
+    finished = 0.0
+    while ready:
+        at, chunk, stage = heapq.heappop(ready)
+        model, latency = chunk_latencies[chunk][stage]
+        pool = slots.get(model, shared)
+        end = max(at, heapq.heappop(pool)) + latency
+        heapq.heappush(pool, end)
+        finished = max(finished, end)
+        if stage + 1 < len(chunk_latencies[chunk]):
+            heapq.heappush(ready, (end, chunk, stage + 1))
+    return finished
+
+
+class RunPlanner:
+    """Predicts tokens, cost and wall time of an editing run from chunking alone, without any model calls."""
+
+    def __init__(self, profiles: Optional[Dict[str, ModelProfile]] = None,
+                 prices: Optional[Dict[str, Tuple[float, float]]] = None, response_mode: str = "strikethrough",
+                 additional_context: str = DEFAULT_ADDITIONAL_CONTEXT, tokens_per_minute: Optional[int] = None,
+                 content_defined: bool = False):
+        if response_mode not in ("strikethrough", "spans"):
+            raise ValueError("response_mode must be 'strikethrough' or 'spans'")
+        self.profiles = profiles or {}
+        self.prices = prices or {}
+        self.response_mode = response_mode
+        self.additional_context = additional_context
+        # A tokens-per-minute cap puts a floor under the wall time however high the concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.content_defined = content_defined
+
+    def profile(self, model: str) -> ModelProfile:
+        return self.profiles.get(model) or self.profiles.get("default") or ModelProfile()
+
+    def _edit_tokens(self, chunk: str) -> int:
+        if self.response_mode == "spans":
+            return math.ceil(len(split_words(chunk)) * SPAN_COMPLETION_TOKENS_PER_WORD) + 10
+        characters = len(json.dumps({"edited_transcript": chunk}))
+        return math.ceil(characters / CHARS_PER_TOKEN * STRIKETHROUGH_COMPLETION_RATIO)
+
+    def stage_requests(self, strategy: str, chunk: str) -> List[StageRequest]:
+        # The same messages the clients build, so prompt sizes match a real run
+        if strategy == "combined":
+            if self.response_mode == "spans":
+                template, fields = SPAN_TEMPLATE, {"numbered_transcript": number_words(split_words(chunk))}
+            else:
+                template, fields = TEMPLATE, {"raw_transcript": chunk}
+            return [StageRequest(COMBINED_PARAMS["model"], estimate_tokens(template.messages(fields)),
+                                 _prefix_tokens(template), COMBINED_CHAIN_OF_THOUGHT_TOKENS + self._edit_tokens(chunk))]
+        if strategy not in ("two_call", "cached_reasoning"):
+            raise ValueError(f"Unknown strategy {strategy!r}")
+
+        context = self.additional_context
+        reasoning = REASONING_TEMPLATE.messages({"raw_transcript": chunk}, additional_context=context)
+        if self.response_mode == "spans":
+            marking = SPAN_EDITING_TEMPLATE.messages({"numbered_transcript": number_words(split_words(chunk)),
+                                                      "chain_of_thought": {}}, additional_context=context)
+            marking_prefix = _prefix_tokens(SPAN_EDITING_TEMPLATE, additional_context=context)
+        else:
+            marking = EDITING_TEMPLATE.messages({"raw_transcript": chunk, "chain_of_thought": {}},
+                                                additional_context=context)
+            marking_prefix = _prefix_tokens(EDITING_TEMPLATE, additional_context=context)
+        return [
+            StageRequest(REASONING_PARAMS["model"], estimate_tokens(reasoning),
+                         _prefix_tokens(REASONING_TEMPLATE, additional_context=context), CHAIN_OF_THOUGHT_TOKENS),
+            StageRequest(EDITING_PARAMS["model"], estimate_tokens(marking) + CHAIN_OF_THOUGHT_TOKENS, marking_prefix,
+                         self._edit_tokens(chunk)),
+        ]
+
+    def cost(self, model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+        input_price, output_price = self.prices.get(model) or self.prices.get("default") or DEFAULT_PRICE
+        uncached = prompt_tokens - cached_tokens
+        return (uncached * input_price + cached_tokens * input_price * CACHED_PRICE_RATIO
+                + completion_tokens * output_price) / 1e6
+
+    def plan_chunks(self, strategy: str, chunks: List[str], concurrency: int,
+                    stage_concurrency: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        requests = [self.stage_requests(strategy, chunk) for chunk in chunks]
+        prompt = cached = completion = 0
+        cost = 0.0
+        seen_models = set()
+        for chunk_requests in requests:
+            for request in chunk_requests:
+                # Every call after a model's first finds the episode prefix in the provider's cache
+                hit = request.prefix_tokens if request.model in seen_models else 0
+                seen_models.add(request.model)
+                prompt += request.prompt_tokens
+                cached += hit
+                completion += request.completion_tokens
+                cost += self.cost(request.model, request.prompt_tokens, hit, request.completion_tokens)
+        latencies = [[(request.model, self.profile(request.model).latency(request.completion_tokens))
+                      for request in chunk_requests] for chunk_requests in requests]
+        wall = simulate_wall_time(latencies, concurrency, stage_concurrency)
+        if self.tokens_per_minute:
+            wall = max(wall, (prompt + completion) / self.tokens_per_minute * 60)
+        return {
+            "strategy": strategy,
+            "concurrency": concurrency,
+            "chunks": len(chunks),
+            "requests": sum(len(chunk_requests) for chunk_requests in requests),
+            "prompt_tokens": prompt,
+            "cached_tokens": cached,
+            "completion_tokens": completion,
+            "cost_usd": round(cost, 4),
+            "critical_path_s": round(max((sum(l for _, l in chunk) for chunk in latencies), default=0.0), 3),
+            "wall_s": round(wall, 3),
+        }
+
+    def plan(self, table: WordTable, chunk_sizes: Iterable[int], concurrencies: Iterable[int],
+             strategies: Iterable[str] = ("two_call", "combined"),
+             stage_concurrency: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        rows = []
+        concurrencies = list(concurrencies)
+        strategies = list(strategies)
+        for chunk_size in chunk_sizes:
+            chunker = ChunkedTranscriber(chunk_size, content_defined=self.content_defined)
+            chunks = [chunk.text for chunk in chunker.chunk_table(table)]
+            for concurrency in concurrencies:
+                for strategy in strategies:
+                    row = self.plan_chunks(strategy, chunks, concurrency, stage_concurrency)
+                    rows.append({"chunk_size": chunk_size, **row})
+        return rows
+
+
+def recommend(rows: List[Dict[str, Any]], budget: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    # The fastest configuration that fits the budget; among equally fast ones, the cheapest
+    affordable = [row for row in rows if budget is None or row["cost_usd"] <= budget]
+    return min(affordable, key=lambda row: (row["wall_s"], row["cost_usd"]), default=None)
+
+
+def cached_word_table(chunker: ChunkedTranscriber, audio_file_path: str) -> WordTable:
+    # Planning never transcribes: a transcript that is not cached yet would start a paid AssemblyAI job
+    table = chunker.cached_word_table(audio_file_path)
+    if table is None:
+        raise ValueError(f"No cached transcript for {audio_file_path}; transcribe it before planning a run")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict tokens, cost and wall time of editing an episode.")
+    parser.add_argument("audio", help="Audio file whose transcript is already cached")
+    parser.add_argument("--chunk-sizes", default="400,500,650,700,800,1000", help="Comma-separated sizes in words")
+    parser.add_argument("--concurrency", default="8,16,32", help="Comma-separated concurrency limits")
+    parser.add_argument("--strategies", default="two_call,combined")
+    parser.add_argument("--response-mode", default="strikethrough", choices=["strikethrough", "spans"])
+    parser.add_argument("--trace-file", action="append", default=[],
+                        help="Trace file of an earlier run to take latencies from; may be repeated")
+    parser.add_argument("--price", action="append", default=[], metavar="MODEL=IN,OUT",
+                        help="Dollars per million input and output tokens; MODEL may be 'default'")
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    parser.add_argument("--budget", type=float, default=None, help="Most dollars the run may cost")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per configuration")
+    args = parser.parse_args()
+
+    prices = {}
+    for value in args.price:
+        model, _, pair = value.partition("=")
+        input_price, _, output_price = pair.partition(",")
+        prices[model] = (float(input_price), float(output_price))
+    planner = RunPlanner(load_profiles(args.trace_file), prices, args.response_mode,
+                         tokens_per_minute=args.tokens_per_minute)
+    try:
+        table = cached_word_table(ChunkedTranscriber(), args.audio)
+    except ValueError as e:
+        parser.error(str(e))
+    rows = planner.plan(table, [int(v) for v in args.chunk_sizes.split(",")],
+                        [int(v) for v in args.concurrency.split(",")], args.strategies.split(","))
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+    else:
+        print(format_report(rows, PLAN_COLUMNS))
+    best = recommend(rows, args.budget)
+    if best is None:
+        print(f"No configuration fits a budget of ${args.budget:.2f}")
+    else:
+        print(f"Recommended: {best['strategy']} with chunk size {best['chunk_size']} and concurrency "
+              f"{best['concurrency']}: about {best['wall_s']:.0f}s for ${best['cost_usd']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
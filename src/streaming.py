@@ -0,0 +1,158 @@
+import contextvars
+import json
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from src.alignment import align_tokens, normalize_word, parse_strikethrough
+from src.llm_cache import LLMCache, M
+from src.removal_spans import split_words
+from src.request_policy import AbortedRequest
+from src.token_estimate import estimate_tokens
+from src.tracing import get_tracer
+
+# Set by the caller to receive the edited text of a streamed call as it grows; None means calls don't stream
+stream_listener: contextvars.ContextVar = contextvars.ContextVar("stream_listener", default=None)
+
+# Complete characters and two-character escapes of a JSON string body
+STRING_BODY_PATTERN = re.compile(r'(?:[^"\\]|\\.)*')
+# A word followed by whitespace, so it can no longer grow
+COMPLETE_WORD_PATTERN = re.compile(r'\S+\s')
+
+
+class StreamDiverged(AbortedRequest):
+    def __init__(self, drift: float, words: int):
+        super().__init__(f"Streamed output diverged from the source (drift {drift:.2f} after {words} words)")
+        self.drift = drift
+        self.words = words
+
+
+class PartialFieldReader:
+    """Decodes one string field of a streamed JSON object as its text arrives."""
+
+    def __init__(self, field: str):
+        self._key_pattern = re.compile(re.escape(json.dumps(field)) + r'\s*:\s*"')
+        self._key_length = len(json.dumps(field)) + 16
+        self._buffer = ""
+        self.found = False
+        self.done = False
+        self.text = ""
+
+    def feed(self, delta: str) -> bool:
+        # Returns True when the field's text grew
+        if self.done:
+            return False
+        self._buffer += delta
+        if not self.found:
+            match = self._key_pattern.search(self._buffer)
+            if match is None:
+                # Keep enough of the tail to match a key split across deltas
+                self._buffer = self._buffer[-self._key_length:]
+                return False
+            self.found = True
+            self._buffer = self._buffer[match.end():]
+
+        end = STRING_BODY_PATTERN.match(self._buffer).end()
+        if end < len(self._buffer) and self._buffer[end] == '"':
+            self.done = True
+        text, used = self._decode(self._buffer[:end])
+        self._buffer = self._buffer[used:]
+        self.text += text
+        return bool(text)
+
+    @staticmethod
+    def _decode(body: str):
+        # Back off over a trailing escape that is still incomplete, or a surrogate awaiting its pair
+        for cut in range(len(body), max(len(body) - 12, 0) - 1, -1):
+            try:
+                text = json.loads(f'"{body[:cut]}"')
+            except ValueError:
+                continue
+            if text and "\ud800" <= text[-1] <= "\udbff":
+                continue
+            return text, cut
+        return "", 0
+
+
+class DivergenceMonitor:
+    """Aligns a growing edit against the start of its source chunk and aborts once it clearly diverges."""
+
+    def __init__(self, source: str, abort_drift: float = 0.3, min_words: int = 30, check_every: int = 20,
+                 on_progress: Optional[Callable[[str], None]] = None):
+        self.source_tokens = [normalize_word(word) for word in split_words(source)]
+        self.abort_drift = abort_drift
+        self.min_words = min_words
+        self.check_every = check_every
+        self.on_progress = on_progress
+        self.text = ""
+        self.drift = 0.0
+        # Complete words are counted as they arrive; the text is only tokenized when a check is due
+        self._scanned = 0
+        self._words = 0
+        self._next_check = min_words
+
+    def update(self, text: str):
+        if len(text) < len(self.text):
+            # A retried request starts over
+            self._scanned = self._words = 0
+            self._next_check = self.min_words
+        self.text = text
+        for match in COMPLETE_WORD_PATTERN.finditer(text, self._scanned):
+            self._words += 1
+            self._scanned = match.end()
+        if self._words < self._next_check:
+            return
+        self._next_check = self._words + self.check_every
+        # The last word may still be arriving
+        output_tokens = [token for token in (normalize_word(word) for word, _ in parse_strikethrough(text)[:-1])
+                         if token]
+        if len(output_tokens) < self.min_words:
+            return
+        window = [token for token in self.source_tokens[:len(output_tokens) * 3 // 2 + self.check_every] if token]
+        pairs = align_tokens(window, output_tokens)
+        inserted = len(output_tokens) - len(pairs)
+        dropped = pairs[-1][0] + 1 - len(pairs) if pairs else 0
+        self.drift = (inserted + dropped) / len(output_tokens)
+        if self.drift > self.abort_drift:
+            raise StreamDiverged(self.drift, len(output_tokens))
+        if self.on_progress is not None:
+            self.on_progress(text)
+
+
+async def astream_with_cache(cache: Optional[LLMCache], engine, messages: List[Dict[str, Any]],
+                             response_format: Type[M], params: Dict[str, Any], on_text: Callable[[str], None],
+                             field: str = "edited_transcript", refresh: bool = False) -> M:
+    # Like aparse_with_cache, but streams the response and hands the growing field text to on_text.
+    # An exception from on_text closes the stream, which stops the generation.
+    model = params.get("model", "default")
+    with get_tracer().span("model_call", model=model, stream=True) as span:
+        key = LLMCache.make_key(messages, response_format, params) if cache else None
+        if cache and not refresh:
+            cached = await cache.aget(key, response_format)
+            if cached is not None:
+                span.set(cached=True)
+                return cached
+
+        async def request(client):
+            reader = PartialFieldReader(field)
+            start = time.monotonic()
+            async with client.beta.chat.completions.stream(
+                messages=messages, response_format=response_format, stream_options={"include_usage": True},
+                **params
+            ) as stream:
+                async for event in stream:
+                    if event.type != "content.delta":
+                        continue
+                    started = bool(reader.text)
+                    if reader.feed(event.delta):
+                        if not started:
+                            span.set(first_output=round(time.monotonic() - start, 6))
+                        on_text(reader.text)
+                return await stream.get_final_completion()
+
+        # Duplicate hedged streams would interleave their text, so streamed calls are never hedged
+        response = await engine.call(request, tokens=2 * estimate_tokens(messages), model=model, hedge=False)
+        parsed = response.choices[0].message.parsed
+        if cache and parsed is not None:
+            await cache.aput(key, parsed)
+        return parsed
@@ -0,0 +1,9 @@
+import json
+from typing import Any, Dict, List
+
+# Roughly four characters per token for English prose and JSON
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(json.dumps(message)) for message in messages) // CHARS_PER_TOKEN + 1
@@ -0,0 +1,199 @@
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, float("inf"))
+
+# (span id, attributes) of the innermost open span; asyncio tasks inherit it from the code that created them
+_current: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "attrs")
+
+    def __init__(self, name: str, span_id: int, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+
+class NullTracer:
+    """Stands in when tracing is off; every call is a constant-time no-op."""
+
+    enabled = False
+    _null_span = nullcontext(_NullSpan())
+
+    def span(self, name: str, **attrs):
+        return self._null_span
+
+    def record(self, name: str, duration: float, **attrs):
+        pass
+
+    def add_tokens(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0):
+        pass
+
+    def close(self):
+        pass
+
+
+class Tracer:
+    """Records nested timing spans to a JSON-lines file and aggregates them into Prometheus metrics."""
+
+    enabled = True
+
+    def __init__(self, trace_path: Optional[str] = None, metrics_path: Optional[str] = None):
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self._file = open(trace_path, 'a') if trace_path else None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._histograms: Dict[str, list] = {}
+        self._sums: Dict[str, float] = {}
+        self._errors: Dict[str, int] = {}
+        self._tokens: Dict[Tuple[str, str], int] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        parent = _current.get()
+        # Chunk, episode and model labels flow down to nested spans
+        inherited = {**parent[1], **attrs} if parent else attrs
+        span = Span(name, next(self._ids), parent[0] if parent else None, inherited)
+        token = _current.set((span.span_id, inherited))
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs = {**span.attrs, "error": type(e).__name__}
+            raise
+        finally:
+            _current.reset(token)
+            self._emit(span, started_at, time.perf_counter() - start)
+
+    def record(self, name: str, duration: float, **attrs):
+        # For intervals measured elsewhere, such as time spent waiting in a queue
+        parent = _current.get()
+        span = Span(name, next(self._ids), parent[0] if parent else None,
+                    {**parent[1], **attrs} if parent else attrs)
+        self._emit(span, time.time() - duration, duration)
+
+    def _emit(self, span: Span, started_at: float, duration: float):
+        with self._lock:
+            counts = self._histograms.setdefault(span.name, [0] * len(BUCKETS))
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    counts[i] += 1
+            self._sums[span.name] = self._sums.get(span.name, 0.0) + duration
+            if "error" in span.attrs:
+                self._errors[span.name] = self._errors.get(span.name, 0) + 1
+            if self._file is not None:
+                event = {"name": span.name, "span_id": span.span_id, "parent_id": span.parent_id,
+                         "start": round(started_at, 6), "duration": round(duration, 6), **span.attrs}
+                self._file.write(json.dumps(event, default=str) + "\n")
+
+    def add_tokens(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0):
+        # Cached tokens are the part of the prompt served from the provider's prefix cache
+        with self._lock:
+            for kind, count in (("prompt", prompt_tokens), ("completion", completion_tokens), ("cached", cached_tokens)):
+                self._tokens[(model, kind)] = self._tokens.get((model, kind), 0) + count
+
+    def metrics_text(self) -> str:
+        lines = ["# TYPE video_editor_span_seconds histogram"]
+        with self._lock:
+            for name, counts in sorted(self._histograms.items()):
+                for bound, count in zip(BUCKETS, counts):
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'video_editor_span_seconds_bucket{{span="{name}",le="{le}"}} {count}')
+                lines.append(f'video_editor_span_seconds_sum{{span="{name}"}} {self._sums[name]:.6f}')
+                lines.append(f'video_editor_span_seconds_count{{span="{name}"}} {counts[-1]}')
+            lines.append("# TYPE video_editor_span_errors_total counter")
+            for name, count in sorted(self._errors.items()):
+                lines.append(f'video_editor_span_errors_total{{span="{name}"}} {count}')
+            lines.append("# TYPE video_editor_tokens_total counter")
+            for (model, kind), count in sorted(self._tokens.items()):
+                lines.append(f'video_editor_tokens_total{{model="{model}",kind="{kind}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: Optional[str] = None):
+        path = path or self.metrics_path
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.metrics_text())
+        os.replace(tmp_path, path)
+
+    def serve_metrics(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                data = tracer.metrics_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self):
+        self.write_metrics()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+_tracer = NullTracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def configure_tracing(trace_path: Optional[str] = None, metrics_path: Optional[str] = None,
+                      metrics_port: Optional[int] = None):
+    # Tracing stays a no-op unless a trace file, metrics file or metrics port is given
+    global _tracer
+    _tracer.close()
+    if not (trace_path or metrics_path or metrics_port):
+        _tracer = NullTracer()
+        return _tracer
+    _tracer = Tracer(trace_path, metrics_path)
+    if metrics_port:
+        _tracer.serve_metrics(metrics_port)
+    return _tracer
+
+
+atexit.register(lambda: _tracer.close())
+
+if os.getenv("VIDEO_EDITOR_TRACE_FILE") or os.getenv("VIDEO_EDITOR_METRICS_FILE"):
+    configure_tracing(os.getenv("VIDEO_EDITOR_TRACE_FILE"), os.getenv("VIDEO_EDITOR_METRICS_FILE"))
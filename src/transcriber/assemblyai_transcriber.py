@@ -5,29 +5,55 @@ from typing import Optional, Dict, Any, List
 import hashlib
 from dotenv import load_dotenv
 
+from src.tracing import get_tracer
+from src.transcriber.file_fingerprint import FingerprintIndex, sample_digest, stream_digest
 from src.transcriber.transcript_storage import TranscriptStorage
+from src.transcriber.word_store import WordStore
+from src.transcriber.word_table import WordTable
 
 load_dotenv()  # Load environment variables from .env file
 
-def generate_hash(file_path: str, config: Dict[str, Any]) -> str:
+def generate_hash(file_path: str, config: Dict[str, Any], mode: str = "full",
+                  index: Optional[FingerprintIndex] = None) -> str:
+    # "full" hashes every byte and matches keys stored by earlier versions;
+    # "sampled" hashes the size and a fixed number of blocks for very large files
+    if mode not in ("full", "sampled"):
+        raise ValueError("Hash mode must be 'full' or 'sampled'")
+    config_json = json.dumps(config, sort_keys=True)
+    namespace = f"{mode}:{hashlib.sha256(config_json.encode('utf-8')).hexdigest()}"
+    if index:
+        cached = index.lookup(file_path, namespace)
+        if cached:
+            return cached
+
+    fingerprint = FingerprintIndex.fingerprint(file_path)
     hasher = hashlib.sha256()
-    with open(file_path, 'rb') as f:
-        hasher.update(f.read())
-    hasher.update(json.dumps(config, sort_keys=True).encode('utf-8'))
-    return hasher.hexdigest()
+    if mode == "full":
+        stream_digest(file_path, hasher)
+    else:
+        sample_digest(file_path, hasher)
+    hasher.update(config_json.encode('utf-8'))
+    digest = hasher.hexdigest()
+    # Only remember the result if the file did not change while we were reading it
+    if index and FingerprintIndex.fingerprint(file_path) == fingerprint:
+        index.store(file_path, namespace, digest, fingerprint)
+    return digest
 
 
 class AssemblyAITranscriber:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, hash_mode: str = "full"):
         self.api_key = api_key or os.getenv("ASSEMBLYAI_API_KEY")
         if not self.api_key:
             raise ValueError("API key must be provided or set as ASSEMBLYAI_API_KEY environment variable")
         aai.settings.api_key = self.api_key
         self.transcriber = aai.Transcriber()
         self.transcript_storage = TranscriptStorage()
+        self.hash_mode = hash_mode
+        self.fingerprint_index = FingerprintIndex()
+        self.word_store = WordStore()
 
-    def transcribe(self, file_path: str) -> aai.Transcript:
-        transcription_config = aai.TranscriptionConfig(
+    def _transcription_config(self) -> aai.TranscriptionConfig:
+        return aai.TranscriptionConfig(
             speech_model=aai.SpeechModel.nano, 
             language_code="en", 
             speaker_labels=True, 
@@ -36,9 +62,18 @@ class AssemblyAITranscriber:
             disfluencies=True, 
             filter_profanity=False
         )
+
+    def file_hash(self, file_path: str) -> str:
+        transcription_config = self._transcription_config()
+        with get_tracer().span("hash", mode=self.hash_mode):
+            return generate_hash(file_path, transcription_config._raw_transcription_config.__dict__,
+                                 mode=self.hash_mode, index=self.fingerprint_index)
+
+    def transcribe(self, file_path: str) -> aai.Transcript:
+        transcription_config = self._transcription_config()
         
         # Check if the hash exists in the local storage
-        file_hash = generate_hash(file_path, transcription_config._raw_transcription_config.__dict__)
+        file_hash = self.file_hash(file_path)
         transcript_id = self.transcript_storage.get_transcript_id(file_hash)
         # If it exists, fetch the transcript from AssemblyAI
         if transcript_id:
@@ -49,10 +84,37 @@ class AssemblyAITranscriber:
             self.transcript_storage.save_transcript_id(file_hash, transcript.id)
             return transcript
 
+    @property
+    def config_key(self) -> str:
+        return json.dumps(self._transcription_config()._raw_transcription_config.__dict__, sort_keys=True)
+
+    def transcribe_words(self, file_path: str) -> WordTable:
+        # Uncached; the segmented transcriber keeps its own cache per audio segment
+        transcript = self.transcriber.transcribe(file_path, config=self._transcription_config())
+        if transcript.status == aai.TranscriptStatus.error:
+            raise RuntimeError(f"Transcription of {file_path} failed: {transcript.error}")
+        return WordTable.from_sentences(transcript.get_sentences())
+
     def get_sentences(self, file_path: str) -> List[aai.types.Sentence]:
         transcript = self.transcribe(file_path)
         return transcript.get_sentences()
 
+    def cached_word_table(self, file_path: str) -> Optional[WordTable]:
+        # Only the local store is consulted; None when the file was never transcribed
+        return self.word_store.load(self.file_hash(file_path))
+
+    def get_word_table(self, file_path: str) -> WordTable:
+        # Words seen before are read from the local column store without any network round trip
+        file_hash = self.file_hash(file_path)
+        table = self.word_store.load(file_hash)
+        if table is not None:
+            return table
+        with get_tracer().span("transcription_fetch"):
+            transcript = self.transcribe(file_path)
+            table = WordTable.from_sentences(transcript.get_sentences())
+        self.word_store.save(file_hash, table, transcript_id=transcript.id)
+        return self.word_store.load(file_hash) or table
+
 
 if __name__ == "__main__":
     transcriber = AssemblyAITranscriber()
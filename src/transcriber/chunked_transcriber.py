@@ -1,46 +1,167 @@
-from typing import List
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from src.token_estimate import CHARS_PER_TOKEN
 from src.transcriber.assemblyai_transcriber import AssemblyAITranscriber
+from src.transcriber.word_table import WordTable
 import assemblyai as aai
 
+
+@dataclass
+class TranscriptChunk:
+    text: str
+    # One entry per whitespace token of text: the word's index in the WordTable, or -1 for speaker tags
+    word_indices: List[int]
+
+
+def sentence_anchors(table: WordTable, speakers: List[Optional[str]]) -> np.ndarray:
+    # anchors[i] is a uniform value in [0, 1) fixed by the two sentences either side of the boundary before i
+    digests = []
+    for sentence in range(table.sentence_count):
+        begin, end = table.sentence_bounds(sentence)
+        text = f"{speakers[sentence]}|{' '.join(table.text[begin:end])}"
+        digests.append(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest())
+    anchors = np.ones(len(digests))
+    for i in range(1, len(digests)):
+        window = hashlib.blake2b(digests[i - 1] + digests[i], digest_size=8).digest()
+        anchors[i] = int.from_bytes(window, "big") / 2 ** 64
+    return anchors
+
+
 class ChunkedTranscriber:
-    def __init__(self, chunk_size: int = 10):
-        self.transcriber = AssemblyAITranscriber()
+    def __init__(self, chunk_size: int = 10, token_budget: Optional[int] = None, speaker_slack: float = 0.15,
+                 content_defined: bool = False):
+        self._transcriber = None
+        # Chunks are sized in words by default, or in estimated tokens when a token budget is given
         self.chunk_size = chunk_size
+        self.token_budget = token_budget
+        # How far (as a fraction of the target size) a boundary may move to land on a speaker turn
+        self.speaker_slack = speaker_slack
+        # Content-defined boundaries only move near an edit, so a corrected transcript keeps most chunk hashes
+        self.content_defined = content_defined
 
-    def chunk_sentences(self, file_path: str) -> List[str]:
-        sentences = self.transcriber.get_sentences(file_path)
-        chunks = []
-        current_chunk = []
-        current_word_count = 0
-        last_speaker = None
-
-        for sentence in sentences:
-            words = sentence.words
-            word_count = len(words)
-            speaker_tag = f"**Speaker {sentence.speaker or 'Unknown'}:** "
-            sentence_text = f"{sentence.text}"
-
-            if sentence.speaker != last_speaker or not current_chunk:
-                sentence_text = f"{speaker_tag} {sentence_text}"
-                last_speaker = sentence.speaker
-
-            if current_word_count + word_count > self.chunk_size:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = [speaker_tag + sentence_text]
-                current_word_count = word_count
-            else:
-                current_chunk.append(sentence_text)
-                current_word_count += word_count
-
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
+    @property
+    def transcriber(self) -> AssemblyAITranscriber:
+        # Created on first use so chunking an existing WordTable needs no AssemblyAI credentials
+        if self._transcriber is None:
+            self._transcriber = AssemblyAITranscriber()
+        return self._transcriber
+
+    def get_word_table(self, file_path: str) -> WordTable:
+        return self.transcriber.get_word_table(file_path)
 
+    def cached_word_table(self, file_path: str) -> Optional[WordTable]:
+        return self.transcriber.cached_word_table(file_path)
+
+    def chunk_words(self, file_path: str) -> List[TranscriptChunk]:
+        return self.chunk_table(self.get_word_table(file_path))
+
+    def sentence_weights(self, table: WordTable) -> np.ndarray:
+        starts = np.asarray(table.sentence_starts, dtype=np.int64)
+        if self.token_budget is None:
+            return np.diff(np.append(starts, len(table)))
+        # Byte lengths come straight from the packed offsets when the table is memory-mapped
+        offsets = getattr(table.text, "offsets", None)
+        lengths = np.diff(offsets) if offsets is not None else np.fromiter((len(w) for w in table.text), np.int64)
+        chars = np.add.reduceat(lengths + 1, starts) if len(starts) else np.zeros(0, np.int64)
+        return chars / CHARS_PER_TOKEN
+
+    def plan_boundaries(self, weights: np.ndarray, turns: np.ndarray) -> List[int]:
+        # Sentence indices where chunks start: the fewest chunks that fit the budget, evenly sized.
+        budget = self.token_budget or self.chunk_size
+        count = len(weights)
+        prefix = np.concatenate(([0.0], np.cumsum(weights, dtype=np.float64)))
+        # reach[i]: the furthest boundary a chunk starting at sentence i can extend to (at least one sentence)
+        reach = np.maximum(np.searchsorted(prefix, prefix[:-1] + budget, side="right") - 1, np.arange(1, count + 1))
+        # needed[i]: the fewest chunks that hold sentences i onwards; packing greedily from i is optimal
+        needed = np.zeros(count + 1, dtype=np.int64)
+        for i in range(count - 1, -1, -1):
+            needed[i] = needed[reach[i]] + 1
+
+        chunks = int(needed[0])
+        boundaries = [0]
+        last = 0
+        low = 1
+        window = 1
+        for cut in range(1, chunks):
+            remaining = chunks - cut
+            # Spread whatever is left evenly, and move onto a speaker turn when one is within reach
+            target = (prefix[-1] - prefix[last]) / (remaining + 1)
+            slack = target * self.speaker_slack
+            ideal = prefix[last] + target
+            # Cuts between low and high keep the rest of the episode packable into the remaining chunks
+            while needed[low] > remaining:
+                low += 1
+            high = int(reach[last])
+            while window < count and prefix[window] < ideal - slack:
+                window += 1
+            best, best_score = None, None
+            k = max(low, window)
+            while k <= high and prefix[k] <= ideal + slack:
+                score = abs(prefix[k] - ideal) + (0 if turns[k] else slack / 2)
+                if best_score is None or score < best_score:
+                    best, best_score = k, score
+                k += 1
+            if best is None:
+                best = high if prefix[high] < ideal else low
+            boundaries.append(best)
+            last = best
+        return boundaries
+
+    def plan_content_boundaries(self, weights: np.ndarray, turns: np.ndarray, anchors: np.ndarray) -> List[int]:
+        # Cut where the hash of the sentences around a boundary is small enough, once a chunk holds half
+        # the budget. Cuts depend only on nearby content, so after an edit they fall back into step.
+        budget = self.token_budget or self.chunk_size
+        # Anchors are drawn per unit of weight so chunks average about three quarters of the budget,
+        # and speaker turns are four times as likely to be chosen
+        rate = weights / (budget / 4) * np.where(turns, 4.0, 1.0)
+        boundaries = [0]
+        size = 0.0
+        for i in range(1, len(weights)):
+            size += weights[i - 1]
+            if size + weights[i] > budget or (size >= budget / 2 and anchors[i] < rate[i]):
+                boundaries.append(i)
+                size = 0.0
+        return boundaries
+
+    def chunk_table(self, table: WordTable) -> List[TranscriptChunk]:
+        count = table.sentence_count
+        if count == 0:
+            return []
+        speakers = [table.sentence_speaker(sentence) for sentence in range(count)]
+        turns = np.array([i == 0 or speakers[i] != speakers[i - 1] for i in range(count)])
+        weights = self.sentence_weights(table)
+        if self.content_defined:
+            boundaries = self.plan_content_boundaries(weights, turns, sentence_anchors(table, speakers))
+        else:
+            boundaries = self.plan_boundaries(weights, turns)
+        boundaries = boundaries + [count]
+
+        chunks = []
+        for first, stop in zip(boundaries, boundaries[1:]):
+            tokens = []
+            indices = []
+            for sentence in range(first, stop):
+                # Every chunk opens with its speaker's tag; later tags mark speaker changes only
+                if sentence == first or turns[sentence]:
+                    tokens.append(f"**Speaker {speakers[sentence] or 'Unknown'}:**")
+                    indices.append(-1)
+                begin, end = table.sentence_bounds(sentence)
+                tokens.extend(table.text[begin:end])
+                indices.extend(range(begin, end))
+            chunks.append(TranscriptChunk(" ".join(tokens), indices))
         return chunks
 
+    def chunk_sentences(self, file_path: str) -> List[str]:
+        return [chunk.text for chunk in self.chunk_words(file_path)]
+
 
 if __name__ == "__main__":
     chunked_transcriber = ChunkedTranscriber(chunk_size=700)
     chunks = chunked_transcriber.chunk_sentences("/Users/adi/Downloads/final_audio.mp3")
 
     for i, chunk in enumerate(chunks):
-        print(f"Chunk {i+1}:\n{chunk}\n")
\ No newline at end of file
+        print(f"Chunk {i+1}:\n{chunk}\n")
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from src.cache_dir import get_cache_dir
+
+HASH_BLOCK_SIZE = 1 << 20
+SAMPLE_COUNT = 32
+
+
+def stream_digest(file_path: str, hasher, block_size: int = HASH_BLOCK_SIZE):
+    # Feed the file through the hasher a block at a time instead of reading it whole
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+
+
+def sample_digest(file_path: str, hasher, sample_count: int = SAMPLE_COUNT, block_size: int = HASH_BLOCK_SIZE):
+    # Size plus evenly spaced blocks (always including the first and last) identify large media cheaply
+    size = os.path.getsize(file_path)
+    hasher.update(b"sampled:" + str(size).encode("utf-8"))
+    if size <= sample_count * block_size:
+        stream_digest(file_path, hasher, block_size)
+        return
+    step = (size - block_size) // (sample_count - 1)
+    with open(file_path, 'rb') as f:
+        for i in range(sample_count):
+            f.seek(i * step)
+            hasher.update(f.read(block_size))
+
+
+class FingerprintIndex:
+    """Maps (device, inode, size, mtime_ns) of a file to the hash computed for it, so unchanged files are never re-read."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(get_cache_dir(), "fingerprints.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            "device INTEGER NOT NULL, inode INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "namespace TEXT NOT NULL, digest TEXT NOT NULL, path TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (device, inode, size, mtime_ns, namespace))"
+        )
+
+    @staticmethod
+    def fingerprint(file_path: str):
+        st = os.stat(file_path)
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+    def lookup(self, file_path: str, namespace: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM fingerprints WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ? "
+                "AND namespace = ?", (*self.fingerprint(file_path), namespace)
+            ).fetchone()
+        return row[0] if row else None
+
+    def store(self, file_path: str, namespace: str, digest: str, fingerprint=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints "
+                "(device, inode, size, mtime_ns, namespace, digest, path, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*(fingerprint or self.fingerprint(file_path)), namespace, digest, os.path.abspath(file_path),
+                 time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
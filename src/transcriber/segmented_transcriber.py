@@ -0,0 +1,310 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.alignment import normalize_word
+from src.audio_renderer import WavInfo, read_frames, read_wav_info, to_mono, write_wav_frames
+from src.cache_dir import get_cache_dir
+from src.tracing import get_tracer
+from src.transcriber.assemblyai_transcriber import AssemblyAITranscriber
+from src.transcriber.chunked_transcriber import ChunkedTranscriber, TranscriptChunk
+from src.transcriber.word_store import WordStore
+from src.transcriber.word_table import WordTable
+
+# Words of neighbouring segments' overlap are the same word when their starts are this close
+MATCH_TOLERANCE_MS = 250
+
+
+@dataclass
+class Segment:
+    index: int
+    # Frames [start, end) belong to this segment; it is transcribed up to stop, overlapping the next one
+    start: int
+    end: int
+    stop: int
+    digest: str = ""
+
+
+def silent_runs(mono: np.ndarray, window: int, threshold: float) -> np.ndarray:
+    # (first, last) window of every run of windows whose RMS is below threshold
+    count = len(mono) // window
+    rms = np.sqrt(np.mean(np.square(mono[:count * window].reshape(count, window)), axis=1))
+    edges = np.diff(np.concatenate(([0], (rms < threshold).astype(np.int8), [0])))
+    return np.stack([np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)], axis=1)
+
+
+class BurstTranscriber:
+    """Local stand-in for AssemblyAI: every burst of sound becomes one sentence, its pitch the speaker.
+
+    Speaker labels are assigned per call in order of appearance, as a real diarizer would per request.
+    """
+
+    config_key = "bursts-v1"
+
+    def __init__(self, window_ms: int = 20, silence_db: float = -40.0, word_ms: int = 250):
+        self.window_ms = window_ms
+        self.threshold = 10 ** (silence_db / 20)
+        self.word_ms = word_ms
+        self.calls = 0
+
+    def transcribe_words(self, file_path: str) -> WordTable:
+        self.calls += 1
+        info = read_wav_info(file_path)
+        mono = to_mono(read_frames(file_path, info), info)
+        window = max(info.sample_rate * self.window_ms // 1000, 1)
+        count = len(mono) // window
+        loud = ~np.zeros(count, dtype=bool)
+        for first, last in silent_runs(mono, window, self.threshold):
+            loud[first:last] = False
+        edges = np.diff(np.concatenate(([0], loud.astype(np.int8), [0])))
+        text, start, end, speaker, speakers, sentence_starts = [], [], [], [], [], []
+        labels: Dict[int, int] = {}
+        for first, last in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            burst = mono[first * window:last * window]
+            # Zero crossings give the pitch, rounded so every burst of one voice lands on the same speaker
+            crossings = np.count_nonzero(np.diff(np.signbit(burst)))
+            pitch = int(round(crossings / 2 / (len(burst) / info.sample_rate), -1))
+            if pitch not in labels:
+                labels[pitch] = len(speakers)
+                speakers.append(chr(ord("A") + len(speakers)))
+            begin_ms = first * window * 1000 // info.sample_rate
+            end_ms = last * window * 1000 // info.sample_rate
+            words = max((end_ms - begin_ms) // self.word_ms, 1)
+            sentence_starts.append(len(text))
+            for k in range(words):
+                text.append(f"p{pitch}n{k}" + ("." if k == words - 1 else ""))
+                start.append(begin_ms + k * self.word_ms)
+                end.append(min(begin_ms + (k + 1) * self.word_ms, end_ms))
+                speaker.append(labels[pitch])
+        return WordTable(text, np.asarray(start, dtype=np.int64), np.asarray(end, dtype=np.int64),
+                         np.full(len(text), 0.9, dtype=np.float32), np.asarray(speaker, dtype=np.int32),
+                         speakers, np.asarray(sentence_starts, dtype=np.int64))
+
+
+class SpeakerReconciler:
+    """Builds one episode WordTable from per-segment tables, mapping each segment's speaker labels onto
+    the labels of the segments before it through the words both transcribed in their overlap."""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.speakers: List[Optional[str]] = []
+        self._parts: List[Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self._words = 0
+        # Absolute start, normalized text and episode speaker of the previous segment's words past its end
+        self._overlap: List[Tuple[int, str, int]] = []
+
+    def _ms(self, frame: int) -> int:
+        return frame * 1000 // self.sample_rate
+
+    def _speaker_map(self, local: WordTable, offset_ms: int) -> Dict[int, int]:
+        votes: Dict[Tuple[int, int], int] = {}
+        reach = max((start for start, _, _ in self._overlap), default=0) + MATCH_TOLERANCE_MS - offset_ms
+        for i in range(int(np.searchsorted(np.asarray(local.start), reach, side="right"))):
+            start, token = int(local.start[i]) + offset_ms, normalize_word(local.text[i])
+            for overlap_start, overlap_token, speaker in self._overlap:
+                if token == overlap_token and abs(start - overlap_start) <= MATCH_TOLERANCE_MS:
+                    key = (int(local.speaker[i]), speaker)
+                    votes[key] = votes.get(key, 0) + 1
+        mapping: Dict[int, int] = {}
+        for (code, speaker), _ in sorted(votes.items(), key=lambda item: -item[1]):
+            if code not in mapping and speaker not in mapping.values():
+                mapping[code] = speaker
+        # Voices missing from the overlap take the episode's unclaimed speakers, in order of appearance
+        unclaimed = [code for code in range(len(self.speakers)) if code not in mapping.values()]
+        for code in range(len(local.speakers)):
+            if code not in mapping:
+                if unclaimed:
+                    mapping[code] = unclaimed.pop(0)
+                else:
+                    mapping[code] = len(self.speakers)
+                    self.speakers.append(local.speakers[code] if local.speakers[code] not in self.speakers
+                                         else chr(ord("A") + len(self.speakers)))
+        return mapping
+
+    def add(self, segment: Segment, local: WordTable):
+        offset_ms = self._ms(segment.start)
+        mapping = self._speaker_map(local, offset_ms)
+        codes = np.asarray([mapping[int(code)] for code in local.speaker], dtype=np.int32)
+        # Words past the segment's end belong to the next segment and are only kept to match its speakers
+        kept = int(np.searchsorted(np.asarray(local.start), self._ms(segment.end - segment.start), side="left"))
+        starts = np.asarray(local.sentence_starts)
+        starts = starts[starts < kept]
+        self._parts.append((list(local.text[:kept]), np.asarray(local.start[:kept]) + offset_ms,
+                            np.asarray(local.end[:kept]) + offset_ms, np.asarray(local.confidence[:kept]),
+                            codes[:kept], starts + self._words))
+        self._words += kept
+        self._overlap = [(int(local.start[i]) + offset_ms, normalize_word(local.text[i]), int(codes[i]))
+                         for i in range(kept, len(local))]
+
+    def table(self) -> WordTable:
+        if not self._parts:
+            return WordTable([], np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32),
+                             np.zeros(0, np.int32), [], np.zeros(0, np.int64))
+        text = [word for part in self._parts for word in part[0]]
+        start, end, confidence, speaker, sentence_starts = (np.concatenate([part[k] for part in self._parts])
+                                                            for k in range(1, 6))
+        return WordTable(text, start.astype(np.int64), end.astype(np.int64), confidence.astype(np.float32),
+                         speaker.astype(np.int32), list(self.speakers), sentence_starts.astype(np.int64))
+
+
+class SegmentedTranscriber:
+    """Splits long WAV audio at silences and transcribes the segments in parallel, caching each segment's
+    words by a hash of its samples, so chunks can be edited before the whole file is transcribed."""
+
+    def __init__(self, transcriber=None, target_segment_ms: int = 300_000, min_segment_ms: int = 120_000,
+                 max_segment_ms: int = 600_000, min_silence_ms: int = 700, silence_db: float = -40.0,
+                 overlap_ms: int = 10_000, max_workers: int = 4, store: Optional[WordStore] = None,
+                 window_ms: int = 20, pad_ms: int = 100):
+        # transcriber needs transcribe_words(wav_path) -> WordTable and a config_key; AssemblyAI by default
+        self._transcriber = transcriber
+        self.target_segment_ms = target_segment_ms
+        self.min_segment_ms = min_segment_ms
+        self.max_segment_ms = max_segment_ms
+        self.min_silence_ms = min_silence_ms
+        self.threshold = 10 ** (silence_db / 20)
+        self.overlap_ms = overlap_ms
+        self.max_workers = max_workers
+        self.store = store or WordStore(get_cache_dir("segments"))
+        self.window_ms = window_ms
+        # Cuts fall this long before the speech that ends a silence
+        self.pad_ms = pad_ms
+
+    @property
+    def transcriber(self):
+        if self._transcriber is None:
+            self._transcriber = AssemblyAITranscriber()
+        return self._transcriber
+
+    def cut_candidates(self, frames: np.ndarray, info: WavInfo) -> List[Tuple[int, float]]:
+        # (frame, anchor) per silence long enough to cut in. The cut is placed from the exact frame where
+        # speech resumes and the anchor hashes the audio that follows, so both move with the content when
+        # audio is trimmed or inserted earlier in the file.
+        window = max(info.sample_rate * self.window_ms // 1000, 1)
+        min_windows = max(self.min_silence_ms // self.window_ms, 1)
+        pad = info.sample_rate * self.pad_ms // 1000
+        fingerprint = max(info.sample_rate // 10, 1)
+        candidates = []
+        block = window * 4096
+        runs = []
+        for block_start in range(0, len(frames), block):
+            mono = to_mono(frames[block_start:block_start + block], info)
+            for first, last in silent_runs(mono, window, self.threshold):
+                first, last = first * window + block_start, last * window + block_start
+                if runs and runs[-1][1] == first:
+                    runs[-1] = (runs[-1][0], last)
+                else:
+                    runs.append((first, last))
+        for first, last in runs:
+            if last - first < min_windows * window or first == 0 or last + window >= len(frames):
+                continue
+            middle = (first + last) // 2
+            search = to_mono(frames[middle:last + window], info)
+            loud = np.flatnonzero(np.abs(search) > self.threshold)
+            onset = middle + int(loud[0]) if len(loud) else last
+            following = np.asarray(frames[onset:onset + fingerprint]).tobytes()
+            digest = hashlib.blake2b(following, digest_size=8).digest()
+            candidates.append((max(onset - pad, middle), int.from_bytes(digest, "big") / 2 ** 64))
+        return candidates
+
+    def plan_segments(self, path: str) -> List[Segment]:
+        info = read_wav_info(path)
+        frames = read_frames(path, info)
+        rate = info.sample_rate
+        min_frames, max_frames = self.min_segment_ms * rate // 1000, self.max_segment_ms * rate // 1000
+        cuts = []
+        previous_cut = previous_candidate = 0
+        candidates = self.cut_candidates(frames, info)
+        for position, (cut, anchor) in enumerate(candidates):
+            while cut - previous_cut > max_frames:
+                # No accepted silence in reach: fall back to the last silence before the limit, else cut hard
+                fallback = [c for c, _ in candidates[:position]
+                            if previous_cut + min_frames <= c <= previous_cut + max_frames]
+                previous_cut = fallback[-1] if fallback else previous_cut + max_frames
+                cuts.append(previous_cut)
+            # Silences are accepted in proportion to the audio since the last one, about one per target length
+            accept = anchor < (cut - previous_candidate) / (self.target_segment_ms * rate / 1000)
+            previous_candidate = cut
+            if accept and cut - previous_cut >= min_frames:
+                cuts.append(cut)
+                previous_cut = cut
+        while len(frames) - previous_cut > max_frames:
+            previous_cut += max_frames
+            cuts.append(previous_cut)
+        bounds = [0] + cuts + [len(frames)]
+        overlap = self.overlap_ms * rate // 1000
+        segments = [Segment(i, start, end, min(end + overlap, len(frames)))
+                    for i, (start, end) in enumerate(zip(bounds, bounds[1:])) if end > start]
+        for segment in segments:
+            segment.digest = self.segment_digest(frames, info, segment)
+        del frames
+        return segments
+
+    def segment_digest(self, frames: np.ndarray, info: WavInfo, segment: Segment) -> str:
+        hasher = hashlib.sha256()
+        layout = f"{info.format_tag}:{info.channels}:{info.sample_rate}:{info.bits_per_sample}|"
+        hasher.update(layout.encode("utf-8"))
+        hasher.update(self.transcriber.config_key.encode("utf-8"))
+        for block_start in range(segment.start, segment.stop, 1 << 16):
+            hasher.update(np.asarray(frames[block_start:min(block_start + (1 << 16), segment.stop)]).tobytes())
+        return hasher.hexdigest()
+
+    def transcribe_segment(self, path: str, segment: Segment) -> WordTable:
+        # Segments transcribed before, in this file or any other, are read back from the store
+        table = self.store.load(segment.digest)
+        if table is not None:
+            return table
+        with get_tracer().span("segment_transcription", segment=segment.index):
+            fd, segment_path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                write_wav_frames(path, segment.start, segment.stop, segment_path)
+                table = self.transcriber.transcribe_words(segment_path)
+            finally:
+                os.remove(segment_path)
+        self.store.save(segment.digest, table)
+        return self.store.load(segment.digest) or table
+
+    def get_word_table(self, path: str) -> WordTable:
+        segments = self.plan_segments(path)
+        reconciler = SpeakerReconciler(read_wav_info(path).sample_rate)
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for segment, table in zip(segments, executor.map(lambda s: self.transcribe_segment(path, s), segments)):
+                reconciler.add(segment, table)
+        return reconciler.table()
+
+    async def aiter_tables(self, path: str) -> AsyncIterator[Tuple[WordTable, bool]]:
+        # (table of every segment finished so far, whether it is the whole file), as each next segment lands
+        segments = await asyncio.to_thread(self.plan_segments, path)
+        reconciler = SpeakerReconciler(read_wav_info(path).sample_rate)
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def transcribe(segment: Segment) -> WordTable:
+            async with slots:
+                return await asyncio.to_thread(self.transcribe_segment, path, segment)
+
+        tasks = [asyncio.ensure_future(transcribe(segment)) for segment in segments]
+        try:
+            for position, (segment, task) in enumerate(zip(segments, tasks)):
+                reconciler.add(segment, await task)
+                yield reconciler.table(), position == len(segments) - 1
+        finally:
+            for task in tasks:
+                task.cancel()
+        if not segments:
+            yield reconciler.table(), True
+
+    async def aiter_chunks(self, path: str, chunker: ChunkedTranscriber
+                           ) -> AsyncIterator[Tuple[WordTable, List[TranscriptChunk]]]:
+        # Chunks known to be final so far. Content-defined chunk boundaries depend only on the sentences
+        # before them, so every chunk but the last is settled; other chunkers only settle at the end.
+        async for table, final in self.aiter_tables(path):
+            if final:
+                yield table, chunker.chunk_table(table)
+            elif chunker.content_defined:
+                yield table, chunker.chunk_table(table)[:-1]
@@ -1,26 +1,61 @@
 import json
+import os
+import sqlite3
+import threading
 from typing import Optional
 
+from src.cache_dir import get_cache_dir
+
 
 class TranscriptStorage:
-    def __init__(self, storage_path: str = "/Users/adi/Documents/GitHub/video_editor/tmp/transcript_ids.json"):
+    def __init__(self, storage_path: Optional[str] = None):
+        # TRANSCRIPT_STORAGE_PATH lets parallel batch workers share one index
+        storage_path = storage_path or os.getenv("TRANSCRIPT_STORAGE_PATH") \
+            or os.path.join(get_cache_dir(), "transcripts.sqlite3")
+        legacy_json_path = None
+        if storage_path.endswith(".json"):
+            # Older versions kept a JSON file; keep reading it but store in SQLite beside it
+            legacy_json_path = storage_path
+            storage_path = storage_path[:-len(".json")] + ".sqlite3"
         self.storage_path = storage_path
-        self._load_storage()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.storage_path, timeout=30, check_same_thread=False, isolation_level=None)
+        # WAL gives atomic commits and lets readers in other processes run during a write
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts (file_hash TEXT PRIMARY KEY, transcript_id TEXT NOT NULL)"
+        )
+        if legacy_json_path:
+            self._import_json(legacy_json_path)
 
-    def _load_storage(self):
+    def _import_json(self, json_path: str):
         try:
-            with open(self.storage_path, 'r') as f:
-                self.storage = json.load(f)
-        except FileNotFoundError:
-            self.storage = {}
-
-    def _save_storage(self):
-        with open(self.storage_path, 'w') as f:
-            json.dump(self.storage, f)
+            with open(json_path, 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO transcripts (file_hash, transcript_id) VALUES (?, ?)", entries.items()
+            )
+            self._conn.execute("COMMIT")
 
     def get_transcript_id(self, file_hash: str) -> Optional[str]:
-        return self.storage.get(file_hash)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT transcript_id FROM transcripts WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+        return row[0] if row else None
 
     def save_transcript_id(self, file_hash: str, transcript_id: str):
-        self.storage[file_hash] = transcript_id
-        self._save_storage()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (file_hash, transcript_id) VALUES (?, ?)",
+                (file_hash, transcript_id)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+from src.cache_dir import get_cache_dir
+from src.transcriber.word_table import WordTable
+
+STORE_VERSION = 1
+COLUMNS = ("start", "end", "confidence", "speaker", "sentence_starts")
+
+
+class PackedStrings:
+    """Read-only sequence of strings stored as one UTF-8 buffer plus offsets; decodes on access."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, strings) -> "PackedStrings":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return bytes(self.data[self.offsets[index]:self.offsets[index + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class WordStore:
+    """Keeps each transcript's WordTable on disk as memory-mappable columns, keyed by the audio file hash."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or get_cache_dir("words")
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, file_hash: str) -> str:
+        return os.path.join(self.root, file_hash)
+
+    def load(self, file_hash: str) -> Optional[WordTable]:
+        path = self._path(file_hash)
+        try:
+            with open(os.path.join(path, "meta.json"), 'r') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if meta.get("version") != STORE_VERSION:
+            return None
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+        offsets = np.load(os.path.join(path, "text_offsets.npy"), mmap_mode='r')
+        text_path = os.path.join(path, "text.bin")
+        # np.memmap rejects empty files
+        data = np.memmap(text_path, dtype=np.uint8, mode='r') if os.path.getsize(text_path) else np.zeros(0, np.uint8)
+        return WordTable(PackedStrings(data, offsets), columns["start"], columns["end"], columns["confidence"],
+                         columns["speaker"], meta["speakers"], columns["sentence_starts"])
+
+    def save(self, file_hash: str, table: WordTable, transcript_id: Optional[str] = None):
+        text = table.text if isinstance(table.text, PackedStrings) else PackedStrings.pack(table.text)
+        # Build in a temporary directory and rename it into place so readers never see a partial entry
+        tmp_path = tempfile.mkdtemp(dir=self.root, prefix=f".{file_hash}.")
+        try:
+            for name in COLUMNS:
+                np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(getattr(table, name)))
+            np.save(os.path.join(tmp_path, "text_offsets.npy"), np.asarray(text.offsets))
+            with open(os.path.join(tmp_path, "text.bin"), 'wb') as f:
+                f.write(np.asarray(text.data).tobytes())
+            with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+                json.dump({"version": STORE_VERSION, "speakers": table.speakers, "transcript_id": transcript_id}, f)
+            os.rename(tmp_path, self._path(file_hash))
+        except OSError:
+            # Another process stored the same transcript first
+            if not os.path.isdir(self._path(file_hash)):
+                raise
+        finally:
+            if os.path.isdir(tmp_path):
+                shutil.rmtree(tmp_path)
@@ -0,0 +1,64 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+class WordTable:
+    """Column arrays for every word of a transcript plus the word index where each sentence starts."""
+
+    def __init__(self, text: Sequence[str], start: np.ndarray, end: np.ndarray, confidence: np.ndarray,
+                 speaker: np.ndarray, speakers: List[Optional[str]], sentence_starts: np.ndarray):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+        self.speaker = speaker
+        self.speakers = speakers
+        self.sentence_starts = sentence_starts
+
+    @classmethod
+    def from_sentences(cls, sentences) -> "WordTable":
+        text, start, end, confidence, speaker = [], [], [], [], []
+        speakers: List[Optional[str]] = []
+        speaker_codes = {}
+        sentence_starts = []
+        for sentence in sentences:
+            if not sentence.words:
+                continue
+            sentence_starts.append(len(text))
+            for word in sentence.words:
+                # Words without their own label inherit the sentence speaker
+                label = word.speaker or sentence.speaker
+                if label not in speaker_codes:
+                    speaker_codes[label] = len(speakers)
+                    speakers.append(label)
+                text.append(word.text)
+                start.append(word.start)
+                end.append(word.end)
+                confidence.append(word.confidence)
+                speaker.append(speaker_codes[label])
+        return cls(
+            text,
+            np.asarray(start, dtype=np.int64),
+            np.asarray(end, dtype=np.int64),
+            np.asarray(confidence, dtype=np.float32),
+            np.asarray(speaker, dtype=np.int32),
+            speakers,
+            np.asarray(sentence_starts, dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_starts)
+
+    def sentence_bounds(self, index: int):
+        begin = int(self.sentence_starts[index])
+        end = int(self.sentence_starts[index + 1]) if index + 1 < self.sentence_count else len(self)
+        return begin, end
+
+    def sentence_speaker(self, index: int) -> Optional[str]:
+        begin, _ = self.sentence_bounds(index)
+        return self.speakers[int(self.speaker[begin])]
@@ -8,10 +8,10 @@ class TranscriptEditor:
         self.transcript_reader = TranscriptReader(chunk_size)
 
     def process_transcript(self, input_file, output_file):
-        chunks = self.transcript_reader.read_and_chunk_transcript(input_file)
+        # Chunks are read lazily, so the first request goes out before the rest of the file is parsed
         with open(output_file, 'w') as file:
-            for chunk in chunks:
-                edited_chunk = self.openai_client.process_chunk(chunk)
+            for chunk in self.transcript_reader.iter_chunks(input_file):
+                edited_chunk = self.openai_client.process_chunk(chunk.text)
                 file.write(edited_chunk)
                 file.write('\n\n\n')  # Add separator between chunks
 
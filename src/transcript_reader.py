@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional
+
+from src.token_estimate import CHARS_PER_TOKEN
+
+# The same patterns as removal_spans and chunk_bisection, kept here so reading a transcript does not import pydantic
+SPEAKER_TAG_PATTERN = re.compile(r"\*\*[^*]+?:\*\*")
+SENTENCE_END_PATTERN = re.compile(r"[.!?][\"')\]]*$")
+# "Nathan (00:00)" or "Nathan (1:02:03)" on a line of its own starts a speaker turn
+TURN_HEADER_PATTERN = re.compile(r"^\s*(?P<speaker>[^()\s][^()]*?)\s*\((?P<timestamp>\d{1,2}(?::\d{2}){1,2})\)\s*$")
+ABBREVIATION_PATTERN = re.compile(r"^(?:(?:[A-Za-z]\.){2,}|(?:Mr|Mrs|Ms|Dr|Prof|St|Jr|Sr|vs|etc|approx)\.)$")
+# Fragments such as "Okay." are kept with a neighbouring sentence of the same turn
+MIN_SENTENCE_WORDS = 5
+# Very long turns are handed on in pieces of this many lines, so memory stays bounded
+MAX_TURN_LINES = 64
+
+
+@dataclass
+class Turn:
+    speaker: Optional[str]
+    start: Optional[float]
+    text: str
+
+
+@dataclass
+class Sentence:
+    speaker: Optional[str]
+    start: Optional[float]
+    text: str
+
+
+@dataclass
+class TranscriptChunk:
+    text: str
+    # Timestamp in seconds of the turn the chunk starts in
+    start: Optional[float]
+
+
+def parse_timestamp(timestamp: str) -> float:
+    seconds = 0.0
+    for part in timestamp.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def speaker_tag(speaker: Optional[str]) -> str:
+    return f"**{speaker}:**" if speaker else ""
+
+
+class TranscriptReader:
+    """Reads "Name (00:00)" text transcripts line by line and yields sentence-aligned chunks lazily."""
+
+    def __init__(self, chunk_size: int = 1000, token_budget: Optional[int] = None):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if token_budget is not None and token_budget <= 0:
+            raise ValueError("token_budget must be positive")
+        self.chunk_size = chunk_size
+        # When set, chunks are sized by estimated tokens instead of words
+        self.token_budget = token_budget
+
+    def read_and_chunk_transcript(self, file_path: str) -> List[str]:
+        return [chunk.text for chunk in self.iter_chunks(file_path)]
+
+    def iter_chunks(self, file_path: str) -> Iterator[TranscriptChunk]:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            yield from self._pack(self._iter_sentences(self.iter_turns(file)))
+
+    def iter_turns(self, lines: Iterable[str]) -> Iterator[Turn]:
+        speaker, start, parts = None, None, []
+        for line in lines:
+            header = TURN_HEADER_PATTERN.match(line)
+            if header:
+                if parts:
+                    yield Turn(speaker, start, " ".join(parts))
+                speaker, start, parts = header["speaker"], parse_timestamp(header["timestamp"]), []
+            elif line.strip():
+                parts.append(" ".join(line.split()))
+                if len(parts) >= MAX_TURN_LINES:
+                    yield Turn(speaker, start, " ".join(parts))
+                    parts = []
+        if parts:
+            yield Turn(speaker, start, " ".join(parts))
+
+    def _clean_and_normalize_text(self, text: str) -> str:
+        return " ".join(f"{speaker_tag(turn.speaker)} {turn.text}".strip()
+                        for turn in self.iter_turns(text.splitlines()))
+
+    def _tokenize_sentences(self, text: str) -> List[str]:
+        return [f"{speaker_tag(sentence.speaker)} {sentence.text}".strip()
+                for sentence in self._iter_sentences(self._tagged_turns(text))]
+
+    def _create_chunks(self, sentences: List[str]) -> List[str]:
+        parsed = []
+        for sentence in sentences:
+            tag = SPEAKER_TAG_PATTERN.match(sentence)
+            speaker = tag.group(0)[2:-3] if tag else None
+            parsed.append(Sentence(speaker, None, sentence[tag.end():].strip() if tag else sentence))
+        return [chunk.text for chunk in self._pack(parsed)]
+
+    def _tagged_turns(self, text: str) -> Iterator[Turn]:
+        # Turns of text that is already in "**Name:** ..." form
+        speaker = None
+        position = 0
+        for tag in SPEAKER_TAG_PATTERN.finditer(text):
+            if text[position:tag.start()].strip():
+                yield Turn(speaker, None, text[position:tag.start()].strip())
+            speaker = tag.group(0)[2:-3]
+            position = tag.end()
+        if text[position:].strip():
+            yield Turn(speaker, None, text[position:].strip())
+
+    def _iter_sentences(self, turns: Iterable[Turn]) -> Iterator[Sentence]:
+        for turn in turns:
+            sentences: List[List[str]] = []
+            current: List[str] = []
+            for word in turn.text.split():
+                current.append(word)
+                if SENTENCE_END_PATTERN.search(word) and not ABBREVIATION_PATTERN.match(word):
+                    sentences.append(current)
+                    current = []
+            if current:
+                sentences.append(current)
+
+            merged: List[List[str]] = []
+            for words in sentences:
+                if merged and (len(words) < MIN_SENTENCE_WORDS or len(merged[-1]) < MIN_SENTENCE_WORDS):
+                    merged[-1].extend(words)
+                else:
+                    merged.append(words)
+            for words in merged:
+                yield Sentence(turn.speaker, turn.start, " ".join(words))
+
+    def _weight(self, sentence: Sentence) -> float:
+        if self.token_budget is None:
+            return len(sentence.text.split())
+        return (len(sentence.text) + 1) / CHARS_PER_TOKEN
+
+    def _pack(self, sentences: Iterable[Sentence]) -> Iterator[TranscriptChunk]:
+        # Greedy, so only the chunk being filled is ever held in memory
+        budget = self.chunk_size if self.token_budget is None else self.token_budget
+        parts: List[str] = []
+        size = 0.0
+        speaker = None
+        start = None
+        for sentence in sentences:
+            weight = self._weight(sentence)
+            if parts and size + weight > budget:
+                yield TranscriptChunk(" ".join(parts), start)
+                parts, size = [], 0.0
+            if not parts:
+                start = sentence.start
+                speaker = None
+            # A speaker tag opens every chunk and every change of speaker, never each sentence
+            if sentence.speaker != speaker and sentence.speaker:
+                parts.append(speaker_tag(sentence.speaker))
+            speaker = sentence.speaker
+            parts.append(sentence.text)
+            size += weight
+        if parts:
+            yield TranscriptChunk(" ".join(parts), start)
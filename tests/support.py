@@ -0,0 +1,34 @@
+import os
+from typing import Any, Callable, List, Tuple
+from unittest.mock import patch
+
+from src.audio_transcript_processor import AudioTranscriptProcessor
+from src.editing_strategy import EditingStrategy, Stage
+from src.pipeline import StagedPipeline
+
+
+class ScriptedStrategy(EditingStrategy):
+    """One-stage strategy whose edit comes from respond(chunk, refresh), so the processor runs without a model."""
+
+    def __init__(self, respond: Callable[[str, bool], Any]):
+        self.respond = respond
+        self.requests: List[str] = []
+        self.refreshes: List[bool] = []
+
+    def stages(self) -> List[Stage]:
+        return [Stage("scripted", self.edit)]
+
+    async def edit(self, chunk: str, _previous: Any, refresh: bool) -> str:
+        self.requests.append(chunk)
+        self.refreshes.append(refresh)
+        return self.respond(chunk, refresh)
+
+
+def scripted_processor(respond: Callable[[str, bool], Any], **kwargs) -> Tuple[AudioTranscriptProcessor,
+                                                                               ScriptedStrategy]:
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "mock"}):
+        processor = AudioTranscriptProcessor(**kwargs)
+    strategy = ScriptedStrategy(respond)
+    processor.openai_client = strategy
+    processor.pipeline = StagedPipeline(strategy)
+    return processor, strategy
@@ -0,0 +1,37 @@
+import unittest
+from src.alignment import align_edit, align_tokens, parse_strikethrough
+
+class TestAlignment(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk = "**Speaker A:** Um, we can certainly deviate from that. If there's anything you want to add, it's all good."
+
+    def test_parse_strikethrough_absorbs_triple_tildes(self):
+        words = parse_strikethrough("a good starting point~~~, hopefully~~~. **Speaker B:** ok")
+        self.assertEqual([w for w, struck in words if struck], ["hopefully"])
+
+    def test_align_tokens_is_monotone(self):
+        a = "the cat sat on the mat and the dog sat too".split()
+        b = "the cat on the mat the dog sat happily too".split()
+        pairs = align_tokens(a, b)
+        self.assertTrue(all(a[i] == b[j] for i, j in pairs))
+        self.assertTrue(all(p[0] < q[0] and p[1] < q[1] for p, q in zip(pairs, pairs[1:])))
+        self.assertEqual(len(pairs), 9)
+
+    def test_faithful_edit_has_no_drift(self):
+        edited = "**Speaker A:** ~~Um,~~ we can certainly deviate from that. If there's anything you want to add, it's all good."
+        result = align_edit(self.chunk, edited)
+        self.assertEqual(result.drift, 0)
+        self.assertEqual(result.text, edited)
+
+    def test_dropped_and_rewritten_words_are_repaired(self):
+        edited = "**Speaker A:** ~~Um,~~ we can deviate from that. If there is anything you want to add, ~~it's all~~ good."
+        result = align_edit(self.chunk, edited)
+        self.assertGreater(result.drift, 0)
+        self.assertEqual(
+            result.text,
+            "**Speaker A:** ~~Um,~~ we can certainly deviate from that. If there's anything you want to add, ~~it's all~~ good."
+        )
+
+if __name__ == '__main__':
+    unittest.main()
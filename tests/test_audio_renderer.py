@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+import wave
+import numpy as np
+from src.audio_renderer import read_wav_info, render_wav
+
+class TestAudioRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.tmpdir.name, "source.wav")
+        self.output_path = os.path.join(self.tmpdir.name, "edited.wav")
+        # One second of stereo 16-bit audio where every frame holds its own index
+        self.samples = np.repeat(np.arange(8000, dtype=np.int16)[:, None], 2, axis=1)
+        with wave.open(self.source_path, 'wb') as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(self.samples.tobytes())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_output(self):
+        with wave.open(self.output_path, 'rb') as w:
+            self.assertEqual(w.getnchannels(), 2)
+            return np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16).reshape(-1, 2)
+
+    def test_read_wav_info(self):
+        info = read_wav_info(self.source_path)
+        self.assertEqual((info.channels, info.sample_rate, info.bits_per_sample, info.frames), (2, 8000, 16, 8000))
+
+    def test_hard_cuts_without_crossfade(self):
+        frames = render_wav(self.source_path, [[0, 100], [500, 600]], self.output_path, crossfade_ms=0)
+        output = self.read_output()
+        self.assertEqual(frames, 1600)
+        np.testing.assert_array_equal(output[:800, 0], np.arange(800))
+        np.testing.assert_array_equal(output[800:, 0], np.arange(4000, 4800))
+
+    def test_crossfade_overlaps_joints(self):
+        frames = render_wav(self.source_path, [[0, 100], [500, 600], [900, 1000]], self.output_path,
+                            crossfade_ms=5, block_frames=64)
+        output = self.read_output()
+        self.assertEqual(frames, 2400 - 2 * 40)
+        self.assertEqual(len(output), frames)
+        np.testing.assert_array_equal(output[:760, 0], np.arange(760))
+        # Inside the joint the signal moves from the outgoing segment towards the incoming one
+        self.assertLess(output[761, 0], 1000)
+        self.assertGreater(output[798, 0], 3900)
+        np.testing.assert_array_equal(output[800:1520, 0], np.arange(4040, 4760))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.audio_transcript_processor import AudioTranscriptProcessor
+from src.batch_runner import BatchRunner, Episode
+from src.transcriber.word_table import WordTable
+
+
+def make_table(sentence_count=6):
+    sentences = []
+    for i in range(sentence_count):
+        words = [SimpleNamespace(text=text, start=i * 1000 + j * 100, end=i * 1000 + j * 100 + 90, confidence=0.9,
+                                 speaker="AB"[i % 2])
+                 for j, text in enumerate(f"Um, this is sentence number {i} here.".split())]
+        sentences.append(SimpleNamespace(speaker="AB"[i % 2], words=words))
+    return WordTable.from_sentences(sentences)
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        patcher = patch.dict(os.environ, {"OPENAI_API_KEY": "mock", "ASSEMBLYAI_API_KEY": "mock",
+                                          "VIDEO_EDITOR_CACHE_DIR": self.dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failing_chunks_do_not_stall_the_queue(self):
+        processor = AudioTranscriptProcessor(chunk_size=10)
+        table = make_table()
+        processor.prepare_episode = lambda path: (table, processor.chunked_transcriber.chunk_table(table))
+
+        async def broken(chunks, index, writer, prestruck=None, refresh=False, sentences=None):
+            raise OSError("No space left on device")
+
+        processor.aprocess_indexed_chunk = broken
+        episodes = [Episode(os.path.join(self.dir, f"episode{i}.wav"), os.path.join(self.dir, f"edited{i}.md"))
+                    for i in range(2)]
+        # Every chunk fails, more chunks than workers; the run must still end
+        asyncio.run(asyncio.wait_for(BatchRunner(processor, workers=2).arun(episodes), timeout=10))
+        for episode in episodes:
+            with open(f"{episode.output_path}.manifest.json") as f:
+                chunks = json.load(f)["chunks"]
+            self.assertEqual(len(chunks), 6)
+            self.assertTrue(all(entry["status"] == "failed" for entry in chunks))
+            self.assertIn("No space left", chunks[0]["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from openai import LengthFinishReasonError
+
+from src.alignment import align_edit
+from src.chunk_bisection import bisect_chunk, split_point, stitch_alignments
+from src.removal_spans import split_words
+from src.request_policy import ChunkSuccess
+from src.transcriber.chunked_transcriber import ChunkedTranscriber
+from src.transcriber.word_table import WordTable
+from tests.support import scripted_processor
+
+
+def sentences(count, words_per_sentence=5, word="word"):
+    return " ".join(" ".join([word] * (words_per_sentence - 1) + ["end."]) for _ in range(count))
+
+
+class TestChunkBisection(unittest.TestCase):
+
+    def test_prefers_speaker_turn_nearest_middle(self):
+        words = split_words("**A:** one two. three four. **B:** five six. seven eight.")
+        self.assertEqual(words[split_point(words)], "**B:**")
+
+    def test_known_sentence_starts_override_punctuation(self):
+        # "Dr." ends no sentence; the transcript's own boundary is before "Then"
+        words = split_words("**A:** we met Dr. Smith at the show and talked for ages. Then we left early.")
+        self.assertEqual(words[split_point(words)], "Smith")
+        self.assertEqual(words[split_point(words, [1, 12])], "Then")
+
+    def test_sentence_starts_are_carried_into_the_halves(self):
+        chunk = "**A:** " + sentences(4)
+        halves = bisect_chunk(chunk, min_words=5, sentence_starts=[1, 6, 11, 16])
+        self.assertEqual(halves.left_sentence_starts, [1, 6])
+        # The right half opens with a copy of the speaker tag
+        self.assertEqual(halves.right_sentence_starts, [6])
+        self.assertEqual(split_words(halves.right)[6], "word")
+
+    def test_right_half_gets_speaker_tag(self):
+        chunk = "**Nathan:** " + sentences(4)
+        halves = bisect_chunk(chunk, min_words=5)
+        self.assertTrue(halves.tag_added)
+        self.assertTrue(halves.right.startswith("**Nathan:** word"))
+        self.assertTrue(halves.left.endswith("end."))
+
+    def test_small_chunks_are_not_split(self):
+        self.assertIsNone(bisect_chunk("**A:** " + sentences(3), min_words=10))
+
+    def test_stitch_restores_source_words(self):
+        chunk = "**A:** keep this. um drop this. **B:** and keep this."
+        halves = bisect_chunk(chunk, min_words=2)
+        left = align_edit(halves.left, halves.left.replace("um drop this.", "~~um drop this.~~"))
+        right = align_edit(halves.right, halves.right)
+        stitched = stitch_alignments(chunk, halves, left, right)
+        self.assertEqual(stitched.text, "**A:** keep this. ~~um drop this.~~ **B:** and keep this.")
+        self.assertEqual(len(stitched.removed), len(split_words(chunk)))
+
+
+class TestProcessorBisection(unittest.TestCase):
+
+    def make_processor(self, fail_above):
+        def respond(chunk, refresh):
+            # Long chunks come back truncated, as when the completion hits max_tokens
+            if len(split_words(chunk)) > fail_above:
+                raise LengthFinishReasonError()
+            return chunk
+
+        return scripted_processor(respond, max_drift_retries=0, max_split_depth=3, min_split_words=5)
+
+    def test_failing_chunk_is_bisected_and_stitched(self):
+        chunk = "**A:** " + sentences(8)
+        processor, _ = self.make_processor(fail_above=12)
+        result = asyncio.run(processor.averify_chunk(chunk, index=3))
+        self.assertIsInstance(result, ChunkSuccess)
+        self.assertEqual(result.index, 3)
+        self.assertEqual(result.text, chunk)
+        self.assertEqual(result.metrics["splits"], 3)
+
+    def test_sentence_starts_come_from_the_word_table(self):
+        processor, _ = self.make_processor(fail_above=100)
+        # Two sentences per speaker turn; "Dr." would fool a punctuation heuristic
+        sentences_by_turn = [["Hi Dr. Smith.", "How are you?"], ["Fine."]]
+        table = WordTable.from_sentences([
+            SimpleNamespace(speaker="AB"[turn], words=[
+                SimpleNamespace(text=word, start=0, end=0, confidence=0.9, speaker="AB"[turn])
+                for word in sentence.split()])
+            for turn, texts in enumerate(sentences_by_turn) for sentence in texts])
+        transcript_chunks = ChunkedTranscriber(100).chunk_table(table)
+        self.assertEqual(split_words(transcript_chunks[0].text)[4], "How")
+        self.assertEqual(processor.sentence_starts(table, transcript_chunks), [[1, 4, 8]])
+
+
+if __name__ == '__main__':
+    unittest.main()
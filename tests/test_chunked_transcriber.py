@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from src.removal_spans import split_words
+from src.transcriber.chunked_transcriber import ChunkedTranscriber
+from src.transcriber.word_table import WordTable
+
+
+def numbered_sentences(count, start=0):
+    sentences = []
+    for i in range(start, start + count):
+        speaker = "AB"[(i // 5) % 2]
+        words = [SimpleNamespace(text=f"w{i}_{j}", start=0, end=0, confidence=1.0, speaker=speaker)
+                 for j in range(5 + (i * 7) % 20)]
+        sentences.append(SimpleNamespace(speaker=speaker, words=words))
+    return sentences
+
+
+def sentence(speaker, count, word="word"):
+    words = [SimpleNamespace(text=word, start=0, end=0, confidence=1.0, speaker=speaker) for _ in range(count - 1)]
+    words.append(SimpleNamespace(text="end.", start=0, end=0, confidence=1.0, speaker=speaker))
+    return SimpleNamespace(speaker=speaker, words=words)
+
+
+class TestChunkedTranscriber(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        env = {"ASSEMBLYAI_API_KEY": "test", "VIDEO_EDITOR_CACHE_DIR": self.tmpdir.name}
+        with patch.dict(os.environ, env):
+            self.chunker = ChunkedTranscriber(chunk_size=100)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def chunk_sizes(self, chunks):
+        return [sum(1 for i in chunk.word_indices if i >= 0) for chunk in chunks]
+
+    def test_balanced_without_tiny_tail(self):
+        table = WordTable.from_sentences([sentence("A", 10) for _ in range(21)])
+        chunks = self.chunker.chunk_table(table)
+        # Greedy packing would leave 100, 100 and a 10-word tail
+        self.assertEqual(self.chunk_sizes(chunks), [70, 70, 70])
+
+    def test_speaker_tag_added_once(self):
+        table = WordTable.from_sentences([sentence("A", 60), sentence("B", 60), sentence("B", 10)])
+        chunks = self.chunker.chunk_table(table)
+        self.assertEqual(len(chunks), 2)
+        for chunk in chunks:
+            self.assertEqual(sum(1 for word in split_words(chunk.text) if word.startswith("**")), 1)
+        self.assertTrue(chunks[1].text.startswith("**Speaker B:** word"))
+
+    def test_prefers_speaker_turn(self):
+        sentences = [sentence("A", 10) for _ in range(9)] + [sentence("B", 10) for _ in range(10)]
+        chunks = self.chunker.chunk_table(WordTable.from_sentences(sentences))
+        # The even split would be 95/95; the turn after 90 words is the closest clean boundary
+        self.assertEqual(self.chunk_sizes(chunks), [90, 100])
+        self.assertTrue(chunks[1].text.startswith("**Speaker B:**"))
+
+    def test_word_indices_cover_table_in_order(self):
+        table = WordTable.from_sentences([sentence("AB"[i % 2], 7 + i % 5) for i in range(40)])
+        chunks = self.chunker.chunk_table(table)
+        indices = [i for chunk in chunks for i in chunk.word_indices if i >= 0]
+        self.assertEqual(indices, list(range(len(table))))
+        self.assertTrue(all(size <= 100 for size in self.chunk_sizes(chunks)))
+
+    def test_token_budget(self):
+        with patch.dict(os.environ, {"ASSEMBLYAI_API_KEY": "test", "VIDEO_EDITOR_CACHE_DIR": self.tmpdir.name}):
+            chunker = ChunkedTranscriber(token_budget=50)
+        # "word " is five characters, so each ten-word sentence is about 12 tokens
+        table = WordTable.from_sentences([sentence("A", 10) for _ in range(10)])
+        chunks = chunker.chunk_table(table)
+        self.assertEqual(self.chunk_sizes(chunks), [30, 30, 40])
+
+    def test_content_defined_chunks_survive_an_insertion(self):
+        with patch.dict(os.environ, {"ASSEMBLYAI_API_KEY": "test", "VIDEO_EDITOR_CACHE_DIR": self.tmpdir.name}):
+            chunker = ChunkedTranscriber(chunk_size=300, content_defined=True)
+        original = numbered_sentences(400)
+        edited = original[:60] + numbered_sentences(4, start=1000) + original[60:]
+        before = [chunk.text for chunk in chunker.chunk_table(WordTable.from_sentences(original))]
+        after = [chunk.text for chunk in chunker.chunk_table(WordTable.from_sentences(edited))]
+        self.assertGreater(len(before), 10)
+        self.assertLessEqual(len(set(after) - set(before)), 3)
+        self.assertTrue(all(size <= 300 for size in self.chunk_sizes(chunker.chunk_table(WordTable.from_sentences(edited)))))
+
+
+if __name__ == '__main__':
+    unittest.main()
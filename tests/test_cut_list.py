@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+from src.cut_list import cut_intervals, keep_intervals, keep_mask, to_edl, to_ffmpeg_concat
+
+class TestCutList(unittest.TestCase):
+
+    def setUp(self):
+        # Six words, 400ms each with 100ms pauses
+        self.start = np.arange(6, dtype=np.int64) * 500
+        self.end = self.start + 400
+
+    def test_keep_mask_skips_speaker_tags(self):
+        keep = keep_mask(6, [[-1, 0, 1, 2], [-1, 3, 4, 5]], [[True, True, False, False], [False, False, True, False]])
+        self.assertEqual(keep.tolist(), [False, True, True, True, False, True])
+
+    def test_removed_words_become_cuts(self):
+        keep = np.array([True, True, False, False, True, True])
+        intervals = keep_intervals(self.start, self.end, keep, min_cut_ms=250, padding_ms=0)
+        self.assertEqual(intervals.tolist(), [[0, 900], [2000, 2900]])
+        self.assertEqual(cut_intervals(intervals, 3000).tolist(), [[900, 2000], [2900, 3000]])
+
+    def test_short_removals_are_coalesced(self):
+        keep = np.array([True, True, False, True, True, True])
+        intervals = keep_intervals(self.start, self.end, keep, min_cut_ms=1000, padding_ms=0)
+        self.assertEqual(intervals.tolist(), [[0, 2900]])
+
+    def test_padding_merges_overlaps(self):
+        keep = np.array([True, False, True, False, False, True])
+        intervals = keep_intervals(self.start, self.end, keep, min_cut_ms=0, padding_ms=400)
+        self.assertEqual(intervals.tolist(), [[0, 1800], [2100, 3300]])
+
+    def test_exports(self):
+        intervals = np.array([[0, 1000], [2000, 3500]])
+        edl = to_edl(intervals, "/audio/episode.wav", fps=25)
+        self.assertIn("002  AX       AA/V  C        00:00:02:00 00:00:03:13 00:00:01:00 00:00:02:13", edl)
+        script = to_ffmpeg_concat(intervals, "/audio/episode.wav")
+        self.assertIn("inpoint 2.000\noutpoint 3.500", script)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.disfluency import DisfluencyConfig, chunk_masks, condense, disfluency_mask, expand
+from src.removal_spans import render_strikethrough, split_words
+from src.request_policy import ChunkSuccess
+from src.transcriber.chunked_transcriber import TranscriptChunk
+from src.transcriber.word_table import WordTable
+from tests.support import scripted_processor
+
+
+def make_table(text, confidence=None, speaker=None):
+    words = text.split()
+    count = len(words)
+    return WordTable(
+        words,
+        np.arange(count, dtype=np.int64) * 100,
+        np.arange(count, dtype=np.int64) * 100 + 90,
+        np.asarray(confidence if confidence is not None else [0.9] * count, dtype=np.float32),
+        np.asarray(speaker if speaker is not None else [0] * count, dtype=np.int32),
+        ["A", "B"],
+        np.asarray([0], dtype=np.int64),
+    )
+
+
+def struck_words(table, mask):
+    return [word for word, gone in zip(table.text, mask) if gone]
+
+
+class TestDisfluencyMask(unittest.TestCase):
+
+    def test_fillers_repeats_and_false_starts(self):
+        table = make_table("So, um, I, uh, I think the the wh- whole thing had had it. I think I think so.")
+        mask = disfluency_mask(table)
+        self.assertEqual(struck_words(table, mask), ["um,", "I,", "uh,", "the", "wh-", "I", "think"])
+
+    def test_grammatical_doublings_are_kept(self):
+        for text in ("I know that that is true.", "What it is is a habit.", "They do do it."):
+            self.assertFalse(disfluency_mask(make_table(text)).any(), text)
+
+    def test_low_confidence_words_are_left_alone(self):
+        table = make_table("um we we go", confidence=[0.2, 0.9, 0.3, 0.9])
+        self.assertFalse(disfluency_mask(table).any())
+
+    def test_repeats_do_not_span_speakers_and_phrases_are_configurable(self):
+        table = make_table("yes yes you know it", speaker=[0, 1, 1, 1, 1])
+        mask = disfluency_mask(table, DisfluencyConfig(fillers=("you know",)))
+        self.assertEqual(struck_words(table, mask), ["you", "know"])
+
+    def test_condense_and_expand(self):
+        words = split_words("**A:** um, okay. **B:** I I see it.")
+        struck = [False, True, False, False, True, False, False, False]
+        condensed = condense(words, struck)
+        self.assertEqual(condensed.text, "**A:** okay. **B:** I see it.")
+        removed = expand(len(words), struck, condensed, [False, True, False, False, False, False])
+        self.assertEqual(render_strikethrough(words, removed), "**A:** ~~um, okay.~~ **B:** ~~I~~ I see it.")
+
+    def test_tag_with_nothing_left_is_dropped(self):
+        words = split_words("**A:** um **B:** right")
+        self.assertEqual(condense(words, [False, True, False, False]).text, "**B:** right")
+
+
+class TestProcessorPrepass(unittest.TestCase):
+
+    def make_processor(self, min_model_words):
+        return scripted_processor(lambda chunk, refresh: chunk.replace("you know,", "~~you know,~~"),
+                                  max_drift_retries=0, max_split_depth=0,
+                                  prepass=DisfluencyConfig(min_model_words=min_model_words))
+
+    def prestruck(self, text):
+        table = make_table(text)
+        return chunk_masks(disfluency_mask(table), [[-1] + list(range(len(table)))])[0]
+
+    def test_model_sees_condensed_text(self):
+        text = "um, you know, it was the the best part of the whole show."
+        processor, strategy = self.make_processor(min_model_words=4)
+        result = asyncio.run(processor.averify_prestruck(f"**A:** {text}", self.prestruck(text), index=2))
+        self.assertIsInstance(result, ChunkSuccess)
+        self.assertEqual(strategy.requests, ["**A:** you know, it was the best part of the whole show."])
+        self.assertEqual(result.text, "**A:** ~~um, you know,~~ it was ~~the~~ the best part of the whole show.")
+        self.assertEqual(result.metrics["prestruck"], 2)
+
+    def test_short_chunk_skips_the_model(self):
+        text = "Uh, yeah yeah."
+        processor, strategy = self.make_processor(min_model_words=12)
+        result = asyncio.run(processor.averify_prestruck(f"**A:** {text}", self.prestruck(text)))
+        self.assertEqual(strategy.requests, [])
+        self.assertEqual(result.text, "**A:** ~~Uh, yeah~~ yeah.")
+        self.assertTrue(result.metrics["local"])
+
+    def test_changed_settings_invalidate_resumed_chunks(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        output = os.path.join(tmpdir.name, "edited.md")
+        chunks = [TranscriptChunk("**A:** um, it was the the best part.", [-1, 0, 1, 2, 3, 4, 5, 6])]
+
+        def reused(prepass):
+            processor, _ = scripted_processor(lambda chunk, refresh: chunk, prepass=prepass)
+            with processor.open_writer("episode.wav", chunks, output) as writer:
+                if writer.is_reused(0):
+                    return True
+                writer.submit(0, "edited")
+            return False
+
+        self.assertFalse(reused(None))
+        self.assertTrue(reused(None))
+        self.assertFalse(reused(DisfluencyConfig()))
+        self.assertTrue(reused(DisfluencyConfig()))
+        self.assertFalse(reused(DisfluencyConfig(fillers=("um", "you know"))))
+
+
+if __name__ == '__main__':
+    unittest.main()
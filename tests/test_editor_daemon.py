@@ -0,0 +1,158 @@
+import asyncio
+import os
+import stat
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.audio_transcript_processor import AudioTranscriptProcessor
+from src.editor_client import send_job
+from src.editor_daemon import EditorDaemon
+from src.mock_llm_server import MockLLMServer, MockServerConfig
+from src.output_writer import CHUNK_SEPARATOR
+from src.transcriber.word_table import WordTable
+
+
+def make_table(sentence_count=6):
+    sentences = []
+    for i in range(sentence_count):
+        words = [SimpleNamespace(text=text, start=i * 1000 + j * 100, end=i * 1000 + j * 100 + 90, confidence=0.9,
+                                 speaker="AB"[i % 2])
+                 for j, text in enumerate(f"Um, this is sentence number {i} here.".split())]
+        sentences.append(SimpleNamespace(speaker="AB"[i % 2], words=words))
+    return WordTable.from_sentences(sentences)
+
+
+class TestEditorDaemon(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        patcher = patch.dict(os.environ, {"OPENAI_API_KEY": "mock", "ASSEMBLYAI_API_KEY": "mock",
+                                          "VIDEO_EDITOR_CACHE_DIR": self.dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.audio = os.path.join(self.dir, "episode.wav")
+        with open(self.audio, 'wb') as f:
+            f.write(b"audio")
+
+    def run_daemon(self, jobs):
+        config = MockServerConfig(latency_median=0.001, latency_sigma=0.0, tokens_per_second=1e6, seed=1)
+        with MockLLMServer(config) as server:
+            processor = AudioTranscriptProcessor(chunk_size=10)
+            processor.engine.base_url = server.base_url
+            table = make_table()
+            prepared = []
+
+            def prepare_episode(path):
+                prepared.append(path)
+                return table, processor.chunked_transcriber.chunk_table(table)
+
+            processor.prepare_episode = prepare_episode
+            daemon = EditorDaemon(processor, os.path.join(self.dir, "editor.sock"))
+
+            async def run():
+                serving = asyncio.create_task(daemon.serve())
+                while not os.path.exists(daemon.socket_path):
+                    await asyncio.sleep(0.01)
+                replies = []
+                for job in jobs + [{"job": "shutdown"}]:
+                    replies.append(await asyncio.to_thread(send_job, job, daemon.socket_path, 10))
+                await serving
+                return replies
+
+            return asyncio.run(run()), prepared, processor.engine
+
+    def test_jobs_reuse_the_warm_episode_and_output(self):
+        output = os.path.join(self.dir, "edited.md")
+        job = {"job": "process", "path": self.audio, "output": output}
+        replies, prepared, engine = self.run_daemon([
+            job,
+            {"job": "edit", "path": self.audio, "output": output, "start": 1, "end": 2, "refresh": True},
+            job,
+            {"job": "stats"},
+        ])
+        process, edit, again, stats, _ = replies
+        self.assertTrue(all(reply["ok"] for reply in replies))
+        self.assertEqual(process["chunks"], 6)
+        self.assertEqual(process["edited"], 6)
+        self.assertEqual(edit["edited"], 1)
+        self.assertEqual(again["edited"], 0)
+        # The word table is built once; two model calls per chunk, and a refresh re-issues only the marking
+        self.assertEqual(prepared, [self.audio])
+        self.assertEqual(stats["usage"]["requests"], 13)
+        self.assertEqual(stats["jobs"], 3)
+        with open(output, 'r', encoding='utf-8') as f:
+            written = [chunk for chunk in f.read().split(CHUNK_SEPARATOR) if chunk]
+        self.assertEqual(len(written), 6)
+        self.assertTrue(all("~~Um,~~" in chunk for chunk in written))
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "editor.sock")))
+
+    def test_bad_jobs_are_reported(self):
+        replies, _, _ = self.run_daemon([
+            {"job": "rewind"},
+            {"job": "edit", "path": self.audio, "start": 4, "end": 40},
+            {"job": "process", "path": os.path.join(self.dir, "missing.wav")},
+            {"job": "ping"},
+        ])
+        self.assertEqual([reply["ok"] for reply in replies], [False, False, False, True, True])
+        self.assertIn("Unknown job", replies[0]["error"])
+        self.assertIn("outside", replies[1]["error"])
+
+    def test_socket_is_private_to_the_owner(self):
+        daemon = EditorDaemon(AudioTranscriptProcessor(), os.path.join(self.dir, "editor.sock"))
+
+        async def run():
+            serving = asyncio.create_task(daemon.serve())
+            while daemon._server is None:
+                await asyncio.sleep(0.01)
+            mode = stat.S_IMODE(os.stat(daemon.socket_path).st_mode)
+            daemon.stop()
+            await serving
+            return mode
+
+        self.assertEqual(asyncio.run(run()), 0o600)
+
+    def test_concurrent_jobs_prepare_an_episode_once(self):
+        processor = AudioTranscriptProcessor(chunk_size=10)
+        table = make_table()
+        prepared = []
+
+        def prepare_episode(path):
+            prepared.append(path)
+            time.sleep(0.05)
+            return table, processor.chunked_transcriber.chunk_table(table)
+
+        processor.prepare_episode = prepare_episode
+        daemon = EditorDaemon(processor, os.path.join(self.dir, "editor.sock"))
+
+        async def run():
+            return await asyncio.gather(*(daemon.episode(self.audio) for _ in range(3)))
+
+        episodes = asyncio.run(run())
+        self.assertEqual(prepared, [self.audio])
+        self.assertTrue(all(episode is episodes[0] for episode in episodes))
+
+    def test_output_locks_are_dropped_when_idle(self):
+        daemon = EditorDaemon(AudioTranscriptProcessor(), os.path.join(self.dir, "editor.sock"))
+        order = []
+
+        async def job(name):
+            async with daemon._writing("edited.md"):
+                order.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                order.append(f"{name} out")
+
+        async def run():
+            await asyncio.gather(job("first"), job("second"))
+
+        asyncio.run(run())
+        self.assertEqual(order, ["first in", "first out", "second in", "second out"])
+        self.assertEqual(daemon._locks, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.transcriber.assemblyai_transcriber import generate_hash
+from src.transcriber.file_fingerprint import FingerprintIndex
+
+class TestFileFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.audio_path = os.path.join(self.tmpdir.name, "episode.mp3")
+        with open(self.audio_path, 'wb') as f:
+            f.write(os.urandom(3 * 1024 * 1024 + 17))
+        self.index = FingerprintIndex(os.path.join(self.tmpdir.name, "fingerprints.sqlite3"))
+        self.config = {"speaker_labels": True, "language_code": "en"}
+
+    def tearDown(self):
+        self.index.close()
+        self.tmpdir.cleanup()
+
+    def test_full_hash_matches_legacy_keys(self):
+        hasher = hashlib.sha256()
+        with open(self.audio_path, 'rb') as f:
+            hasher.update(f.read())
+        hasher.update(json.dumps(self.config, sort_keys=True).encode('utf-8'))
+        self.assertEqual(generate_hash(self.audio_path, self.config), hasher.hexdigest())
+
+    def test_unchanged_file_is_not_reread(self):
+        digest = generate_hash(self.audio_path, self.config, index=self.index)
+        with patch("src.transcriber.assemblyai_transcriber.stream_digest") as stream:
+            self.assertEqual(generate_hash(self.audio_path, self.config, index=self.index), digest)
+            stream.assert_not_called()
+
+    def test_modified_file_is_rehashed(self):
+        digest = generate_hash(self.audio_path, self.config, index=self.index)
+        with open(self.audio_path, 'ab') as f:
+            f.write(b"trailing bytes")
+        self.assertNotEqual(generate_hash(self.audio_path, self.config, index=self.index), digest)
+
+    def test_sampled_mode_uses_its_own_key_space(self):
+        self.assertNotEqual(generate_hash(self.audio_path, self.config, mode="sampled"),
+                            generate_hash(self.audio_path, self.config))
+        with self.assertRaises(ValueError):
+            generate_hash(self.audio_path, self.config, mode="partial")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import Mock
+from src.llm_cache import LLMCache, parse_with_cache
+from src.openai_client import ChainOfThought, REASONING_PARAMS
+
+class TestLLMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = LLMCache(os.path.join(self.tmpdir.name, "cache.sqlite3"))
+        self.messages = [{"role": "user", "content": "**Nathan:** Welcome to the show."}]
+        self.chain_of_thought = ChainOfThought(
+            initial_analysis="Initial analysis",
+            editing_goals="Editing goals",
+            editing_process="Editing process",
+            conclusion="Conclusion"
+        )
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_params(self):
+        key = LLMCache.make_key(self.messages, ChainOfThought, REASONING_PARAMS)
+        other = LLMCache.make_key(self.messages, ChainOfThought, {**REASONING_PARAMS, "temperature": 0.0})
+        self.assertNotEqual(key, other)
+        self.assertEqual(key, LLMCache.make_key(list(self.messages), ChainOfThought, dict(REASONING_PARAMS)))
+
+    def test_round_trip(self):
+        key = LLMCache.make_key(self.messages, ChainOfThought, REASONING_PARAMS)
+        self.assertIsNone(self.cache.get(key, ChainOfThought))
+        self.cache.put(key, self.chain_of_thought)
+        self.assertEqual(self.cache.get(key, ChainOfThought), self.chain_of_thought)
+
+    def test_async_access_waits_off_the_event_loop(self):
+        key = LLMCache.make_key(self.messages, ChainOfThought, REASONING_PARAMS)
+
+        async def run():
+            # Another process holds the write lock; the loop must keep running while the put waits for it
+            other = sqlite3.connect(self.cache.path, isolation_level=None)
+            other.execute("BEGIN IMMEDIATE")
+            put = asyncio.ensure_future(self.cache.aput(key, self.chain_of_thought))
+            await asyncio.sleep(0.1)
+            self.assertFalse(put.done())
+            other.execute("COMMIT")
+            other.close()
+            await put
+            return await self.cache.aget(key, ChainOfThought)
+
+        self.assertEqual(asyncio.run(run()), self.chain_of_thought)
+
+    def test_expired_entries_are_misses(self):
+        self.cache.max_age_seconds = -1
+        self.cache.put("key", self.chain_of_thought)
+        self.assertIsNone(self.cache.get("key", ChainOfThought))
+
+    def test_size_eviction(self):
+        entry_size = len(self.chain_of_thought.model_dump_json())
+        self.cache.max_bytes = entry_size * 3
+        for i in range(5):
+            self.cache.put(f"key-{i}", self.chain_of_thought)
+        self.cache.evict()
+        self.assertIsNone(self.cache.get("key-0", ChainOfThought))
+        self.assertIsNotNone(self.cache.get("key-4", ChainOfThought))
+
+    def test_parse_with_cache_calls_model_once(self):
+        client = Mock()
+        client.beta.chat.completions.parse.return_value.choices = [Mock(message=Mock(parsed=self.chain_of_thought))]
+        for _ in range(3):
+            result = parse_with_cache(self.cache, client, self.messages, ChainOfThought, REASONING_PARAMS)
+        self.assertEqual(result, self.chain_of_thought)
+        self.assertEqual(client.beta.chat.completions.parse.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from src.llm_engine import AdaptiveConcurrencyLimiter, LLMEngine
+from src.request_budget import SharedRequestBudget
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+
+    def test_invalid_limits(self):
+        with self.assertRaises(ValueError):
+            AdaptiveConcurrencyLimiter(initial=40, max_limit=32)
+
+    def test_grows_after_healthy_window(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, max_limit=8)
+        for _ in range(4):
+            limiter.record(1.0)
+        self.assertEqual(limiter.limit, 5)
+
+    def test_backs_off_once_per_window_on_rate_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8)
+        limiter.record(None, rate_limited=True)
+        limiter.record(None, rate_limited=True)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_backs_off_on_latency_spike(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8, smoothing=1.0)
+        limiter.record(1.0)
+        limiter.record(5.0)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_never_exceeds_limit_in_flight(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=3, max_limit=3)
+        peak = 0
+
+        async def worker():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(worker() for _ in range(12)))
+
+        asyncio.run(run())
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_cancelled_slot_records_no_latency(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2)
+
+        async def worker():
+            async with limiter.slot():
+                await asyncio.sleep(1)
+
+        async def run():
+            task = asyncio.ensure_future(worker())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(run())
+        self.assertIsNone(limiter.ewma_latency)
+        self.assertIsNone(limiter.baseline_latency)
+        self.assertEqual(limiter.in_flight, 0)
+
+class TestLLMEngine(unittest.TestCase):
+
+    def test_budget_leases_are_only_held_inside_local_slots(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            budget = SharedRequestBudget(max_concurrency=16, path=os.path.join(tmpdir, "budget.sqlite3"),
+                                         poll_interval=0.001)
+            engine = LLMEngine(api_key="mock", initial_concurrency=2, max_concurrency=2, budget=budget,
+                               hedge_percentile=None)
+            peak = 0
+
+            async def request(client):
+                nonlocal peak
+                peak = max(peak, budget._conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0])
+                await asyncio.sleep(0.01)
+                return SimpleNamespace(usage=None)
+
+            async def run():
+                await asyncio.gather(*(engine.call(request) for _ in range(8)))
+                await engine.aclose()
+
+            asyncio.run(run())
+            budget.close()
+        self.assertEqual(peak, 2)
+        self.assertEqual(engine.usage["requests"], 8)
+
+    def test_cancelled_probe_lets_the_next_call_probe(self):
+        engine = LLMEngine(api_key="mock", breaker_threshold=1, breaker_reset_timeout=0.0, hedge_percentile=None)
+        engine.breaker("default").record_failure()
+
+        async def slow(client):
+            await asyncio.sleep(1)
+
+        async def fast(client):
+            return SimpleNamespace(usage=None)
+
+        async def run():
+            probe = asyncio.ensure_future(engine.call(slow))
+            await asyncio.sleep(0.01)
+            probe.cancel()
+            await asyncio.gather(probe, return_exceptions=True)
+            response = await engine.call(fast)
+            await engine.aclose()
+            return response
+
+        self.assertIsNotNone(asyncio.run(run()))
+        self.assertEqual(engine.breaker("default").state, "closed")
+
+if __name__ == '__main__':
+    unittest.main()
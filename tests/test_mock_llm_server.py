@@ -0,0 +1,73 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+from openai import LengthFinishReasonError
+
+from src.benchmark import run_benchmark
+from src.llm_engine import LLMEngine
+from src.mock_llm_server import MockLLMServer, MockServerConfig
+from src.openai_client import OpenAIClient
+from src.openai_client_combined import OpenAIClientCombined
+from src.request_policy import RetryPolicy
+
+CHUNK = "**Nathan:** Um, welcome to the show. **Deger:** Thank you, uh, big fan."
+FAST = dict(latency_median=0.001, latency_sigma=0.0, tokens_per_second=1e6, seed=1)
+
+
+class TestMockLLMServer(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"OPENAI_API_KEY": "mock"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def process(self, server, client_class=OpenAIClient, response_mode="strikethrough", **engine_args):
+        engine = LLMEngine(api_key="mock", base_url=server.base_url, **engine_args)
+        client = client_class(engine=engine, use_cache=False, response_mode=response_mode)
+
+        async def run():
+            try:
+                return await client.aprocess_chunk(CHUNK)
+            finally:
+                await engine.aclose()
+
+        return asyncio.run(run()), engine
+
+    def test_two_call_strikethrough(self):
+        with MockLLMServer(MockServerConfig(**FAST)) as server:
+            text, engine = self.process(server)
+        self.assertEqual(text, "**Nathan:** ~~Um,~~ welcome to the show. **Deger:** Thank you, ~~uh,~~ big fan.")
+        self.assertEqual(engine.usage["requests"], 2)
+        self.assertGreater(engine.usage["prompt_tokens"], 0)
+
+    def test_combined_spans(self):
+        with MockLLMServer(MockServerConfig(**FAST)) as server:
+            text, _ = self.process(server, OpenAIClientCombined, response_mode="spans")
+        self.assertIn("~~Um,~~", text)
+        self.assertIn("~~uh,~~", text)
+
+    def test_rate_limits_are_retried(self):
+        config = MockServerConfig(rate_limit_rate=0.5, retry_after=0.0, **FAST)
+        with MockLLMServer(config) as server:
+            text, _ = self.process(server, retry_policy=RetryPolicy(max_attempts=20, base_delay=0.0))
+            self.assertGreater(server.stats["rate_limited"], 0)
+        self.assertIn("~~Um,~~", text)
+
+    def test_truncation_surfaces_as_length_error(self):
+        with MockLLMServer(MockServerConfig(truncate_rate=1.0, **FAST)) as server:
+            with self.assertRaises(LengthFinishReasonError):
+                self.process(server)
+
+    def test_benchmark_reports_each_configuration(self):
+        with MockLLMServer(MockServerConfig(**FAST)) as server:
+            rows = run_benchmark(server.base_url, [200], [2, 4], ["two_call", "combined"], words=600)
+        self.assertEqual(len(rows), 4)
+        for row in rows:
+            self.assertEqual(row["failures"], 0)
+            self.assertEqual(row["requests"], row["chunks"] * (2 if row["strategy"] == "two_call" else 1))
+            self.assertIsNotNone(row["p99_chunk_s"])
+
+
+if __name__ == '__main__':
+    unittest.main()
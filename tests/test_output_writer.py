@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from src.output_writer import FAILURE_PLACEHOLDER, OrderedOutputWriter, RunManifest, chunk_hash
+
+class TestOrderedOutputWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.tmpdir.name, "edited.md")
+        self.chunks = ["chunk one", "chunk two", "chunk three"]
+        self.hashes = [chunk_hash(c) for c in self.chunks]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_output(self):
+        with open(self.output_path) as f:
+            return f.read()
+
+    def test_writes_in_order_as_prefix_completes(self):
+        with OrderedOutputWriter(self.output_path, self.hashes) as writer:
+            writer.submit(1, "edited two")
+            self.assertEqual(self.read_output(), "")
+            writer.submit(0, "edited one")
+            self.assertEqual(self.read_output(), "edited one\n\nedited two\n\n")
+            writer.submit(2, "edited three")
+        self.assertEqual(self.read_output(), "edited one\n\nedited two\n\nedited three\n\n")
+
+    def test_progress_shows_only_the_head_chunk(self):
+        partial_path = self.output_path + ".partial"
+        with OrderedOutputWriter(self.output_path, self.hashes) as writer:
+            writer.progress(1, "edited t")
+            self.assertFalse(os.path.exists(partial_path))
+            writer.progress(0, "edited o")
+            with open(partial_path) as f:
+                self.assertEqual(f.read(), "edited o")
+            writer.submit(0, "edited one")
+            self.assertFalse(os.path.exists(partial_path))
+
+    def test_manifest_records_offsets_and_status(self):
+        with OrderedOutputWriter(self.output_path, self.hashes) as writer:
+            writer.submit(0, "edited one")
+            writer.submit(1, "", failed=True)
+        manifest = RunManifest.load(self.output_path + ".manifest.json")
+        self.assertEqual([c["status"] for c in manifest.chunks], ["done", "failed", "pending"])
+        self.assertEqual(manifest.chunks[1]["offset"], len("edited one\n\n"))
+        self.assertIn(FAILURE_PLACEHOLDER, self.read_output())
+
+    def test_resume_reuses_completed_chunks(self):
+        with OrderedOutputWriter(self.output_path, self.hashes) as writer:
+            writer.submit(0, "edited one")
+            writer.submit(1, "", failed=True)
+            writer.submit(2, "edited three")
+
+        with OrderedOutputWriter(self.output_path, self.hashes) as writer:
+            self.assertTrue(writer.is_reused(0))
+            self.assertFalse(writer.is_reused(1))
+            self.assertTrue(writer.is_reused(2))
+            writer.submit(1, "edited two")
+        self.assertEqual(self.read_output(), "edited one\n\nedited two\n\nedited three\n\n")
+        self.assertFalse(os.path.exists(self.output_path + ".prev"))
+
+if __name__ == '__main__':
+    unittest.main()
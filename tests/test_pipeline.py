@@ -0,0 +1,129 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+
+from src.editing_strategy import EditingStrategy, Stage
+from src.llm_engine import LLMEngine
+from src.mock_llm_server import MockLLMServer, MockServerConfig
+from src.openai_client import OpenAIClient
+from src.pipeline import StagedPipeline, make_strategy
+
+
+class RecordingStrategy(EditingStrategy):
+    def __init__(self, delay=0.02, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.active = {"reason": 0, "mark": 0}
+        self.peak = {"reason": 0, "mark": 0}
+        self.overlapped = False
+
+    def stages(self):
+        return [Stage("reason", self.reason), Stage("mark", self.mark)]
+
+    async def _run(self, name, chunk):
+        self.active[name] += 1
+        self.peak[name] = max(self.peak[name], self.active[name])
+        if self.active["reason"] and self.active["mark"]:
+            self.overlapped = True
+        try:
+            await asyncio.sleep(self.delay)
+            if chunk == self.fail_on and name == "mark":
+                raise ValueError("unparsable")
+        finally:
+            self.active[name] -= 1
+
+    async def reason(self, chunk, _previous, refresh):
+        await self._run("reason", chunk)
+        return f"notes on {chunk}"
+
+    async def mark(self, chunk, notes, refresh):
+        await self._run("mark", chunk)
+        return f"{chunk} ({notes}{', refreshed' if refresh else ''})"
+
+
+class TestStagedPipeline(unittest.TestCase):
+
+    def run_chunks(self, pipeline, chunks, refresh=False):
+        async def run():
+            try:
+                return await asyncio.gather(*(pipeline.process(chunk, refresh) for chunk in chunks),
+                                            return_exceptions=True)
+            finally:
+                await pipeline.aclose()
+        return asyncio.run(run())
+
+    def test_strategy_without_stages_cannot_be_built(self):
+        class Unfinished(EditingStrategy):
+            pass
+
+        with self.assertRaises(TypeError):
+            Unfinished()
+
+    def test_stages_overlap_within_their_own_limits(self):
+        strategy = RecordingStrategy()
+        pipeline = StagedPipeline(strategy, {"reason": 2, "mark": 3})
+        results = self.run_chunks(pipeline, [f"c{i}" for i in range(8)])
+        self.assertEqual(results, [f"c{i} (notes on c{i})" for i in range(8)])
+        self.assertTrue(strategy.overlapped)
+        self.assertEqual(strategy.peak["reason"], 2)
+        self.assertLessEqual(strategy.peak["mark"], 3)
+
+    def test_errors_reach_the_caller(self):
+        pipeline = StagedPipeline(RecordingStrategy(fail_on="c1"), default_concurrency=2)
+        results = self.run_chunks(pipeline, ["c0", "c1", "c2"], refresh=True)
+        self.assertEqual(results[0], "c0 (notes on c0, refreshed)")
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], "c2 (notes on c2, refreshed)")
+
+    def test_pipeline_restarts_on_a_new_event_loop(self):
+        pipeline = StagedPipeline(RecordingStrategy(delay=0), default_concurrency=1)
+        self.assertEqual(self.run_chunks(pipeline, ["a"]), ["a (notes on a)"])
+        self.assertEqual(self.run_chunks(pipeline, ["b"]), ["b (notes on b)"])
+
+
+class TestStrategies(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"OPENAI_API_KEY": "mock"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_strategies_share_one_interface(self):
+        self.assertEqual([stage.model for stage in make_strategy("two_call", use_cache=False).stages()],
+                         ["episode-editor-reasoning", "episode-editor-marking"])
+        self.assertEqual([stage.model for stage in make_strategy("combined", use_cache=False).stages()],
+                         ["episode-editor"])
+        cached = make_strategy("cached_reasoning", use_cache=False)
+        self.assertIsInstance(cached, OpenAIClient)
+        self.assertFalse(cached.cache_marking)
+        with self.assertRaises(ValueError):
+            make_strategy("three_call")
+
+    def test_each_model_gets_its_own_limiter(self):
+        engine = LLMEngine(api_key="mock", max_concurrency=16, model_concurrency={"episode-editor-marking": 24})
+        self.assertEqual(engine.limiter_for("episode-editor-marking").max_limit, 24)
+        self.assertIs(engine.limiter_for("episode-editor-reasoning"), engine.limiter)
+
+    def test_two_call_pipeline_against_mock_server(self):
+        config = MockServerConfig(latency_median=0.001, latency_sigma=0.0, tokens_per_second=1e6, seed=1)
+        with MockLLMServer(config) as server:
+            engine = LLMEngine(api_key="mock", base_url=server.base_url,
+                               model_concurrency={"episode-editor-reasoning": 2, "episode-editor-marking": 4})
+            pipeline = StagedPipeline(make_strategy("two_call", engine=engine, use_cache=False),
+                                      {"episode-editor-reasoning": 2, "episode-editor-marking": 4})
+
+            async def run():
+                try:
+                    return await asyncio.gather(*(pipeline.process(f"**A:** Um, chunk {i}.") for i in range(6)))
+                finally:
+                    await pipeline.aclose()
+                    await engine.aclose()
+
+            results = asyncio.run(run())
+        self.assertEqual(results, [f"**A:** ~~Um,~~ chunk {i}." for i in range(6)])
+        self.assertEqual(engine.usage["requests"], 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
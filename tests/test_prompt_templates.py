@@ -0,0 +1,65 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from src.llm_engine import LLMEngine
+from src.mock_llm_server import MockLLMServer, MockServerConfig
+from src.openai_client import ChainOfThought, OpenAIClient
+from src.prompt_templates import PromptTemplate
+
+CHAIN_OF_THOUGHT = ChainOfThought(initial_analysis="a", editing_goals="b", editing_process="c", conclusion="d")
+
+
+class TestPromptTemplate(unittest.TestCase):
+
+    def test_content_matches_plain_serialization(self):
+        template = PromptTemplate({"role": "editor"}, instructions="Edit it.")
+        messages = template.messages({"raw_transcript": 'Say "hi"'}, additional_context="Talk")
+        self.assertEqual(messages[0], {"role": "system", "content": json.dumps({"role": "editor"})})
+        self.assertEqual(messages[1]["content"], json.dumps(
+            {"instructions": "Edit it.", "additional_context": "Talk", "raw_transcript": 'Say "hi"'}))
+
+    def test_empty_parts(self):
+        self.assertEqual(PromptTemplate({}).messages({"a": 1})[1]["content"], '{"a": 1}')
+        self.assertEqual(PromptTemplate({}, b=2).messages({})[1]["content"], '{"b": 2}')
+
+
+class TestStablePrefix(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"OPENAI_API_KEY": "mock"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunks_of_an_episode_share_a_prefix(self):
+        client = OpenAIClient(use_cache=False, additional_context="An interview about forecasting.")
+        first = client.create_and_format_editing_input("**A:** One.", CHAIN_OF_THOUGHT)
+        second = client.create_and_format_editing_input("**B:** Two.", CHAIN_OF_THOUGHT)
+        self.assertIs(first[0], second[0])
+        prefix = first[1]["content"].split('"raw_transcript"')[0]
+        self.assertTrue(second[1]["content"].startswith(prefix))
+        self.assertIn("An interview about forecasting.", prefix)
+        self.assertEqual(json.loads(first[1]["content"])["raw_transcript"], "**A:** One.")
+
+    def test_cached_token_ratio_is_reported(self):
+        config = MockServerConfig(latency_median=0.001, latency_sigma=0.0, tokens_per_second=1e6, seed=1)
+        with MockLLMServer(config) as server:
+            engine = LLMEngine(api_key="mock", base_url=server.base_url)
+            client = OpenAIClient(engine=engine, use_cache=False)
+
+            async def run():
+                try:
+                    for i in range(3):
+                        await client.aprocess_chunk(f"**A:** Um, chunk number {i}.")
+                finally:
+                    await engine.aclose()
+
+            asyncio.run(run())
+        self.assertGreater(engine.usage["cached_tokens"], 0)
+        self.assertGreater(engine.cached_token_ratio(), 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
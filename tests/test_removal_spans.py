@@ -0,0 +1,34 @@
+import unittest
+from src.removal_spans import RemovalSpan, number_words, render_removals, split_words
+
+class TestRemovalSpans(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk = "**Speaker A:** Um, we can, uh, certainly deviate from that. **Speaker B:** Yeah."
+
+    def test_split_words_keeps_speaker_tags_whole(self):
+        words = split_words(self.chunk)
+        self.assertEqual(words[0], "**Speaker A:**")
+        self.assertEqual(words[9], "**Speaker B:**")
+        self.assertEqual(len(words), 11)
+
+    def test_number_words_skips_speaker_tags(self):
+        numbered = number_words(split_words(self.chunk))
+        self.assertTrue(numbered.startswith("**Speaker A:** [1]Um, [2]we"))
+        self.assertIn("**Speaker B:** [10]Yeah.", numbered)
+
+    def test_render_merges_adjacent_removals(self):
+        rendered = render_removals(self.chunk, [RemovalSpan(start=1, end=2), RemovalSpan(start=3, end=4)])
+        self.assertEqual(rendered, "**Speaker A:** ~~Um, we can, uh,~~ certainly deviate from that. **Speaker B:** Yeah.")
+        self.assertEqual(rendered.count("~~"), 2)
+
+    def test_render_keeps_separate_removals_apart(self):
+        rendered = render_removals(self.chunk, [RemovalSpan(start=1, end=1), RemovalSpan(start=4, end=4)])
+        self.assertEqual(rendered, "**Speaker A:** ~~Um,~~ we can, ~~uh,~~ certainly deviate from that. **Speaker B:** Yeah.")
+
+    def test_render_never_strikes_speaker_tags_and_clamps(self):
+        rendered = render_removals(self.chunk, [RemovalSpan(start=6, end=40)])
+        self.assertEqual(rendered, "**Speaker A:** Um, we can, uh, certainly ~~deviate from that.~~ **Speaker B:** ~~Yeah.~~")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from src.request_budget import SharedRequestBudget
+from src.token_estimate import estimate_tokens
+
+
+class TestSharedRequestBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "budget.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_concurrency_cap_is_shared(self):
+        first = SharedRequestBudget(max_concurrency=2, path=self.path)
+        second = SharedRequestBudget(max_concurrency=2, path=self.path)
+        lease = first.try_acquire(10)
+        self.assertIsNotNone(lease)
+        self.assertIsNotNone(second.try_acquire(10))
+        self.assertIsNone(first.try_acquire(10))
+        first.release(lease)
+        self.assertIsNotNone(second.try_acquire(10))
+
+    def test_tokens_per_minute(self):
+        budget = SharedRequestBudget(max_concurrency=10, tokens_per_minute=100, path=self.path)
+        lease = budget.try_acquire(80)
+        self.assertIsNone(budget.try_acquire(30))
+        budget.release(lease, actual_tokens=50)
+        self.assertIsNotNone(budget.try_acquire(30))
+
+    def test_reclaims_leases_of_dead_processes(self):
+        budget = SharedRequestBudget(max_concurrency=1, path=self.path)
+        conn = sqlite3.connect(self.path)
+        # PIDs are capped well below this value on Linux and macOS
+        conn.execute("INSERT INTO leases (pid, tokens, acquired_at, expires_at) VALUES (?, 1, ?, ?)",
+                     (2 ** 30, time.time(), time.time() + 900))
+        conn.commit()
+        conn.close()
+        self.assertIsNotNone(budget.try_acquire(1))
+
+    def test_reserve_limits_in_flight(self):
+        budget = SharedRequestBudget(max_concurrency=3, path=self.path, poll_interval=0.001)
+        active = 0
+        peak = 0
+
+        async def request():
+            nonlocal active, peak
+            async with budget.reserve(5) as usage:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+                usage["tokens"] = 4
+
+        async def run():
+            await asyncio.gather(*(request() for _ in range(12)))
+
+        asyncio.run(run())
+        self.assertEqual(peak, 3)
+
+    def test_cancelled_reserve_leaves_no_lease(self):
+        budget = SharedRequestBudget(max_concurrency=1, path=self.path, poll_interval=0.001)
+
+        async def run():
+            held = budget.try_acquire(1)
+            waiter = asyncio.ensure_future(budget.acquire(1))
+            await asyncio.sleep(0.02)
+            waiter.cancel()
+            budget.release(held)
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            await asyncio.sleep(0.05)
+
+        asyncio.run(run())
+        self.assertEqual(budget._conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0], 0)
+
+    def test_estimate_tokens(self):
+        self.assertGreater(estimate_tokens([{"role": "user", "content": "word " * 400}]), 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import asyncio
+import unittest
+
+import httpx
+from openai import APIConnectionError, BadRequestError, RateLimitError
+
+from src.llm_engine import LLMEngine
+from src.request_policy import CircuitBreaker, CircuitOpenError, LatencyTracker, RetryPolicy, is_retryable
+
+
+def rate_limit_error(headers=None):
+    request = httpx.Request("POST", "http://test/chat/completions")
+    response = httpx.Response(429, headers=headers or {}, request=request)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def connection_error():
+    return APIConnectionError(request=httpx.Request("POST", "http://test/chat/completions"))
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_honors_retry_after(self):
+        policy = RetryPolicy(max_delay=30)
+        self.assertEqual(policy.delay(0, rate_limit_error({"retry-after": "7"})), 7.0)
+        self.assertEqual(policy.delay(0, rate_limit_error({"retry-after-ms": "250"})), 0.25)
+        self.assertEqual(policy.delay(0, rate_limit_error({"retry-after": "600"})), 30)
+
+    def test_jittered_backoff_is_bounded(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        for attempt in range(6):
+            delay = policy.delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5.0, 2 ** attempt))
+
+    def test_retryable_errors(self):
+        self.assertTrue(is_retryable(rate_limit_error()))
+        self.assertTrue(is_retryable(connection_error()))
+        self.assertFalse(is_retryable(ValueError("bad json")))
+        response = httpx.Response(400, request=httpx.Request("POST", "http://test"))
+        self.assertFalse(is_retryable(BadRequestError("bad", response=response, body=None)))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_and_probes(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "closed")
+        breaker.record_failure()
+        # With no cool-down the breaker is immediately half open and admits exactly one probe
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_stays_open_during_cool_down(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+
+
+class TestLatencyTracker(unittest.TestCase):
+
+    def test_percentile_needs_samples(self):
+        tracker = LatencyTracker(min_samples=10)
+        for i in range(9):
+            tracker.record(float(i))
+        self.assertIsNone(tracker.percentile(0.9))
+        tracker.record(9.0)
+        self.assertEqual(tracker.percentile(0.9), 9.0)
+
+
+class TestEngineRequestPolicy(unittest.TestCase):
+
+    def make_engine(self, **kwargs):
+        kwargs.setdefault("retry_policy", RetryPolicy(max_attempts=3, base_delay=0.0))
+        return LLMEngine(api_key="test", **kwargs)
+
+    def test_retries_transient_errors(self):
+        engine = self.make_engine()
+        calls = []
+
+        async def request(client):
+            calls.append(1)
+            if len(calls) < 3:
+                raise connection_error()
+            return "ok"
+
+        self.assertEqual(asyncio.run(engine.call(request, model="m")), "ok")
+        self.assertEqual(len(calls), 3)
+
+    def test_does_not_retry_client_errors(self):
+        engine = self.make_engine()
+        calls = []
+
+        async def request(client):
+            calls.append(1)
+            raise ValueError("unparsable")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(engine.call(request, model="m"))
+        self.assertEqual(len(calls), 1)
+
+    def test_breaker_is_per_model(self):
+        engine = self.make_engine(retry_policy=RetryPolicy(max_attempts=1), breaker_threshold=1,
+                                  breaker_reset_timeout=60.0)
+
+        async def failing(client):
+            raise connection_error()
+
+        async def succeeding(client):
+            return "ok"
+
+        async def run():
+            with self.assertRaises(APIConnectionError):
+                await engine.call(failing, model="episode-editor-reasoning")
+            with self.assertRaises(CircuitOpenError):
+                await engine.call(succeeding, model="episode-editor-reasoning")
+            return await engine.call(succeeding, model="episode-editor-marking")
+
+        self.assertEqual(asyncio.run(run()), "ok")
+
+    def test_hedges_stragglers(self):
+        engine = self.make_engine(hedge_percentile=0.5)
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record(0.01)
+        engine.latencies["m"] = tracker
+        calls = []
+
+        async def request(client):
+            calls.append(1)
+            # The first copy stalls; the hedged duplicate answers quickly
+            await asyncio.sleep(5.0 if len(calls) == 1 else 0.01)
+            return len(calls)
+
+        async def run():
+            result = await asyncio.wait_for(engine.call(request, model="m"), timeout=1.0)
+            await asyncio.sleep(0)
+            return result
+
+        self.assertEqual(asyncio.run(run()), 2)
+        self.assertEqual(engine.hedges_sent, 1)
+        self.assertEqual(engine.limiter.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
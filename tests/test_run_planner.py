@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.benchmark import synthetic_table
+from src.openai_client import ChainOfThought, OpenAIClient
+from src.openai_client_combined import OpenAIClientCombined
+from src.run_planner import (CHAIN_OF_THOUGHT_TOKENS, ModelProfile, RunPlanner, cached_word_table, fit_profile,
+                             load_profiles, recommend, simulate_wall_time)
+from src.token_estimate import estimate_tokens
+from src.transcriber.chunked_transcriber import ChunkedTranscriber
+
+CHUNK = "**A:** Um, so this is the chunk we plan for. **B:** Right, and it has two speakers."
+
+
+class TestStageRequests(unittest.TestCase):
+
+    def test_prompt_tokens_match_the_clients(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "mock"}):
+            client = OpenAIClient(use_cache=False)
+            combined = OpenAIClientCombined(use_cache=False)
+        planner = RunPlanner()
+        reasoning, marking = planner.stage_requests("two_call", CHUNK)
+        self.assertEqual(reasoning.prompt_tokens, estimate_tokens(client.create_and_format_reasoning_input(CHUNK)))
+        empty = ChainOfThought(initial_analysis="", editing_goals="", editing_process="", conclusion="")
+        editing = client.create_and_format_editing_input(CHUNK, empty)
+        # The planned prompt carries an empty chain of thought plus its expected size
+        self.assertAlmostEqual(marking.prompt_tokens - CHAIN_OF_THOUGHT_TOKENS, estimate_tokens(editing), delta=25)
+        self.assertGreater(marking.completion_tokens, len(CHUNK) // 4)
+        (edit,) = planner.stage_requests("combined", CHUNK)
+        self.assertEqual(edit.prompt_tokens, estimate_tokens(combined.create_and_format_input(CHUNK)))
+        self.assertLess(reasoning.prefix_tokens, reasoning.prompt_tokens)
+
+    def test_span_marking_carries_the_episode_context(self):
+        context = "Guest is Dr. Ada Lovelace; keep every mention of the Analytical Engine."
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "mock"}):
+            client = OpenAIClient(use_cache=False, response_mode="spans", additional_context=context)
+        empty = ChainOfThought(initial_analysis="", editing_goals="", editing_process="", conclusion="")
+        span_input = client.create_and_format_span_editing_input(CHUNK, empty)
+        self.assertIn(context, span_input[-1]["content"])
+        planner = RunPlanner(response_mode="spans", additional_context=context)
+        _, marking = planner.stage_requests("two_call", CHUNK)
+        self.assertAlmostEqual(marking.prompt_tokens - CHAIN_OF_THOUGHT_TOKENS, estimate_tokens(span_input), delta=25)
+        self.assertGreater(marking.prefix_tokens, RunPlanner(response_mode="spans", additional_context="")
+                           .stage_requests("two_call", CHUNK)[1].prefix_tokens)
+
+
+class TestLatencyModel(unittest.TestCase):
+
+    def test_fit_recovers_latency_and_speed(self):
+        completions = [100, 300, 600, 900]
+        profile = fit_profile([0.8 + c / 50 for c in completions], completions)
+        self.assertAlmostEqual(profile.base_latency, 0.8)
+        self.assertAlmostEqual(profile.tokens_per_second, 50)
+
+    def test_profiles_are_read_from_trace_files(self):
+        with tempfile.NamedTemporaryFile('w', suffix=".jsonl", delete=False) as f:
+            for completion in (100, 200, 400):
+                f.write(json.dumps({"name": "request", "model": "m", "duration": 0.5 + completion / 200,
+                                    "completion_tokens": completion}) + "\n")
+            f.write(json.dumps({"name": "chunk", "duration": 9.0}) + "\n")
+            f.write(json.dumps({"name": "request", "model": "m", "duration": 60.0, "error": "APITimeoutError"}) + "\n")
+        self.addCleanup(os.remove, f.name)
+        profiles = load_profiles([f.name])
+        self.assertEqual(list(profiles), ["m"])
+        self.assertAlmostEqual(profiles["m"].tokens_per_second, 200)
+        self.assertEqual(profiles["m"].samples, 3)
+
+    def test_simulated_wall_time(self):
+        chunks = [[("reason", 1.0), ("mark", 2.0)] for _ in range(4)]
+        self.assertAlmostEqual(simulate_wall_time(chunks, 1), 12.0)
+        self.assertAlmostEqual(simulate_wall_time(chunks, 8), 3.0)
+        # Marking on its own single slot serializes the second stage only
+        self.assertAlmostEqual(simulate_wall_time(chunks, 8, {"mark": 1}), 9.0)
+
+
+class TestRunPlanner(unittest.TestCase):
+
+    def test_plan_and_recommend(self):
+        planner = RunPlanner({"default": ModelProfile(1.0, 100.0)})
+        rows = planner.plan(synthetic_table(3000), [500, 1000], [1, 16])
+        self.assertEqual(len(rows), 8)
+        by_key = {(r["strategy"], r["chunk_size"], r["concurrency"]): r for r in rows}
+        two_call, combined = by_key[("two_call", 500, 16)], by_key[("combined", 500, 16)]
+        self.assertEqual(two_call["requests"], 2 * two_call["chunks"])
+        self.assertEqual(combined["requests"], combined["chunks"])
+        self.assertLess(by_key[("two_call", 500, 16)]["wall_s"], by_key[("two_call", 500, 1)]["wall_s"])
+        self.assertGreaterEqual(two_call["wall_s"], two_call["critical_path_s"])
+        self.assertGreater(two_call["cached_tokens"], 0)
+
+        fastest = recommend(rows)
+        self.assertEqual(fastest["wall_s"], min(r["wall_s"] for r in rows))
+        cheapest = min(r["cost_usd"] for r in rows)
+        self.assertLessEqual(recommend(rows, budget=cheapest)["cost_usd"], cheapest)
+        self.assertIsNone(recommend(rows, budget=cheapest / 2))
+
+    def test_only_cached_transcripts_are_planned(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.dict(os.environ, {"ASSEMBLYAI_API_KEY": "mock", "VIDEO_EDITOR_CACHE_DIR": tmpdir}):
+                chunker = ChunkedTranscriber()
+                audio = os.path.join(tmpdir, "episode.mp3")
+                with open(audio, 'wb') as f:
+                    f.write(b"audio")
+                with patch.object(chunker.transcriber, "transcribe") as transcribe:
+                    with self.assertRaises(ValueError):
+                        cached_word_table(chunker, audio)
+                    transcribe.assert_not_called()
+                    transcriber = chunker.transcriber
+                    transcriber.word_store.save(transcriber.file_hash(audio), synthetic_table(50))
+                    self.assertEqual(len(cached_word_table(chunker, audio)), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import wave
+from unittest.mock import patch
+
+import numpy as np
+
+from src.audio_transcript_processor import AudioTranscriptProcessor
+from src.mock_llm_server import MockLLMServer, MockServerConfig
+from src.transcriber.chunked_transcriber import ChunkedTranscriber
+from src.transcriber.segmented_transcriber import BurstTranscriber, SegmentedTranscriber
+
+RATE = 8000
+
+
+def burst_samples(bursts, seed=0):
+    # One second of tone per burst, alternating two voices, with a second of digital silence after each
+    rng = np.random.default_rng(seed)
+    t = np.arange(RATE) / RATE
+    pieces = []
+    for k in range(bursts):
+        pitch = (220, 330)[k % 2]
+        pieces.append(rng.uniform(0.3, 0.8) * np.sin(2 * np.pi * pitch * t + rng.uniform(0, 2 * np.pi)))
+        pieces.append(np.zeros(RATE))
+    return (np.concatenate(pieces) * 32767).astype('<i2')
+
+
+def write_wav(path, samples):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(samples.tobytes())
+
+
+class TestSegmentedTranscriber(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        patcher = patch.dict(os.environ, {"OPENAI_API_KEY": "mock", "ASSEMBLYAI_API_KEY": "mock",
+                                          "VIDEO_EDITOR_CACHE_DIR": self.dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.samples = burst_samples(40)
+        self.audio = os.path.join(self.dir, "episode.wav")
+        write_wav(self.audio, self.samples)
+
+    def segmented(self, transcriber=None):
+        return SegmentedTranscriber(transcriber or BurstTranscriber(), target_segment_ms=8000, min_segment_ms=4000,
+                                    max_segment_ms=20000, min_silence_ms=500, overlap_ms=1500, max_workers=3)
+
+    def test_segments_cover_the_file(self):
+        segments = self.segmented().plan_segments(self.audio)
+        self.assertGreater(len(segments), 2)
+        self.assertEqual(segments[0].start, 0)
+        self.assertEqual(segments[-1].end, len(self.samples))
+        for previous, segment in zip(segments, segments[1:]):
+            self.assertEqual(previous.end, segment.start)
+            self.assertGreaterEqual(segment.end - segment.start, 4 * RATE)
+            # Cuts land in the silence just before a burst
+            self.assertFalse(self.samples[segment.start - 100:segment.start].any())
+
+    def test_speakers_are_consistent_across_segments(self):
+        whole = BurstTranscriber().transcribe_words(self.audio)
+        table = self.segmented().get_word_table(self.audio)
+        self.assertEqual(table.text, whole.text)
+        np.testing.assert_array_equal(table.start, whole.start)
+        # Segments starting on the second voice label it A locally; reconciliation maps it back
+        voices = {}
+        for word, code in zip(table.text, table.speaker):
+            voices.setdefault(word.split("n")[0], set()).add(table.speakers[code])
+        self.assertEqual(voices, {"p220": {"A"}, "p330": {"B"}})
+        self.assertEqual(list(table.sentence_starts), list(whole.sentence_starts))
+
+    def test_trimmed_intro_reuses_later_segments(self):
+        transcriber = BurstTranscriber()
+        segments = len(self.segmented(transcriber).plan_segments(self.audio))
+        self.segmented(transcriber).get_word_table(self.audio)
+        self.assertEqual(transcriber.calls, segments)
+
+        trimmed = os.path.join(self.dir, "trimmed.wav")
+        write_wav(trimmed, self.samples[6 * RATE:])
+        table = self.segmented(transcriber).get_word_table(trimmed)
+        # Only the segment that lost its intro is transcribed again
+        self.assertLessEqual(transcriber.calls - segments, 2)
+        self.assertEqual(table.text, BurstTranscriber().transcribe_words(trimmed).text)
+
+    def test_streamed_chunks_settle_into_the_final_chunking(self):
+        chunker = ChunkedTranscriber(20, content_defined=True)
+        segmented = self.segmented()
+
+        async def collect():
+            return [[chunk.text for chunk in chunks] async for _, chunks in segmented.aiter_chunks(self.audio, chunker)]
+
+        steps = asyncio.run(collect())
+        final = [chunk.text for chunk in chunker.chunk_table(self.segmented().get_word_table(self.audio))]
+        self.assertEqual(steps[-1], final)
+        self.assertTrue(any(0 < len(step) < len(final) for step in steps))
+        for step in steps:
+            self.assertEqual(step, final[:len(step)])
+
+    def test_processor_edits_while_segments_land(self):
+        output = os.path.join(self.dir, "edited.md")
+        config = MockServerConfig(latency_median=0.001, latency_sigma=0.0, tokens_per_second=1e6, seed=1)
+        requests = []
+        with MockLLMServer(config) as server:
+            for _ in range(2):
+                processor = AudioTranscriptProcessor(chunk_size=20, segmented_transcriber=self.segmented())
+                processor.engine.base_url = server.base_url
+                processor.process_audio_file(self.audio, output)
+                requests.append(server.stats["requests"])
+        with open(f"{output}.manifest.json") as f:
+            chunks = json.load(f)["chunks"]
+        self.assertTrue(chunks)
+        self.assertTrue(all(entry["status"] == "done" for entry in chunks))
+        self.assertGreater(requests[0], 0)
+        # The second run copies every chunk forward without a request
+        self.assertEqual(requests[1], requests[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from src.alignment import parse_strikethrough
+from src.llm_engine import AdaptiveConcurrencyLimiter, LLMEngine
+from src.mock_llm_server import MockLLMServer, MockServerConfig
+from src.openai_client import OpenAIClient
+from src.request_policy import ChunkSuccess
+from src.streaming import DivergenceMonitor, PartialFieldReader, StreamDiverged, stream_listener
+from tests.support import scripted_processor
+
+SOURCE = " ".join(f"**A:** Um, this is sentence {i} of the streamed chunk." for i in range(12))
+
+
+class TestPartialFieldReader(unittest.TestCase):
+
+    def test_decodes_across_any_split(self):
+        value = 'Line one\nShe said "hi" – café 🎙️ \\ done'
+        payload = json.dumps({"chain_of_thought": {"note": 'mentions "edited_transcript": "x"'},
+                              "edited_transcript": value, "after": "ignored"})
+        for size in (1, 3, 7):
+            reader = PartialFieldReader("edited_transcript")
+            snapshots = []
+            for start in range(0, len(payload), size):
+                if reader.feed(payload[start:start + size]):
+                    snapshots.append(reader.text)
+            self.assertEqual(reader.text, value)
+            self.assertTrue(reader.done)
+            self.assertTrue(all(value.startswith(snapshot) for snapshot in snapshots))
+            self.assertGreater(len(snapshots), 1)
+
+
+class TestDivergenceMonitor(unittest.TestCase):
+
+    def test_faithful_prefix_is_reported(self):
+        seen = []
+        monitor = DivergenceMonitor(SOURCE, on_progress=seen.append)
+        edited = SOURCE.replace("Um,", "~~Um,~~")
+        for end in range(0, len(edited), 40):
+            monitor.update(edited[:end])
+        self.assertTrue(seen)
+        self.assertLess(monitor.drift, 0.05)
+
+    def test_reworded_output_is_cut_off(self):
+        monitor = DivergenceMonitor(SOURCE)
+        reworded = " ".join(f"reworded{i}" for i in range(60))
+        with self.assertRaises(StreamDiverged):
+            for end in range(0, len(reworded), 40):
+                monitor.update(reworded[:end])
+        self.assertLess(monitor.text.count(" "), 60)
+
+    def test_text_is_only_tokenized_when_a_check_is_due(self):
+        source = " ".join(f"word{i}" for i in range(1200))
+        monitor = DivergenceMonitor(source, check_every=20)
+        with patch("src.streaming.parse_strikethrough", wraps=parse_strikethrough) as parse:
+            for end in range(0, len(source), 7):
+                monitor.update(source[:end])
+        self.assertLessEqual(parse.call_count, 1200 // 20)
+        self.assertLess(monitor.drift, 0.05)
+
+    def test_aborted_stream_records_no_latency(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2)
+
+        async def run():
+            with self.assertRaises(StreamDiverged):
+                async with limiter.slot():
+                    raise StreamDiverged(0.5, 40)
+
+        asyncio.run(run())
+        self.assertIsNone(limiter.ewma_latency)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+class TestStreamingClient(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.dict(os.environ, {"OPENAI_API_KEY": "mock"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stream(self, server, monitor):
+        engine = LLMEngine(api_key="mock", base_url=server.base_url)
+        client = OpenAIClient(engine=engine, use_cache=False)
+
+        async def run():
+            token = stream_listener.set(monitor.update)
+            try:
+                return await client.aprocess_chunk(SOURCE)
+            finally:
+                stream_listener.reset(token)
+                await engine.aclose()
+
+        return asyncio.run(run()), engine
+
+    def test_streamed_edit_matches_the_final_response(self):
+        seen = []
+        config = MockServerConfig(latency_median=0.001, latency_sigma=0.0, tokens_per_second=1e6, seed=1)
+        with MockLLMServer(config) as server:
+            text, engine = self.stream(server, DivergenceMonitor(SOURCE, on_progress=seen.append))
+        self.assertEqual(text, SOURCE.replace("Um,", "~~Um,~~"))
+        self.assertTrue(seen and text.startswith(seen[-1]))
+        self.assertEqual(engine.usage["requests"], 2)
+        self.assertGreater(engine.usage["completion_tokens"], 0)
+
+    def test_diverging_stream_is_cancelled(self):
+        config = MockServerConfig(latency_median=0.001, latency_sigma=0.0, tokens_per_second=2000,
+                                  diverge_rate=1.0, seed=1)
+        with MockLLMServer(config) as server:
+            with self.assertRaises(StreamDiverged):
+                self.stream(server, DivergenceMonitor(SOURCE))
+            deadline = time.monotonic() + 2
+            while not server.stats["cancelled"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(server.stats["cancelled"], 1)
+
+
+class TestProcessorStreaming(unittest.TestCase):
+
+    def test_diverged_attempt_is_retried(self):
+        def respond(chunk, refresh):
+            if not refresh:
+                raise StreamDiverged(0.8, 40)
+            return chunk
+
+        processor, strategy = scripted_processor(respond, max_drift_retries=1, max_split_depth=0)
+        result = asyncio.run(processor.averify_chunk(SOURCE))
+        self.assertIsInstance(result, ChunkSuccess)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(strategy.refreshes, [False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.tracing import NullTracer, Tracer
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.trace_path = os.path.join(self.tmpdir.name, "trace.jsonl")
+        self.metrics_path = os.path.join(self.tmpdir.name, "metrics.prom")
+        self.tracer = Tracer(self.trace_path, self.metrics_path)
+
+    def tearDown(self):
+        self.tracer.close()
+        self.tmpdir.cleanup()
+
+    def events(self):
+        self.tracer.close()
+        with open(self.trace_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_nested_spans_inherit_attributes(self):
+        with self.tracer.span("chunk", episode="ep1", chunk=3):
+            with self.tracer.span("request", model="gpt") as span:
+                span.set(prompt_tokens=10)
+        request, chunk = self.events()
+        self.assertEqual(request["name"], "request")
+        self.assertEqual(request["parent_id"], chunk["span_id"])
+        self.assertIsNone(chunk["parent_id"])
+        self.assertEqual((request["episode"], request["chunk"], request["model"]), ("ep1", 3, "gpt"))
+        self.assertEqual(request["prompt_tokens"], 10)
+        self.assertNotIn("model", chunk)
+
+    def test_errors_are_recorded_and_reraised(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span("write"):
+                raise ValueError("disk full")
+        self.assertEqual(self.events()[0]["error"], "ValueError")
+        with open(self.metrics_path) as f:
+            self.assertIn('video_editor_span_errors_total{span="write"} 1', f.read())
+
+    def test_recorded_intervals_join_the_current_span(self):
+        with self.tracer.span("chunk", chunk=1):
+            self.tracer.record("queue_wait", 0.25, model="gpt")
+        wait, chunk = self.events()
+        self.assertEqual(wait["duration"], 0.25)
+        self.assertEqual(wait["parent_id"], chunk["span_id"])
+        self.assertEqual(wait["chunk"], 1)
+
+    def test_prometheus_metrics(self):
+        self.tracer.record("request", 0.2)
+        self.tracer.record("request", 3.0)
+        self.tracer.add_tokens("gpt", 100, 20)
+        self.tracer.add_tokens("gpt", 50, 5)
+        text = self.tracer.metrics_text()
+        self.assertIn('video_editor_span_seconds_bucket{span="request",le="0.25"} 1', text)
+        self.assertIn('video_editor_span_seconds_bucket{span="request",le="+Inf"} 2', text)
+        self.assertIn('video_editor_span_seconds_count{span="request"} 2', text)
+        self.assertIn('video_editor_tokens_total{model="gpt",kind="prompt"} 150', text)
+        self.assertIn('video_editor_tokens_total{model="gpt",kind="completion"} 25', text)
+
+    def test_null_tracer_is_a_no_op(self):
+        tracer = NullTracer()
+        with tracer.span("chunk", chunk=1) as span:
+            span.set(attempts=2)
+        tracer.record("queue_wait", 1.0)
+        tracer.add_tokens("gpt", 1, 1)
+        tracer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -47,6 +47,37 @@ Great, thank you. We can certainly deviate from that if there's anything you wan
         finally:
             os.unlink(temp_file_path)
 
+    def test_iter_chunks_keeps_timestamps(self):
+        with tempfile.NamedTemporaryFile(mode='w', delete=False) as temp_file:
+            temp_file.write(self.sample_transcript)
+            temp_file_path = temp_file.name
+
+        try:
+            chunks = self.reader.iter_chunks(temp_file_path)
+            self.assertFalse(isinstance(chunks, list))
+            chunks = list(chunks)
+            self.assertEqual([chunk.start for chunk in chunks], [0.0, 14.0])
+            # One tag per chunk start and speaker change, not one per sentence
+            self.assertEqual(chunks[0].text.count("**Nathan:**"), 1)
+            self.assertEqual(chunks[0].text.count("**Deger:**"), 1)
+        finally:
+            os.unlink(temp_file_path)
+
+    def test_abbreviations_do_not_end_sentences(self):
+        text = "Host (1:02:03)\nI spoke with Dr. Smith about the U.S. election results today. It went well, I think overall."
+        turns = list(self.reader.iter_turns(text.splitlines()))
+        self.assertEqual(turns[0].start, 3723.0)
+        sentences = self.reader._tokenize_sentences(self.reader._clean_and_normalize_text(text))
+        self.assertEqual(len(sentences), 2)
+
+    def test_token_budget(self):
+        reader = TranscriptReader(token_budget=25)
+        # Each sentence is twelve estimated tokens, so two fit in a chunk
+        sentences = [f"**A:** This sentence has exactly eight words number {i}." for i in range(6)]
+        chunks = reader._create_chunks(sentences)
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(all(chunk.startswith("**A:**") and chunk.count("**A:**") == 1 for chunk in chunks))
+
     def test_invalid_chunk_size(self):
         with self.assertRaises(ValueError):
             TranscriptReader(chunk_size=0)
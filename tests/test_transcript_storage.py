@@ -0,0 +1,53 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from src.transcriber.transcript_storage import TranscriptStorage
+
+
+def save_entries(storage_path, worker):
+    storage = TranscriptStorage(storage_path)
+    for i in range(50):
+        storage.save_transcript_id(f"hash-{worker}-{i}", f"id-{worker}-{i}")
+    storage.close()
+
+
+class TestTranscriptStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage_path = os.path.join(self.tmpdir.name, "transcripts.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        storage = TranscriptStorage(self.storage_path)
+        self.assertIsNone(storage.get_transcript_id("abc"))
+        storage.save_transcript_id("abc", "transcript-1")
+        storage.close()
+        self.assertEqual(TranscriptStorage(self.storage_path).get_transcript_id("abc"), "transcript-1")
+
+    def test_imports_legacy_json(self):
+        json_path = os.path.join(self.tmpdir.name, "transcript_ids.json")
+        with open(json_path, 'w') as f:
+            json.dump({"abc": "transcript-1"}, f)
+        storage = TranscriptStorage(json_path)
+        self.assertEqual(storage.get_transcript_id("abc"), "transcript-1")
+        self.assertTrue(storage.storage_path.endswith("transcript_ids.sqlite3"))
+
+    def test_concurrent_processes_keep_every_entry(self):
+        TranscriptStorage(self.storage_path).close()
+        workers = [multiprocessing.Process(target=save_entries, args=(self.storage_path, w)) for w in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        storage = TranscriptStorage(self.storage_path)
+        for w in range(4):
+            for i in range(50):
+                self.assertEqual(storage.get_transcript_id(f"hash-{w}-{i}"), f"id-{w}-{i}")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from src.transcriber.word_store import PackedStrings, WordStore
+from src.transcriber.word_table import WordTable
+
+
+def word(text, start, end, speaker="A"):
+    return SimpleNamespace(text=text, start=start, end=end, confidence=0.9, speaker=speaker)
+
+
+class TestWordStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = WordStore(self.tmpdir.name)
+        sentences = [
+            SimpleNamespace(speaker="A", words=[word("Um,", 0, 200), word("welcome", 250, 600), word("back.", 650, 900)]),
+            SimpleNamespace(speaker="B", words=[word("Thanks—", 1000, 1300, "B"), word("héllo.", 1350, 1700, "B")]),
+        ]
+        self.table = WordTable.from_sentences(sentences)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_missing_entry(self):
+        self.assertIsNone(self.store.load("unknown"))
+
+    def test_round_trip_is_memory_mapped(self):
+        self.store.save("hash", self.table, transcript_id="t-1")
+        loaded = self.store.load("hash")
+        self.assertIsInstance(loaded.start, np.memmap)
+        self.assertEqual(list(loaded.text), ["Um,", "welcome", "back.", "Thanks—", "héllo."])
+        self.assertEqual(loaded.text[1:3], ["welcome", "back."])
+        np.testing.assert_array_equal(loaded.end, self.table.end)
+        self.assertEqual(loaded.sentence_count, 2)
+        self.assertEqual(loaded.sentence_bounds(1), (3, 5))
+        self.assertEqual(loaded.sentence_speaker(1), "B")
+
+    def test_second_save_keeps_first_entry(self):
+        self.store.save("hash", self.table)
+        self.store.save("hash", self.table)
+        self.assertEqual(len(self.store.load("hash")), 5)
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)), ["hash"])
+
+    def test_packed_strings(self):
+        packed = PackedStrings.pack(["a", "", "ü"])
+        self.assertEqual((len(packed), packed[-1], packed[1]), (3, "ü", ""))
+
+if __name__ == '__main__':
+    unittest.main()